@@ -15,6 +15,53 @@ supabase_key = os.getenv("SUPABASE_KEY")
 anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
 openai_api_key = os.getenv("OPENAI_API_KEY")
 session_secret = os.getenv("SESSION_SECRET", "dev-secret-change-in-production")
+arxiv_snapshot_path = os.getenv(
+    "ARXIV_SNAPSHOT_PATH", "data/arxiv-metadata-snapshot.json"
+)
+arxiv_oai_url = os.getenv("ARXIV_OAI_URL", "https://export.arxiv.org/oai2")
+
+# Embedding backend: 'openai', 'local' (sentence-transformers on CPU) or 'auto'
+# (OpenAI when a key is configured, otherwise local)
+embedding_provider = os.getenv("EMBEDDING_PROVIDER", "auto").lower()
+local_embedding_model = os.getenv(
+    "LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
+)
+local_embedding_threads = int(os.getenv("LOCAL_EMBEDDING_THREADS", "2"))
+
+# Background prefetch of cited papers when a paper is opened
+prefetch_enabled = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+prefetch_max_papers = int(os.getenv("PREFETCH_MAX_PAPERS", "5"))
+prefetch_download_content = (
+    os.getenv("PREFETCH_DOWNLOAD_CONTENT", "false").lower() == "true"
+)
+prefetch_user_budget = int(os.getenv("PREFETCH_USER_BUDGET", "25"))  # papers/hour
+prefetch_node_budget = int(os.getenv("PREFETCH_NODE_BUDGET", "200"))  # papers/hour
+
+# Recommendation results are cached per paper and served stale (while being
+# recomputed in the background) after the candidate index changes
+recommendation_cache_size = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "512"))
+recommendation_max_stale_seconds = int(os.getenv("RECOMMENDATION_MAX_STALE_SECONDS", "86400"))
+# a partial result (some source missed its deadline) is served as fresh for
+# this long before the missing sources are retried
+recommendation_partial_fresh_seconds = int(os.getenv("RECOMMENDATION_PARTIAL_FRESH_SECONDS", "30"))
+# how often the scraper indexes are re-read for new candidates
+candidate_refresh_seconds = int(os.getenv("CANDIDATE_REFRESH_SECONDS", "300"))
+# per-source deadline for the recommendation fan-out, and the latency budget
+# of the whole request (paper lookup and embedding included); a source that
+# fails or times out this many times in a row is skipped for the cooldown
+recommendation_source_timeout = float(os.getenv("RECOMMENDATION_SOURCE_TIMEOUT", "2.0"))
+recommendation_budget_seconds = float(os.getenv("RECOMMENDATION_BUDGET_SECONDS", "3.0"))
+source_breaker_threshold = int(os.getenv("SOURCE_BREAKER_THRESHOLD", "3"))
+source_breaker_cooldown_seconds = float(os.getenv("SOURCE_BREAKER_COOLDOWN_SECONDS", "60"))
+
+# /api/context/add fetches articles concurrently on this many threads; a
+# fetch slower than the timeout is reported as such and skipped
+context_fetch_workers = int(os.getenv("CONTEXT_FETCH_WORKERS", "8"))
+context_fetch_timeout = float(os.getenv("CONTEXT_FETCH_TIMEOUT", "15"))
+
+# Background re-scrape of the scraper post indexes (persisted under data/scrapers)
+scraper_refresh_enabled = os.getenv("SCRAPER_REFRESH_ENABLED", "true").lower() == "true"
+scraper_refresh_seconds = int(os.getenv("SCRAPER_REFRESH_SECONDS", "3600"))
 
 # Initialize Supabase client
 if supabase_url and supabase_key:
@@ -1,9 +1,16 @@
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 from fasthtml.common import database
 import json
 import os
+import re
+import threading
 from datetime import datetime
 
+import numpy as np
+
+from embeddings import OPENAI_EMBEDDING_MODEL
+from vector_index import get_vector_index
+
 DB_PATH = "data/context.db"
 
 # Ensure data directory exists
@@ -21,20 +28,161 @@ if contexts not in db.t:
             title=str,
             url=str,
             content=str,
-            embedding=str,  # JSON list
+            vector=bytes,  # float32 embedding
+            embedding_model=str,  # model id the embedding came from
             added_at=str,
         ),
         pk="id",
     )
 
+try:
+    db.execute("ALTER TABLE contexts ADD COLUMN embedding_model TEXT")
+except:
+    pass
+
+
+def _migrate_json_embeddings():
+    """Move embeddings from the old JSON text column into the float32 vector column."""
+    columns = {c["name"] for c in db.q("PRAGMA table_info(contexts)")}
+    if "embedding" not in columns:
+        return
+    if "vector" not in columns:
+        db.execute("ALTER TABLE contexts ADD COLUMN vector BLOB")
+    rows = db.q("SELECT id, embedding FROM contexts WHERE embedding IS NOT NULL AND vector IS NULL")
+    with db.conn:
+        db.conn.executemany(
+            "UPDATE contexts SET vector = ? WHERE id = ?",
+            [
+                (np.asarray(json.loads(r["embedding"]), dtype=np.float32).tobytes(), r["id"])
+                for r in rows
+                if r["embedding"] not in ("", "[]", "null")
+            ],
+        )
+        db.execute("ALTER TABLE contexts DROP COLUMN embedding")
+    print(f"[PASS] >>> migrated {len(rows)} context embeddings to float32 vectors")
+
+
+_migrate_json_embeddings()
+
+# Overlapping passages of each context item, embedded separately so
+# retrieval sees the whole article rather than its first few thousand chars
+context_chunks = db.t.context_chunks
+if context_chunks not in db.t:
+    context_chunks.create(
+        dict(
+            id=int,  # auto-increment primary key
+            context_id=int,  # references contexts.id
+            chunk_index=int,  # position within the item
+            content=str,
+            start_char=int,  # offsets into contexts.content
+            end_char=int,
+            embedding=bytes,  # float32 vector
+            embedding_model=str,
+        ),
+        pk="id",
+    )
+db.execute(
+    "CREATE INDEX IF NOT EXISTS idx_context_chunks_context ON context_chunks (context_id)"
+)
+
+# one row per (source, ref_id); earlier versions could store duplicates
+if not db.q("SELECT 1 FROM sqlite_master WHERE name = 'idx_contexts_source_ref'"):
+    with db.conn:
+        db.execute(
+            "DELETE FROM contexts WHERE id NOT IN "
+            "(SELECT MIN(id) FROM contexts GROUP BY source, ref_id)"
+        )
+        db.execute("DELETE FROM context_chunks WHERE context_id NOT IN (SELECT id FROM contexts)")
+        db.execute(
+            "CREATE UNIQUE INDEX idx_contexts_source_ref ON contexts (source, ref_id)"
+        )
+
+db.execute("CREATE INDEX IF NOT EXISTS idx_contexts_source_id ON contexts (source, id)")
+
 ContextItem = contexts.dataclass()
 
+# columns returned by list_page unless content or vectors are asked for
+LIST_COLUMNS = ("id", "source", "ref_id", "title", "url", "embedding_model", "added_at")
+
+CHUNK_MAX_CHARS = 1500
+CHUNK_OVERLAP_CHARS = 200
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _is_heading(line: str) -> bool:
+    return len(line) < 80 and not line.rstrip().endswith((".", "!", "?", ":", ",", ";"))
+
+
+def _blocks(text: str, max_chars: int):
+    """(start, end) spans of lines, with over-long lines split at sentence ends."""
+    for match in re.finditer(r"[^\n]+", text):
+        start, end = match.span()
+        while end - start > max_chars:
+            window = text[start : start + max_chars]
+            cuts = [m.end() for m in _SENTENCE_END.finditer(window)]
+            cut = start + (cuts[-1] if cuts and cuts[-1] > max_chars // 2 else max_chars)
+            yield start, cut
+            start = cut
+        if text[start:end].strip():
+            yield start, end
+
+
+def chunk_text(
+    text: str, max_chars: int = CHUNK_MAX_CHARS, overlap: int = CHUNK_OVERLAP_CHARS
+) -> List[Dict]:
+    """
+    Split an article into overlapping, structure-aware chunks
+
+    Lines (paragraphs, list items, headings as produced by the scrapers) are
+    packed into chunks of at most max_chars. A heading starts a new chunk once
+    the current one is half full, and each chunk repeats the trailing lines
+    (up to `overlap` chars) of the previous one.
+
+    Returns:
+        [{"content", "start_char", "end_char"}] in document order
+    """
+    chunks = []
+    current: List = []  # (start, end) spans of the chunk being built
+
+    def flush():
+        chunks.append(
+            {
+                "content": "\n".join(text[s:e] for s, e in current),
+                "start_char": current[0][0],
+                "end_char": current[-1][1],
+            }
+        )
+
+    for start, end in _blocks(text, max_chars):
+        size = sum(e - s + 1 for s, e in current)
+        heading_break = _is_heading(text[start:end]) and size > max_chars // 2
+        if current and (size + end - start > max_chars or heading_break):
+            flush()
+            carried: List = []
+            for span in reversed(current):
+                if sum(e - s for s, e in carried) + span[1] - span[0] > overlap:
+                    break
+                carried.insert(0, span)
+            current = [] if heading_break else carried
+        current.append((start, end))
+    if current:
+        flush()
+    return chunks
+
+
+def _to_blob(embedding) -> Optional[bytes]:
+    if embedding is None or len(embedding) == 0:
+        return None
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
 
 class ContextManager:
     """Handles storage and retrieval of context items for the working LLM."""
 
     def __init__(self):
         self.table = contexts
+        self._indexed_models = set()  # models whose index has been backfilled
+        self._index_lock = threading.Lock()
 
     def add_item(
         self,
@@ -44,32 +192,332 @@ class ContextManager:
         url: str,
         content: str,
         embedding: List[float],
-    ):
-        if self._exists(source, ref_id):
-            print("[PASS] >>> context item already exists, skipping")
+        embedding_model: str = None,
+        chunks: Optional[List[Dict]] = None,
+    ) -> Optional[int]:
+        """
+        Store a context item
+
+        Args:
+            embedding: Item-level vector
+            embedding_model: Model id of embedding (and of the chunk embeddings)
+            chunks: Output of chunk_text(content), each with an "embedding"
+
+        Returns:
+            The new item id, or None if (source, ref_id) is already stored
+        """
+        return self.add_items(
+            [
+                dict(
+                    source=source,
+                    ref_id=ref_id,
+                    title=title,
+                    url=url,
+                    content=content,
+                    embedding=embedding,
+                    embedding_model=embedding_model,
+                    chunks=chunks,
+                )
+            ]
+        )[0]
+
+    def add_items(self, items: List[Dict]) -> List[Optional[int]]:
+        """
+        Store many context items (and their chunks) in one transaction
+
+        Items whose (source, ref_id) is already stored are skipped by the
+        unique index rather than looked up first.
+
+        Args:
+            items: Dicts with the add_item arguments
+
+        Returns:
+            Per item, the new id or None if it already existed
+        """
+        now = datetime.now().isoformat()
+        ids: List[Optional[int]] = []
+        vectors = [_to_blob(item.get("embedding")) for item in items]
+        chunk_rows = []
+        with db.conn:
+            for item, vector in zip(items, vectors):
+                db.conn.execute(
+                    "INSERT OR IGNORE INTO contexts (source, ref_id, title, url, content, "
+                    "vector, embedding_model, added_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        item["source"],
+                        item["ref_id"],
+                        item["title"],
+                        item["url"],
+                        item["content"],
+                        vector,
+                        item.get("embedding_model"),
+                        now,
+                    ),
+                )
+                if not db.conn.changes():
+                    ids.append(None)
+                    continue
+                context_id = db.conn.last_insert_rowid()
+                ids.append(context_id)
+                chunks = [
+                    (chunk, _to_blob(chunk.get("embedding"))) for chunk in item.get("chunks") or []
+                ]
+                chunk_rows += [
+                    (
+                        context_id,
+                        i,
+                        chunk["content"],
+                        chunk["start_char"],
+                        chunk["end_char"],
+                        blob,
+                        item.get("embedding_model"),
+                    )
+                    for i, (chunk, blob) in enumerate((c, b) for c, b in chunks if b)
+                ]
+            db.conn.executemany(
+                "INSERT INTO context_chunks (context_id, chunk_index, content, start_char, "
+                "end_char, embedding, embedding_model) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                chunk_rows,
+            )
+
+        # index the new rows, one batch per model
+        new = [
+            (item.get("embedding_model"), context_id, vector)
+            for item, context_id, vector in zip(items, ids, vectors)
+            if context_id
+        ]
+        for model in {m for m, _, _ in new}:
+            batch = [(c, v) for m, c, v in new if m == model]
+            with_vectors = [(c, v) for c, v in batch if v]
+            if with_vectors:
+                self._index(model).add(
+                    [str(c) for c, _ in with_vectors],
+                    np.stack([np.frombuffer(v, dtype=np.float32) for _, v in with_vectors]),
+                )
+            self._index_chunks([c for c, _ in batch], model)
+
+        skipped = ids.count(None)
+        if new:
+            print(
+                f"[PASS] >>> added {len(new)} context items"
+                + (f" ({skipped} already stored)" if skipped else "")
+            )
+        elif skipped:
+            print(f"[PASS] >>> {skipped} context items already stored, skipping")
+        return ids
+
+    def _index_chunks(self, context_ids: List[int], embedding_model: str = None):
+        if not context_ids:
             return
-        self.table.insert(
-            source=source,
-            ref_id=ref_id,
-            title=title,
-            url=url,
-            content=content,
-            embedding=json.dumps(embedding),
-            added_at=datetime.now().isoformat(),
-        )
-        print(f"[PASS] >>> added context item {title[:50]}… from {source}")
+        # ids from one add_items call are (nearly) contiguous; avoids an IN list
+        # longer than SQLite's variable limit
+        wanted = set(context_ids)
+        rows = [
+            r
+            for r in db.q(
+                "SELECT id, context_id, embedding FROM context_chunks "
+                "WHERE context_id BETWEEN ? AND ?",
+                [min(wanted), max(wanted)],
+            )
+            if r["context_id"] in wanted
+        ]
+        if rows:
+            self._index(embedding_model, "context-chunks").add(
+                [str(r["id"]) for r in rows],
+                np.stack([np.frombuffer(r["embedding"], dtype=np.float32) for r in rows]),
+            )
+
+    def list_page(
+        self,
+        limit: int = 50,
+        before_id: Optional[int] = None,
+        source: Optional[str] = None,
+        with_content: bool = False,
+        with_vector: bool = False,
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """
+        One page of context items, newest first (keyset pagination on id)
 
-    def add_items(self, items: List[Dict]):
-        for item in items:
-            self.add_item(**item)
+        Args:
+            limit: Page size
+            before_id: Cursor from the previous page (None for the first page)
+            source: Only items from this source
+            with_content: Include the article text
+            with_vector: Include the item embedding (as a float32 array)
 
-    def _exists(self, source: str, ref_id: str) -> bool:
-        return bool(
-            self.table.where(lambda r: r.source == source and r.ref_id == ref_id)
+        Returns:
+            (item dicts, cursor for the next page or None after the last page)
+        """
+        columns = list(LIST_COLUMNS)
+        if with_content:
+            columns.append("content")
+        if with_vector:
+            columns.append("vector")
+        where, args = [], []
+        if before_id is not None:
+            where.append("id < ?")
+            args.append(before_id)
+        if source:
+            where.append("source = ?")
+            args.append(source)
+        rows = db.q(
+            f"SELECT {', '.join(columns)} FROM contexts"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY id DESC LIMIT ?",
+            args + [limit + 1],
         )
+        if with_vector:
+            for r in rows:
+                r["vector"] = (
+                    np.frombuffer(r["vector"], dtype=np.float32) if r["vector"] else None
+                )
+        if len(rows) > limit:
+            return rows[:limit], rows[limit - 1]["id"]
+        return rows, None
+
+    def iter_items(self, page_size: int = 500, **kwargs) -> Iterator[Dict]:
+        """Stream every context item a page at a time (list_page arguments)"""
+        cursor = None
+        while True:
+            rows, cursor = self.list_page(limit=page_size, before_id=cursor, **kwargs)
+            yield from rows
+            if cursor is None:
+                return
 
     def list_items(self) -> List[ContextItem]:
-        return [ContextItem(**r) for r in self.table]
+        return [
+            ContextItem(**r) for r in self.iter_items(with_content=True, with_vector=True)
+        ]
+
+    def _index(self, embedding_model: str = None, name: str = "contexts"):
+        """Vector index of context items ("contexts") or chunks
+        ("context-chunks") for one model (rows without a model predate the
+        column and came from the OpenAI default)."""
+        model = embedding_model or OPENAI_EMBEDDING_MODEL
+        index = get_vector_index(name, model)
+        with self._index_lock:
+            if (name, model) not in self._indexed_models:
+                self._backfill(index, model, name)
+                self._indexed_models.add((name, model))
+        return index
+
+    def _backfill(self, index, model: str, name: str):
+        """Index stored embeddings that are not in the index yet."""
+        table, column = (
+            ("contexts", "vector") if name == "contexts" else ("context_chunks", "embedding")
+        )
+        rows = db.q(
+            f"SELECT id, {column} AS vector FROM {table} "
+            f"WHERE {column} IS NOT NULL AND coalesce(embedding_model, ?) = ?",
+            [OPENAI_EMBEDDING_MODEL, model],
+        )
+        index.refresh()
+        missing = [r for r in rows if str(r["id"]) not in index.key_rows]
+        if missing:
+            index.add(
+                [str(r["id"]) for r in missing],
+                np.stack([np.frombuffer(r["vector"], dtype=np.float32) for r in missing]),
+            )
+            print(f"[PASS] >>> indexed {len(missing)} rows of {table} for {model}")
+
+    def search_similar(
+        self, embedding: List[float], k: int = 5, embedding_model: str = None
+    ) -> List[Dict]:
+        """
+        Context items most similar to an embedding
+
+        Args:
+            embedding: Query vector
+            k: Number of items to return
+            embedding_model: Model the query came from; only items embedded
+                with the same model are searched
+
+        Returns:
+            Item dicts (without the stored embedding) with a "score", best first
+        """
+        hits = self._index(embedding_model).search(embedding, k)
+        if not hits:
+            return []
+
+        scores = {int(key): score for key, score in hits}
+        placeholders = ",".join("?" * len(scores))
+        rows = db.q(
+            f"SELECT id, source, ref_id, title, url, content, embedding_model, added_at "
+            f"FROM contexts WHERE id IN ({placeholders})",
+            list(scores),
+        )
+        for r in rows:
+            r["score"] = scores[r["id"]]
+        return sorted(rows, key=lambda r: r["score"], reverse=True)
+
+    def search_passages(
+        self,
+        embedding: List[float],
+        k: int = 5,
+        embedding_model: str = None,
+        passages_per_item: int = 2,
+    ) -> List[Dict]:
+        """
+        Context items ranked by their best-matching chunk
+
+        Args:
+            embedding: Query vector
+            k: Number of items to return
+            embedding_model: Model the query came from
+            passages_per_item: Matching passages to return per item
+
+        Returns:
+            Item dicts (without content or embedding) with "score" (the max
+            chunk similarity) and "passages" ([{"content", "start_char",
+            "end_char", "score"}], best first), best item first
+        """
+        # over-fetch: several of the top chunks usually belong to one item
+        hits = self._index(embedding_model, "context-chunks").search(embedding, k * 8)
+        if not hits:
+            return []
+
+        scores = {int(key): score for key, score in hits}
+        placeholders = ",".join("?" * len(scores))
+        chunk_rows = db.q(
+            f"SELECT id, context_id, content, start_char, end_char "
+            f"FROM context_chunks WHERE id IN ({placeholders})",
+            list(scores),
+        )
+        by_item: Dict[int, List[Dict]] = {}
+        for chunk in chunk_rows:
+            chunk["score"] = scores.pop(chunk["id"])
+            by_item.setdefault(chunk.pop("context_id"), []).append(chunk)
+
+        ranked = sorted(
+            by_item.items(), key=lambda item: max(c["score"] for c in item[1]), reverse=True
+        )[:k]
+        if not ranked:
+            return []
+        placeholders = ",".join("?" * len(ranked))
+        items = {
+            r["id"]: r
+            for r in db.q(
+                f"SELECT id, source, ref_id, title, url, embedding_model, added_at "
+                f"FROM contexts WHERE id IN ({placeholders})",
+                [context_id for context_id, _ in ranked],
+            )
+        }
+
+        results = []
+        for context_id, chunks in ranked:
+            if context_id not in items:
+                continue
+            chunks.sort(key=lambda c: c["score"], reverse=True)
+            for chunk in chunks:
+                del chunk["id"]
+            results.append(
+                {
+                    **items[context_id],
+                    "score": chunks[0]["score"],
+                    "passages": chunks[:passages_per_item],
+                }
+            )
+        return results
 
 
 # Singleton accessor
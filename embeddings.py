@@ -1,35 +1,405 @@
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
 import numpy as np
+from fasthtml.common import database
+
+from cache import LRUCache
+
+EMBEDDING_CACHE_PATH = "data/embeddings.db"
+MAX_EMBEDDING_CHARS = 8000  # OpenAI's token limit buffer
+MAX_BATCH_SIZE = 256  # inputs per embeddings request
+MAX_BATCH_TOKENS = 100_000  # estimated tokens per embeddings request
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and truncate; cache keys and API inputs both use this."""
+    return " ".join((text or "").split())[:MAX_EMBEDDING_CHARS]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Embedding vectors keyed by (model, sha256 of normalized text).
+
+    An in-memory LRU sits in front of a SQLite store of float32 BLOBs, so a
+    repeated text costs no API call and, once warm, no disk read either.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, memory_size: int = 4096):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = database(path)
+        self.table = self.db.t.embedding_cache
+        if self.table not in self.db.t:
+            self.table.create(
+                dict(
+                    model=str,
+                    text_hash=str,  # sha256 of the normalized text
+                    dim=int,
+                    vector=bytes,  # float32 little-endian
+                    created_at=str,
+                ),
+                pk=("model", "text_hash"),
+            )
+        self.memory = LRUCache(memory_size)
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Cached vector for already-normalized text, or None."""
+        return self.get_many(model, [text]).get(text)
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for already-normalized texts (one disk query per 500 misses)."""
+        found: Dict[str, np.ndarray] = {}
+        pending: Dict[str, str] = {}
+        for text in texts:
+            key = (model, text_hash(text))
+            vector = self.memory.get(key)
+            if vector is not None:
+                found[text] = vector
+            else:
+                pending[key[1]] = text
+
+        hashes = list(pending)
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self.db.q(
+                f"SELECT text_hash, vector FROM embedding_cache "
+                f"WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *chunk],
+            )
+            for row in rows:
+                vector = np.frombuffer(row["vector"], dtype="<f4")
+                self.memory.set((model, row["text_hash"]), vector)
+                found[pending[row["text_hash"]]] = vector
+                self.disk_hits += 1
+
+        self.misses += len(set(texts) - set(found))
+        return found
+
+    def set_many(self, model: str, items: Dict[str, List[float]]):
+        """Store vectors for already-normalized texts in one transaction."""
+        if not items:
+            return
+        created_at = datetime.now().isoformat()
+        rows = []
+        for text, embedding in items.items():
+            vector = np.asarray(embedding, dtype="<f4")
+            digest = text_hash(text)
+            self.memory.set((model, digest), vector)
+            rows.append((model, digest, vector.size, vector.tobytes(), created_at))
+        with self.db.conn:
+            self.db.conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache "
+                "(model, text_hash, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def stats(self) -> Dict:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + self.disk_hits + self.misses
+        return {
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (memory["hits"] + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_size": memory["size"],
+            "stored": self.db.q("SELECT COUNT(*) AS n FROM embedding_cache")[0]["n"],
+        }
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
+
+
+class EmbeddingProvider(ABC):
+    """A source of embedding vectors.
+
+    model_id tags every vector it produces (cache keys, stored vectors,
+    indexes) so vectors from different models are never compared.
+    """
+
+    model_id: str
+    max_batch_size: int = MAX_BATCH_SIZE
+    max_batch_tokens: int = MAX_BATCH_TOKENS
+    max_workers: int = 4
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        """Embed one batch; return vectors in input order and tokens billed."""
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API (text-embedding-3-small by default)."""
+
+    def __init__(self, model: str = OPENAI_EMBEDDING_MODEL, client=None):
+        # OpenAI vectors keep the bare model name as their id (existing cache keys)
+        self.model_id = model
+        self.model = model
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from config import openai_client
+
+            self._client = openai_client
+        return self._client
+
+    @property
+    def available(self) -> bool:
+        return bool(self.client)
+
+    def embed(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        response = self.client.embeddings.create(input=texts, model=self.model)
+        data = sorted(response.data, key=lambda item: item.index)
+        return [item.embedding for item in data], response.usage.total_tokens
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """sentence-transformers model on the local CPU.
+
+    The model is loaded lazily, once per process; encode calls are serialized
+    and torch is capped at `threads` threads so embedding never takes over
+    the web server's cores.
+    """
+
+    max_batch_size = 64
+    max_workers = 1
+
+    _models: Dict[str, object] = {}
+    _load_lock = threading.Lock()
+
+    def __init__(self, model: str = None, threads: int = None):
+        if model is None or threads is None:
+            from config import local_embedding_model, local_embedding_threads
+
+            model = model or local_embedding_model
+            threads = threads or local_embedding_threads
+        self.model = model
+        self.model_id = f"local:{model}"
+        self.threads = threads
+        self._encode_lock = threading.Lock()
+
+    def _load(self):
+        with self._load_lock:
+            if self.model not in self._models:
+                import torch
+                from sentence_transformers import SentenceTransformer
+
+                torch.set_num_threads(self.threads)
+                start = time.perf_counter()
+                self._models[self.model] = SentenceTransformer(self.model, device="cpu")
+                print(
+                    f"✅ Loaded local embedding model {self.model} "
+                    f"({time.perf_counter() - start:.1f}s)"
+                )
+            return self._models[self.model]
+
+    @property
+    def available(self) -> bool:
+        try:
+            import sentence_transformers  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def embed(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        model = self._load()
+        with self._encode_lock:
+            vectors = model.encode(
+                texts,
+                batch_size=self.max_batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        return vectors.astype(np.float32).tolist(), 0
+
+
+_providers: Dict[str, EmbeddingProvider] = {}
+
+
+def get_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """Get a process-wide embedding provider.
+
+    Args:
+        name: 'openai', 'local' or 'auto'; defaults to EMBEDDING_PROVIDER.
+            'auto' uses OpenAI when a key is configured, else the local model.
+    """
+    if name is None:
+        from config import embedding_provider
+
+        name = embedding_provider
+    if name == "auto":
+        from config import openai_client
+
+        name = "openai" if openai_client else "local"
+    if name not in _providers:
+        if name == "openai":
+            _providers[name] = OpenAIEmbeddingProvider()
+        elif name == "local":
+            _providers[name] = LocalEmbeddingProvider()
+        else:
+            raise ValueError(f"unknown embedding provider: {name}")
+    return _providers[name]
+
+
+def _resolve_provider(model: Optional[str], client, provider) -> EmbeddingProvider:
+    if provider is not None:
+        return provider
+    if client is not None or model is not None:
+        # an explicit OpenAI model/client pins the vectors to that model
+        return OpenAIEmbeddingProvider(model or OPENAI_EMBEDDING_MODEL, client)
+    return get_embedding_provider()
+
+
+def get_embedding(
+    text: str,
+    model: Optional[str] = None,
+    provider: Optional[EmbeddingProvider] = None,
+) -> Tuple[List[float], int]:
+    """Return embedding vector and token count for given text.
+
+    Served from the embedding cache when possible; the token count is 0 then,
+    since no API call was made. Pass model= to pin an OpenAI model (e.g. to
+    query an index built with it); otherwise the configured provider is used.
+    """
+    vectors, token_count = get_embeddings([text], model=model, provider=provider)
+    return vectors[0], token_count
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-bound token estimate (~3 characters per token)."""
+    return len(text) // 3 + 1
+
+
+def pack_batches(
+    texts: List[str],
+    max_batch_size: int = MAX_BATCH_SIZE,
+    max_batch_tokens: int = MAX_BATCH_TOKENS,
+) -> List[List[str]]:
+    """Split texts into consecutive batches bounded by count and estimated tokens."""
+    batches: List[List[str]] = []
+    batch: List[str] = []
+    batch_tokens = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if batch and (len(batch) >= max_batch_size or batch_tokens + tokens > max_batch_tokens):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _embed_batch(
+    provider: EmbeddingProvider, batch: List[str], max_retries: int
+) -> Tuple[List[List[float]], int]:
+    """One provider call with exponential backoff; vectors in batch order."""
+    for attempt in range(max_retries + 1):
+        try:
+            return provider.embed(batch)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = min(2 ** attempt, 20) * (0.5 + random.random())
+            print(f"⚠️ Embedding batch failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def get_embeddings(
+    texts: List[str],
+    model: Optional[str] = None,
+    client=None,
+    provider: Optional[EmbeddingProvider] = None,
+    max_batch_size: Optional[int] = None,
+    max_batch_tokens: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    max_retries: int = 3,
+) -> Tuple[List[List[float]], int]:
+    """Return embeddings for many texts, in input order, and the tokens spent.
+
+    Cached texts are served from the embedding cache; the rest are
+    deduplicated, packed into requests by count and estimated tokens and sent
+    concurrently. Empty texts, and texts whose batch failed after retries,
+    get an empty list.
+
+    model/client pin an OpenAI model; provider picks any backend; with none
+    of them the configured default provider is used.
+    """
+    provider = _resolve_provider(model, client, provider)
+    normalized = [normalize_text(text) for text in texts]
+    unique = list(dict.fromkeys(text for text in normalized if text))
+    if not unique:
+        return [[] for _ in texts], 0
+
+    cache = get_embedding_cache()
+    vectors: Dict[str, List[float]] = {
+        text: vector.tolist()
+        for text, vector in cache.get_many(provider.model_id, unique).items()
+    }
+    missing = [text for text in unique if text not in vectors]
+
+    token_count = 0
+    if missing:
+        if not provider.available:
+            print(f"⚠️ Embedding provider {provider.model_id} not available")
+        else:
+            batches = pack_batches(
+                missing,
+                max_batch_size or provider.max_batch_size,
+                max_batch_tokens or provider.max_batch_tokens,
+            )
+            workers = min(max_workers or provider.max_workers, len(batches))
+            fresh: Dict[str, List[float]] = {}
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(_embed_batch, provider, batch, max_retries)
+                    for batch in batches
+                ]
+                for batch, future in zip(batches, futures):
+                    try:
+                        embeddings, tokens = future.result()
+                    except Exception as e:
+                        print(f"❌ Failed to embed batch of {len(batch)} texts: {e}")
+                        continue
+                    fresh.update(zip(batch, embeddings))
+                    token_count += tokens
 
+            cache.set_many(provider.model_id, fresh)
+            vectors.update(fresh)
+            print(
+                f"✅ Generated {len(fresh)} embeddings with {provider.model_id} in "
+                f"{len(batches)} requests ({token_count} tokens, "
+                f"{len(unique) - len(missing)} cached)"
+            )
 
-def get_embedding(text: str, model: str = "text-embedding-3-small") -> Tuple[List[float], int]:
-    """Return OpenAI embedding vector and token count for given text."""
-    from config import openai_client
-    
-    if not openai_client:
-        print("⚠️ OpenAI client not available for embeddings")
-        return [], 0
-    
-    try:
-        # Clean and truncate text if needed
-        text = text.replace("\n", " ").strip()
-        if len(text) > 8000:  # OpenAI's token limit buffer
-            text = text[:8000]
-        
-        response = openai_client.embeddings.create(
-            input=text,
-            model=model
-        )
-        
-        embedding = response.data[0].embedding
-        token_count = response.usage.total_tokens
-        
-        print(f"✅ Generated OpenAI embedding ({token_count} tokens)")
-        return embedding, token_count
-        
-    except Exception as e:
-        print(f"❌ Failed to generate OpenAI embedding: {e}")
-        return [], 0
+    return [vectors.get(text, []) if text else [] for text in normalized], token_count
 
 
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
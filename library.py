@@ -2,6 +2,7 @@ import re
 from datetime import datetime
 from fasthtml.common import *
 from models import db, users, library, User, LibraryItem
+from services.user_profile_service import schedule_profile_update
 
 def library_page(session):
     """User's library page"""
@@ -150,6 +151,7 @@ def add_paper(arxiv_url: str, notes: str = "", session=None):
         )
         print(f"Insert result: {result}")
         print("Paper added successfully!")
+        schedule_profile_update(user_id, arxiv_id)
     except Exception as e:
         print(f"Error adding paper: {e}")
         import traceback
@@ -172,6 +174,7 @@ def remove_paper(item_id: int, session):
     
     # Remove the item
     library.delete(item_id)
+    schedule_profile_update(user_id, item.arxiv_id, removed=True)
     
     # Return updated library
     user_library = library(where=f"user_id = '{user_id}'")
@@ -19,6 +19,9 @@ from routes.library_routes import register_library_routes
 from routes.paper_routes import register_paper_routes
 from routes.scratchpad_routes import register_scratchpad_routes
 from routes.context_routes import register_context_routes
+from routes.citation_routes import register_citation_routes
+from services.scraper_scheduler import start_scraper_scheduler
+from services.citation_resolver import start_resolution_index_build
 
 # Create static directory if it doesn't exist
 os.makedirs("static", exist_ok=True)
@@ -50,6 +53,12 @@ register_library_routes(rt)
 register_paper_routes(rt)
 register_scratchpad_routes(rt)
 register_context_routes(rt)
+register_citation_routes(rt)
+
+# Load persisted scraper indexes and keep them fresh in the background
+app.add_event_handler("startup", start_scraper_scheduler)
+# Build the citation title index off the request path
+app.add_event_handler("startup", start_resolution_index_build)
 
 if __name__ == "__main__":
     serve(host="localhost", port=5002)
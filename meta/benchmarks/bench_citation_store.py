@@ -0,0 +1,157 @@
+"""
+Benchmark citation analysis storage: per-row inserts vs one bulk transaction.
+
+Builds a synthetic survey paper (many citations, many cited papers) and times
+the legacy per-row write path against CitationAnalysisService's batched path
+(metadata cache, edges, materialized payloads and ranked paper rows), on a
+temporary database. The metrics come from _calculate_citation_metrics, as in
+a real analysis. Row counts are checked after each store, since the service
+logs and swallows store errors.
+
+usage: python meta/benchmarks/bench_citation_store.py [--citations 3000] [--papers 800]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO_ROOT)
+
+
+def make_survey(citation_service, n_citations: int, n_papers: int):
+    cited_ids = [f"2{random.randint(100, 412):03d}.{i:05d}" for i in range(n_papers)]
+    citations = []
+    for i in range(n_citations):
+        key = f"ref{i % n_papers}"
+        citations.append(
+            {
+                "citation_key": key,
+                "citation_context": "as shown in prior work " * 4,
+                "citation_command": "citep",
+                "raw_reference": f"Author et al. Some title number {i}. arXiv:{cited_ids[i % n_papers]}",
+                "file_name": "main.tex",
+                "line_number": i,
+                "resolved_arxiv_id": cited_ids[i % n_papers],
+                "confidence_score": 1.0,
+                "resolution_method": "arxiv_pattern",
+            }
+        )
+    metadata = [
+        {
+            "arxiv_id": arxiv_id,
+            "title": f"Paper {arxiv_id}",
+            "authors": '["A. Author"]',
+            "abstract": "abstract " * 50,
+            "categories": '["cs.LG"]',
+            "published_date": "2023-01-01T00:00:00Z",
+            "updated_date": "",
+            "doi": "",
+            "journal_ref": "",
+            "comment": "",
+            "fetched_at": datetime.now().isoformat(),
+            "is_active": True,
+        }
+        for arxiv_id in cited_ids
+    ]
+    metadata_by_id = {m["arxiv_id"]: m for m in metadata}
+    analysis = {
+        "citations": citations,
+        "metadata": metadata_by_id,
+        "metrics": citation_service._calculate_citation_metrics(citations, metadata_by_id),
+        "citation_data": {},
+    }
+    return analysis, metadata
+
+
+def check_stored(models, arxiv_id: str, edges: int, papers: int = None):
+    """Fail loudly if a store did not write what it should have"""
+    stored_edges = models.db.q(
+        "SELECT COUNT(*) AS n FROM citations_network WHERE citing_paper_id = ?", [arxiv_id]
+    )[0]["n"]
+    assert stored_edges == edges, f"{arxiv_id}: {stored_edges} edges stored, expected {edges}"
+    if papers is not None:
+        stored_papers = models.db.q(
+            "SELECT COUNT(*) AS n FROM citation_analysis_papers WHERE arxiv_id = ?", [arxiv_id]
+        )[0]["n"]
+        assert stored_papers == papers, (
+            f"{arxiv_id}: {stored_papers} ranked papers stored, expected {papers}"
+        )
+
+
+def legacy_store(models, arxiv_id, analysis, metadata):
+    """Write path before the bulk rewrite: one statement (and commit) per row"""
+    for record in metadata:
+        models.papers_metadata.upsert(record, pk="arxiv_id")
+    models.papers_citation_analysis.upsert(
+        {"arxiv_id": arxiv_id, "analysis_data": "{}", "computed_at": ""}, pk="arxiv_id"
+    )
+    for citation in analysis["citations"]:
+        record = {
+            "citing_paper_id": arxiv_id,
+            "cited_paper_id": citation["resolved_arxiv_id"],
+            "citation_key": citation["citation_key"],
+            "citation_context": citation["citation_context"],
+            "citation_command": citation["citation_command"],
+            "raw_reference": citation["raw_reference"],
+            "confidence_score": citation["confidence_score"],
+            "resolved_at": datetime.now().isoformat(),
+            "file_name": citation["file_name"],
+            "line_number": citation["line_number"],
+        }
+        try:
+            models.citations_network.insert(record)
+        except Exception:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark citation analysis writes.")
+    parser.add_argument("--citations", type=int, default=3000)
+    parser.add_argument("--papers", type=int, default=800)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        os.makedirs("data")
+        import models
+        from services.citation_service import _influence_state, citation_service
+
+        analysis, metadata = make_survey(citation_service, args.citations, args.papers)
+        # one edge per distinct (cited paper, citation key)
+        expected_edges = len(
+            {(c["resolved_arxiv_id"], c["citation_key"]) for c in analysis["citations"]}
+        )
+
+        start = time.perf_counter()
+        legacy_store(models, "legacy.00001", analysis, metadata)
+        legacy_s = time.perf_counter() - start
+        check_stored(models, "legacy.00001", expected_edges)
+
+        models.db.execute("DELETE FROM papers_metadata")
+        start = time.perf_counter()
+        citation_service._cache_metadata_batch(metadata)
+        asyncio.run(citation_service._store_citation_analysis("bulk.00001", analysis))
+        bulk_s = time.perf_counter() - start
+        check_stored(models, "bulk.00001", expected_edges, len(metadata))
+
+        # the PageRank update the store queued runs in the background; let it
+        # finish before the temporary database goes away
+        while _influence_state["running"]:
+            time.sleep(0.05)
+
+    rows = args.citations + args.papers
+    print(f"survey: {args.citations} citations, {args.papers} cited papers")
+    print(f"legacy per-row : {legacy_s:8.3f}s  ({rows / legacy_s:10.0f} rows/s)")
+    print(f"bulk one-txn   : {bulk_s:8.3f}s  ({rows / bulk_s:10.0f} rows/s)")
+    print(f"speedup        : {legacy_s / bulk_s:8.1f}x")
+    print(f"edges stored   : {expected_edges} per analysis")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark embedding throughput: one request per text vs batched get_embeddings.
+
+Starts a local fake OpenAI-compatible /v1/embeddings server (in a separate
+process) with a fixed per-request latency, points an OpenAI client at it and embeds the same corpus
+both ways; get_embeddings runs against a fresh temporary embedding cache.
+
+usage: python meta/benchmarks/bench_embeddings.py [--texts 2000] [--latency-ms 80]
+"""
+
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO_ROOT)
+
+DIM = 1536
+VECTOR = np.random.default_rng(0).standard_normal(DIM).astype(np.float32)
+# the OpenAI client asks for base64 by default, like the real API returns
+VECTOR_JSON = {
+    "float": json.dumps(VECTOR.round(6).tolist()),
+    "base64": json.dumps(base64.b64encode(VECTOR.tobytes()).decode()),
+}
+
+
+def make_handler(latency_s: float, stats):
+    class FakeEmbeddingHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            time.sleep(latency_s)
+            with stats.get_lock():
+                stats.value += 1
+
+            # canned vector so the fake server's own JSON encoding stays cheap
+            vector_json = VECTOR_JSON[body.get("encoding_format") or "float"]
+            items = ",".join(
+                f'{{"object":"embedding","index":{i},"embedding":{vector_json}}}'
+                for i in range(len(inputs))
+            )
+            tokens = sum(len(t) // 4 for t in inputs)
+            data = (
+                f'{{"object":"list","model":"{body["model"]}","data":[{items}],'
+                f'"usage":{{"prompt_tokens":{tokens},"total_tokens":{tokens}}}}}'
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return FakeEmbeddingHandler
+
+
+def serve(latency_s: float, stats, ports):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency_s, stats))
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark batched embeddings.")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--sequential-sample", type=int, default=200)
+    args = parser.parse_args()
+
+    # separate process so the fake server does not share our GIL
+    stats = multiprocessing.Value("i", 0)
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve, args=(args.latency_ms / 1000, stats, ports), daemon=True
+    )
+    server.start()
+    port = ports.get(timeout=30)
+
+    from openai import OpenAI
+
+    client = OpenAI(
+        api_key="fake", base_url=f"http://127.0.0.1:{port}/v1"
+    )
+    texts = [f"post {i}: " + "some scraped article text " * (5 + i % 40) for i in range(args.texts)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import embeddings
+
+        # per-text baseline (the old get_embedding path) on a sample, extrapolated
+        sample = texts[: args.sequential_sample]
+        start = time.perf_counter()
+        for text in sample:
+            client.embeddings.create(input=embeddings.normalize_text(text), model="m")
+        sequential_s = (time.perf_counter() - start) * len(texts) / len(sample)
+
+        embeddings._embedding_cache = embeddings.EmbeddingCache(os.path.join(tmp, "batch.db"))
+        stats.value = 0
+        start = time.perf_counter()
+        vectors, _ = embeddings.get_embeddings(texts, model="m", client=client)
+        batched_s = time.perf_counter() - start
+        batched_requests = stats.value
+
+        start = time.perf_counter()
+        embeddings.get_embeddings(texts, model="m", client=client)
+        cached_s = time.perf_counter() - start
+
+    server.terminate()
+    assert all(len(v) == DIM for v in vectors)
+
+    print(f"corpus: {len(texts)} texts, {args.latency_ms:.0f}ms per request")
+    print(f"one request/text : {sequential_s:8.2f}s  ({len(texts) / sequential_s:8.0f} texts/s, extrapolated)")
+    print(f"get_embeddings   : {batched_s:8.2f}s  ({len(texts) / batched_s:8.0f} texts/s, {batched_requests} requests)")
+    print(f"cached repeat    : {cached_s:8.2f}s  ({len(texts) / cached_s:8.0f} texts/s, 0 requests)")
+    print(f"speedup          : {sequential_s / batched_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
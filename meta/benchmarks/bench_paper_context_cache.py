@@ -0,0 +1,178 @@
+"""
+Benchmark prompt caching of the paper context across AI replies, against a
+local stub of the Anthropic Messages API (no API key or network needed).
+
+The stub streams a short reply and reports usage the way the real API does
+with prompt caching: the prefix up to the last cache_control block (tools,
+system prompt and messages) is billed as cache_creation_input_tokens the
+first time it is seen and as cache_read_input_tokens afterwards; everything
+after it is plain input_tokens. A document block counts as --paper-tokens.
+
+Each of --papers papers gets --replies notes answered through
+services.ai_service.stream_ai_reply, as the scratchpad ai-reply route does.
+
+usage: python meta/benchmarks/bench_paper_context_cache.py [--papers 3] [--replies 5] [--paper-tokens 30000]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO_ROOT)
+
+import uvicorn  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.responses import StreamingResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+# cache reads are billed at a tenth of the base input price, writes at 1.25x
+CACHE_READ_PRICE = 0.1
+CACHE_WRITE_PRICE = 1.25
+
+
+def estimate_tokens(block, paper_tokens: int) -> int:
+    if isinstance(block, dict) and block.get("type") == "document":
+        return paper_tokens
+    return max(1, len(json.dumps(block)) // 4)
+
+
+def stub_app(paper_tokens: int) -> Starlette:
+    """Streaming /v1/messages with prefix-hash prompt caching"""
+    seen_prefixes = set()
+
+    def event(kind, data):
+        return f"event: {kind}\ndata: {json.dumps({'type': kind, **data})}\n\n"
+
+    async def messages(request):
+        body = await request.json()
+        blocks = [{"tools": body.get("tools", [])}, {"system": body.get("system", "")}]
+        for message in body["messages"]:
+            content = message["content"]
+            blocks += content if isinstance(content, list) else [content]
+
+        # prefix ends at the last cache breakpoint
+        breakpoint = max(
+            (i for i, b in enumerate(blocks) if isinstance(b, dict) and "cache_control" in b),
+            default=-1,
+        )
+        prefix_tokens = sum(estimate_tokens(b, paper_tokens) for b in blocks[: breakpoint + 1])
+        rest_tokens = sum(estimate_tokens(b, paper_tokens) for b in blocks[breakpoint + 1 :])
+        usage = {"input_tokens": rest_tokens, "output_tokens": 1}
+        usage["cache_read_input_tokens"] = usage["cache_creation_input_tokens"] = 0
+        if breakpoint >= 0:
+            key = hashlib.sha256(
+                json.dumps([body["model"], blocks[: breakpoint + 1]], sort_keys=True).encode()
+            ).hexdigest()
+            hit = key in seen_prefixes
+            seen_prefixes.add(key)
+            usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = prefix_tokens
+        else:
+            usage["input_tokens"] += prefix_tokens
+
+        words = "This note relates to the method section of the paper.".split()
+
+        async def stream():
+            message = {
+                "id": "msg_stub",
+                "type": "message",
+                "role": "assistant",
+                "model": body["model"],
+                "content": [],
+                "stop_reason": None,
+                "stop_sequence": None,
+                "usage": usage,
+            }
+            yield event("message_start", {"message": message})
+            yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            for word in words:
+                await asyncio.sleep(0.005)
+                yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": word + " "}})
+            yield event("content_block_stop", {"index": 0})
+            yield event(
+                "message_delta",
+                {"delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": len(words)}},
+            )
+            yield event("message_stop", {})
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route("/v1/messages", messages, methods=["POST"])])
+
+
+def start_stub(paper_tokens: int) -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(stub_app(paper_tokens), port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+async def run(args):
+    from services.ai_service import stream_ai_reply
+    from services.paper_context_service import get_paper_context_manager
+
+    billed = uncached = 0.0
+    print(f"{'paper':>12} {'reply':>5} {'input':>7} {'cache write':>12} {'cache read':>11} {'first token':>12}")
+    for p in range(args.papers):
+        paper_id = f"2401.{p:05d}v1"
+        notes = []
+        for r in range(args.replies):
+            note = f"note {r}: how does the ablation in section {r + 2} support the main claim?"
+            async for event in stream_ai_reply(note, paper_id=paper_id, scratchpad_context="\n".join(notes)):
+                if event["type"] == "done":
+                    usage, latency = event["metadata"]["usage"], event["metadata"]["latency_ms"]
+            notes.append(note)
+            billed += (
+                usage["input_tokens"]
+                + CACHE_WRITE_PRICE * usage["cache_creation_input_tokens"]
+                + CACHE_READ_PRICE * usage["cache_read_input_tokens"]
+            )
+            uncached += (
+                usage["input_tokens"] + usage["cache_creation_input_tokens"] + usage["cache_read_input_tokens"]
+            )
+            print(
+                f"{paper_id:>12} {r:>5} {usage['input_tokens']:>7,} {usage['cache_creation_input_tokens']:>12,} "
+                f"{usage['cache_read_input_tokens']:>11,} {latency['first_token']:>10}ms"
+            )
+
+    stats = get_paper_context_manager().stats()
+    print(
+        f"\nblocks built {stats['builds']}, replies {stats['replies']}, cache hits {stats['cache_hits']}, "
+        f"cache read ratio {stats['cache_read_ratio']}"
+    )
+    print(f"input cost (base-price tokens): {billed:,.0f} cached vs {uncached:,.0f} without caching")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark paper context prompt caching.")
+    parser.add_argument("--papers", type=int, default=3)
+    parser.add_argument("--replies", type=int, default=5)
+    parser.add_argument("--paper-tokens", type=int, default=30000)
+    args = parser.parse_args()
+
+    os.environ["ANTHROPIC_BASE_URL"] = start_stub(args.paper_tokens)
+    os.environ.setdefault("ANTHROPIC_API_KEY", "stub")
+
+    # claudette passes temperature; anthropic SDKs that dropped it from
+    # messages.stream() would reject the call before it reaches the stub
+    from anthropic.resources.messages import AsyncMessages
+
+    stream = AsyncMessages.stream
+    if "temperature" not in stream.__code__.co_varnames:
+        AsyncMessages.stream = lambda self, temperature=None, **kwargs: stream(self, **kwargs)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark int8 quantized vector storage: memory footprint per representation
+and recall@k / latency of the quantized first pass (with and without float32
+re-ranking) against an exact float32 scan.
+
+Vectors are clustered like bench_vector_index.py. Both a flat index (below
+the training threshold) and a trained IVF index are measured.
+
+usage: python meta/benchmarks/bench_quantized_index.py [--size 50000] [--dim 1536] [--rerank 1,2,4,8]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO_ROOT)
+
+from vector_index import VectorIndex  # noqa: E402
+
+
+def clustered(rng, centres, n, spread):
+    rows = centres[rng.integers(0, len(centres), n)]
+    return (rows + spread * rng.standard_normal(rows.shape, dtype=np.float32)).astype(np.float32)
+
+
+def list_bytes(vector) -> int:
+    """Memory of one embedding held as a Python list of floats"""
+    as_list = vector.tolist()
+    return sys.getsizeof(as_list) + sum(sys.getsizeof(x) for x in as_list)
+
+
+def measure(index, queries, truth, k, rerank):
+    hits = 0
+    start = time.perf_counter()
+    results = [index.search(query, k, rerank=rerank) for query in queries]
+    latency_ms = (time.perf_counter() - start) * 1e3 / len(queries)
+    for found, expected in zip(results, truth):
+        hits += len({key for key, _ in found} & expected)
+    return hits / (k * len(queries)), latency_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark quantized vector storage.")
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=300)
+    parser.add_argument("--spread", type=float, default=0.04)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank", default="1,2,4,8")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    data = clustered(rng, centres, args.size, args.spread)
+    queries = clustered(rng, centres, args.queries, args.spread)
+    keys = [str(i) for i in range(args.size)]
+
+    sample = data[:200]
+    per_vector = {
+        "python list": np.mean([list_bytes(v) for v in sample]),
+        "JSON text": np.mean([len(json.dumps(v.tolist())) for v in sample]),
+        "float32": args.dim * 4,
+        "int8 + scale": args.dim + 4,
+    }
+    print(f"{args.size:,} vectors, dim {args.dim}, top {args.k}, {args.queries} queries")
+    print(f"{'storage':>14} {'bytes/vector':>13} {'total':>10} {'vs float32':>11}")
+    for name, size in per_vector.items():
+        print(
+            f"{name:>14} {size:>13,.0f} {size * args.size / 2**20:>8.1f}MB "
+            f"{size / per_vector['float32']:>10.2f}x"
+        )
+
+    rerank_factors = [int(r) for r in args.rerank.split(",")]
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, threshold in (("flat", args.size + 1), ("ivf", 2048)):
+            index = VectorIndex(os.path.join(tmp, label), train_threshold=threshold)
+            for offset in range(0, args.size, 50000):
+                index.add(keys[offset : offset + 50000], data[offset : offset + 50000])
+
+            truth = [{key for key, _ in index.exact_search(q, args.k)} for q in queries]
+            print(f"\n{label} index" + (f" ({index.nlist} lists, nprobe {index.nprobe})" if index.nlist else ""))
+            print(f"{'first pass':>22} {'recall@' + str(args.k):>10} {'latency':>10}")
+            recall, latency = measure(index, queries, truth, args.k, rerank=0)
+            print(f"{'float32':>22} {recall:>10.3f} {latency:>8.2f}ms")
+            for factor in rerank_factors:
+                recall, latency = measure(index, queries, truth, args.k, rerank=factor)
+                name = "int8 only" if factor == 1 else f"int8, re-rank {factor}k"
+                print(f"{name:>22} {recall:>10.3f} {latency:>8.2f}ms")
+            del index
+
+
+if __name__ == "__main__":
+    main()
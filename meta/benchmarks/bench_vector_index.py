@@ -0,0 +1,94 @@
+"""
+Benchmark the persisted IVF-flat vector index: recall@k and latency against
+exact search, plus bulk build and incremental insert throughput.
+
+Vectors are drawn around random cluster centres (embeddings of real text are
+clustered by topic, unlike uniform random vectors). Queries are fresh draws
+from the same distribution. The index is written to a temporary directory.
+
+usage: python meta/benchmarks/bench_vector_index.py [--size 200000] [--dim 256] [--nprobe 1,4,8,16,32]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO_ROOT)
+
+from vector_index import VectorIndex  # noqa: E402
+
+
+def clustered(rng, centres, n, spread):
+    rows = centres[rng.integers(0, len(centres), n)]
+    return (rows + spread * rng.standard_normal(rows.shape, dtype=np.float32)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the vector index.")
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--spread", type=float, default=0.08)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="1,4,8,16,32")
+    parser.add_argument("--inserts", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    data = clustered(rng, centres, args.size, args.spread)
+    queries = clustered(rng, centres, args.queries, args.spread)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(os.path.join(tmp, "bench"))
+        start = time.perf_counter()
+        for offset in range(0, args.size, 50000):
+            chunk = data[offset : offset + 50000]
+            index.add([str(i) for i in range(offset, offset + len(chunk))], chunk)
+        build_s = time.perf_counter() - start
+
+        extra = clustered(rng, centres, args.inserts, args.spread)
+        start = time.perf_counter()
+        for i, vector in enumerate(extra):
+            index.add([f"new-{i}"], vector[None, :])
+        insert_s = time.perf_counter() - start
+
+        # a second handle, as another worker process would open it
+        reader = VectorIndex(index.path)
+        truth = []
+        start = time.perf_counter()
+        for query in queries:
+            truth.append({key for key, _ in reader.exact_search(query, args.k)})
+        exact_ms = (time.perf_counter() - start) * 1e3 / len(queries)
+
+        print(
+            f"{len(reader):,} vectors, dim {args.dim}, {reader.nlist} lists, "
+            f"top {args.k}, {len(queries)} queries"
+        )
+        print(f"bulk build       : {build_s:8.2f}s ({args.size / build_s:,.0f} vectors/s, incl. training)")
+        print(f"single inserts   : {insert_s / args.inserts * 1e3:8.2f}ms each")
+        print(f"{'search':>12} {'recall@' + str(args.k):>10} {'latency':>10} {'speedup':>9}")
+        print(f"{'exact':>12} {1.0:>10.3f} {exact_ms:>8.2f}ms {1.0:>8.1f}x")
+        for nprobe in [int(n) for n in args.nprobe.split(",")]:
+            hits = 0
+            start = time.perf_counter()
+            results = [reader.search(query, args.k, nprobe=nprobe) for query in queries]
+            search_ms = (time.perf_counter() - start) * 1e3 / len(queries)
+            for found, expected in zip(results, truth):
+                hits += len({key for key, _ in found} & expected)
+            recall = hits / (args.k * len(queries))
+            print(
+                f"{'nprobe ' + str(nprobe):>12} {recall:>10.3f} {search_ms:>8.2f}ms "
+                f"{exact_ms / search_ms:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
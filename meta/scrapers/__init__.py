@@ -1,6 +1,6 @@
 """Scraper registry to discover and use different source scrapers."""
 
-from typing import Dict, List
+from typing import Dict
 
 SCRAPER_REGISTRY: Dict[str, "BaseScraper"] = {}
 
@@ -9,6 +9,7 @@ def register_scraper(name: str):
     """Decorator to register a scraper class"""
 
     def decorator(cls):
+        cls.name = name
         SCRAPER_REGISTRY[name] = cls()
         return cls
 
@@ -1,6 +1,14 @@
+import json
+import os
+import threading
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import List, Dict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import List
+
+import requests
+
+INDEX_DIR = "data/scrapers"
 
 
 @dataclass
@@ -14,11 +22,19 @@ class ScrapedMeta:
 
 
 class BaseScraper(ABC):
-    """Abstract base class for scrapers."""
+    """Abstract base class for scrapers.
+
+    The post index is persisted to data/scrapers/<name>.json and only ever
+    refreshed by refresh_index() (see services/scraper_scheduler.py), so
+    fetch_index() never touches the network.
+    """
+
+    name: str = ""  # set by register_scraper
+    index_url: str = ""  # page listing the posts
 
     @abstractmethod
-    def fetch_index(self) -> List[ScrapedMeta]:
-        """Return a list of post metadata objects."""
+    def parse_index(self, html: str) -> List[ScrapedMeta]:
+        """Parse the index page into post metadata objects."""
 
     @abstractmethod
     def fetch_article(self, url: str) -> str:
@@ -30,6 +46,11 @@ class BaseScraper(ABC):
 
     def __init__(self):
         self.scraped_metas = []
+        self.etag = None
+        self.last_modified = None
+        self.refreshed_at = None
+        self._index_mtime = None
+        self._lock = threading.Lock()
 
     def add_scraped_meta(self, meta: ScrapedMeta):
         """Add a new ScrapedMeta object to the scraper's list."""
@@ -38,3 +59,90 @@ class BaseScraper(ABC):
     def get_scraped_metas(self) -> List[ScrapedMeta]:
         """Get the list of ScrapedMeta objects stored in the scraper."""
         return self.scraped_metas
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(INDEX_DIR, f"{self.name}.json")
+
+    def fetch_index(self) -> List[ScrapedMeta]:
+        """Return the persisted post index (reloaded if another process updated it)."""
+        self.load_index()
+        return self.scraped_metas
+
+    def load_index(self) -> bool:
+        """Load the persisted index if the file changed since we last read it."""
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._index_mtime:
+            return False
+
+        with self._lock:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.scraped_metas = [ScrapedMeta(**post) for post in data["posts"]]
+            self.etag = data.get("etag")
+            self.last_modified = data.get("last_modified")
+            self.refreshed_at = data.get("refreshed_at")
+            self._index_mtime = mtime
+        return True
+
+    def _save_index(self):
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        data = {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "refreshed_at": self.refreshed_at,
+            "posts": [asdict(meta) for meta in self.scraped_metas],
+        }
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+        self._index_mtime = os.stat(self.index_path).st_mtime_ns
+
+    def refresh_index(self) -> int:
+        """
+        Re-scrape the index page with a conditional request and merge new posts
+
+        Posts already in the index keep their place; new ones are added in
+        front (index pages list newest first), so posts that have dropped off
+        the page stay available.
+
+        Returns:
+            Number of new posts (0 when the page is unchanged)
+        """
+        self.load_index()
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        resp = requests.get(self.index_url, headers=headers, timeout=10)
+        with self._lock:
+            self.refreshed_at = datetime.now().isoformat()
+            if resp.status_code == 304:
+                self._save_index()
+                print(f"[PASS] >>> {self.name} index unchanged (304)")
+                return 0
+            resp.raise_for_status()
+
+            known = {meta.url for meta in self.scraped_metas}
+            new_metas = []
+            for meta in self.parse_index(resp.text):
+                if meta.url not in known:
+                    known.add(meta.url)
+                    new_metas.append(meta)
+
+            self.scraped_metas = new_metas + self.scraped_metas
+            self.etag = resp.headers.get("ETag")
+            self.last_modified = resp.headers.get("Last-Modified")
+            self._save_index()
+
+        print(
+            f"[PASS] >>> scraped {len(new_metas)} new posts from {self.name} "
+            f"({len(self.scraped_metas)} indexed)"
+        )
+        return len(new_metas)
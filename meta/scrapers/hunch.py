@@ -12,16 +12,14 @@ ARCHIVE_URL = BASE_URL  # homepage lists posts chronologically
 
 @register_scraper("hunch")
 class HunchScraper(BaseScraper):
+    index_url = ARCHIVE_URL
+
     def __init__(self):
         super().__init__()
 
-    def fetch_index(self) -> List[ScrapedMeta]:
-        if self.scraped_metas:
-            return self.scraped_metas  # cache
-
-        resp = requests.get(ARCHIVE_URL, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
+    def parse_index(self, html: str) -> List[ScrapedMeta]:
+        soup = BeautifulSoup(html, "html.parser")
+        metas = []
 
         # find all post articles on the main page
         articles = soup.find_all("article")
@@ -86,10 +84,9 @@ class HunchScraper(BaseScraper):
                 date=date,
                 source="hunch",
             )
-            self.scraped_metas.append(meta)
+            metas.append(meta)
 
-        print(f"[PASS] >>> scraped {len(self.scraped_metas)} posts from hunch.net")
-        return self.scraped_metas
+        return metas
 
     def fetch_article(self, url: str) -> str:
         resp = requests.get(url, timeout=10)
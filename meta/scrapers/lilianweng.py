@@ -12,16 +12,14 @@ ARCHIVE_URL = BASE_URL  # homepage already lists posts chronologically
 
 @register_scraper("lilianweng")
 class LilianWengScraper(BaseScraper):
+    index_url = ARCHIVE_URL
+
     def __init__(self):
         super().__init__()
 
-    def fetch_index(self) -> List[ScrapedMeta]:
-        if self.scraped_metas:
-            return self.scraped_metas  # cache
-
-        resp = requests.get(ARCHIVE_URL, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
+    def parse_index(self, html: str) -> List[ScrapedMeta]:
+        soup = BeautifulSoup(html, "html.parser")
+        metas = []
 
         articles = soup.find_all("article")
         for art in articles:
@@ -40,7 +38,7 @@ class LilianWengScraper(BaseScraper):
             if p_tag:
                 summary = p_tag.text.strip()
             # derive id from url
-            ref_id = re.sub(r"[^a-zA-Z0-9_-]", "", url.split("/")[-1])
+            ref_id = re.sub(r"[^a-zA-Z0-9_-]", "", url.rstrip("/").split("/")[-1])
             meta = ScrapedMeta(
                 id=ref_id,
                 title=title,
@@ -49,11 +47,8 @@ class LilianWengScraper(BaseScraper):
                 date=None,
                 source="lilianweng",
             )
-            self.scraped_metas.append(meta)
-        print(
-            f"[PASS] >>> scraped {len(self.scraped_metas)} posts from lilianweng blog"
-        )
-        return self.scraped_metas
+            metas.append(meta)
+        return metas
 
     def fetch_article(self, url: str) -> str:
         resp = requests.get(url, timeout=10)
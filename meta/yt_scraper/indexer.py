@@ -1,4 +1,5 @@
 import os
+import sys
 import argparse
 import logging
 import time
@@ -14,6 +15,11 @@ import openai
 from supabase import create_client, Client
 from tqdm import tqdm
 
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+from embeddings import get_embeddings
+
 # --- configuration ---
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 
@@ -110,12 +116,12 @@ class HybridSearch:
         if not valid_texts:
             return []
 
-        try:
-            res = self.openai_client.embeddings.create(input=valid_texts, model=model)
-            return [embedding.embedding for embedding in res.data]
-        except Exception as e:
-            logging.error(f"failed to get embeddings: {e}")
+        # shared batched + cached embedding path from the main app
+        embeddings, _ = get_embeddings(valid_texts, model=model, client=self.openai_client)
+        if not all(embeddings):
+            logging.error("failed to get embeddings for some texts")
             return []
+        return embeddings
 
     def search(self, query, videos, k, alpha):
         """perform hybrid search and return top k video ids."""
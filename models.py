@@ -97,6 +97,205 @@ if magic_auth_tokens not in db.t:
         pk="auth_id",
     )
 
+# arXiv metadata cache (populated by citation analysis)
+papers_metadata = db.t.papers_metadata
+if papers_metadata not in db.t:
+    papers_metadata.create(
+        dict(
+            arxiv_id=str,  # arXiv paper ID (e.g., "2309.15028")
+            title=str,
+            authors=str,  # JSON list of author names
+            abstract=str,
+            categories=str,  # JSON list of arXiv categories
+            published_date=str,  # ISO timestamp
+            updated_date=str,  # ISO timestamp
+            doi=str,
+            journal_ref=str,
+            comment=str,
+            fetched_at=str,  # ISO timestamp
+            is_active=bool,
+        ),
+        pk="arxiv_id",
+    )
+
+# Citation edges between papers (citing -> cited)
+citations_network = db.t.citations_network
+if citations_network not in db.t:
+    citations_network.create(
+        dict(
+            id=int,  # Auto-incrementing ID
+            citing_paper_id=str,  # arXiv ID of the citing paper
+            cited_paper_id=str,  # arXiv ID of the cited paper
+            citation_key=str,  # LaTeX citation key
+            citation_context=str,  # Surrounding text
+            citation_command=str,  # cite, citep, citet, etc.
+            raw_reference=str,  # Raw bibliography entry
+            confidence_score=float,  # Resolution confidence (0-1)
+            resolution_method=str,  # 'arxiv_pattern', 'title_index', etc.
+            resolved_at=str,  # ISO timestamp
+            file_name=str,
+            line_number=int,
+        ),
+        pk="id",
+    )
+
+try:
+    db.execute("ALTER TABLE citations_network ADD COLUMN resolution_method TEXT")
+except:
+    pass
+
+# One edge per (citing, cited, key); drop duplicates left by older inserts first
+try:
+    db.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_citations_network_edge "
+        "ON citations_network (citing_paper_id, cited_paper_id, citation_key)"
+    )
+except:
+    db.execute(
+        "DELETE FROM citations_network WHERE id NOT IN ("
+        "SELECT MIN(id) FROM citations_network "
+        "GROUP BY citing_paper_id, cited_paper_id, citation_key)"
+    )
+    db.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_citations_network_edge "
+        "ON citations_network (citing_paper_id, cited_paper_id, citation_key)"
+    )
+
+# Per-paper citation analysis results
+papers_citation_analysis = db.t.papers_citation_analysis
+if papers_citation_analysis not in db.t:
+    papers_citation_analysis.create(
+        dict(
+            arxiv_id=str,  # arXiv paper ID
+            total_citations_found=int,
+            resolved_citations=int,
+            analysis_data=str,  # JSON: {citations, metadata, metrics, citation_data}
+            influence_score=float,
+            relevance_metrics=str,  # JSON: analysis summary
+            computed_at=str,  # ISO timestamp
+            latex_parsed=bool,
+            summary_json=str,  # Pre-rendered /summary payload
+            summary_etag=str,
+            network_json=str,  # Pre-rendered /network payload
+            network_etag=str,
+        ),
+        pk="arxiv_id",
+    )
+
+for column in ["summary_json", "summary_etag", "network_json", "network_etag"]:
+    try:
+        db.execute(f"ALTER TABLE papers_citation_analysis ADD COLUMN {column} TEXT")
+    except:
+        pass
+
+# Ranked cited papers per analysis (normalized out of analysis_data)
+citation_analysis_papers = db.t.citation_analysis_papers
+if citation_analysis_papers not in db.t:
+    citation_analysis_papers.create(
+        dict(
+            arxiv_id=str,  # Citing paper (papers_citation_analysis.arxiv_id)
+            cited_paper_id=str,  # Cited arXiv paper
+            title=str,
+            authors=str,  # JSON list
+            categories=str,  # JSON list
+            abstract=str,  # Truncated abstract
+            published_date=str,
+            local_citations=int,
+            influence_score=float,
+            relevance_score=float,
+            influence_rank=int,  # 0-based rank by influence_score
+            relevance_rank=int,  # 0-based rank by relevance_score
+        ),
+        pk=("arxiv_id", "cited_paper_id"),
+    )
+
+# Global PageRank influence over the citations_network graph
+paper_influence = db.t.paper_influence
+if paper_influence not in db.t:
+    paper_influence.create(
+        dict(
+            arxiv_id=str,  # arXiv paper ID (any node in the graph)
+            pagerank=float,  # Stationary probability (sums to 1 over the graph)
+            influence_score=float,  # pagerank * number of papers (1.0 = average)
+            graph_version=int,  # Last citations_network edge id included
+            computed_at=str,  # ISO timestamp
+        ),
+        pk="arxiv_id",
+    )
+
+# Bulk metadata harvest progress (one row per harvest source/set)
+harvest_state = db.t.harvest_state
+if harvest_state not in db.t:
+    harvest_state.create(
+        dict(
+            source=str,  # e.g. 'arxiv-oai:cs'
+            watermark=str,  # YYYY-MM-DD of the last completed harvest
+            listing_from=str,  # from-date of the listing in progress
+            resumption_token=str,  # OAI-PMH token of the listing in progress
+            latest_datestamp=str,  # newest record datestamp seen in that listing
+            records_harvested=int,  # running total
+            updated_at=str,  # ISO timestamp
+        ),
+        pk="source",
+    )
+
+try:
+    db.execute("ALTER TABLE harvest_state ADD COLUMN latest_datestamp TEXT")
+except:
+    pass
+
+# Per-user recommendation profile: running sum of the (normalized) embeddings
+# of the user's library papers, one row per embedding model
+user_profiles = db.t.user_profiles
+if user_profiles not in db.t:
+    user_profiles.create(
+        dict(
+            user_id=str,  # References users.id
+            model=str,  # Embedding model id (EmbeddingProvider.model_id)
+            vector=bytes,  # float64 sum of paper embeddings
+            paper_count=int,  # Papers in the sum (centroid = vector / paper_count)
+            updated_at=str,  # ISO timestamp
+        ),
+        pk=("user_id", "model"),
+    )
+
+# Library papers currently counted in each profile
+user_profile_papers = db.t.user_profile_papers
+if user_profile_papers not in db.t:
+    user_profile_papers.create(
+        dict(
+            user_id=str,
+            model=str,
+            arxiv_id=str,
+            vector=bytes,  # float64 normalized embedding added to the profile sum
+            added_at=str,  # ISO timestamp
+        ),
+        pk=("user_id", "model", "arxiv_id"),
+    )
+
+try:
+    db.execute("ALTER TABLE user_profile_papers ADD COLUMN vector BLOB")
+except:
+    pass
+
+# Background job status, shared by every worker process so a poll can land
+# on a different worker than the one running the job
+background_jobs = db.t.background_jobs
+if background_jobs not in db.t:
+    background_jobs.create(
+        dict(
+            key=str,  # Deduplication key, e.g. 'citation-analysis:2309.15028'
+            job_id=str,
+            status=str,  # queued, running, succeeded, failed
+            submitted_at=str,  # ISO timestamp
+            started_at=str,
+            finished_at=str,
+            result=str,  # JSON
+            error=str,
+        ),
+        pk="key",
+    )
+
 # Dataclasses for easy access
 User = users.dataclass()
 LibraryItem = library.dataclass()
@@ -1,12 +1,48 @@
-from typing import List, Dict
+from typing import Callable, List, Dict, Iterator, Optional, Tuple
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import requests
 from xml.etree import ElementTree as ET
 
-from embeddings import get_embedding, cosine_similarity
+from embeddings import (
+    get_embedding,
+    get_embeddings,
+    get_embedding_provider,
+    normalize_text,
+    text_hash,
+)
+from cache import LRUCache, make_etag
+from vector_index import get_vector_index
 from meta.scrapers import SCRAPER_REGISTRY
 
+# title/abstract per arXiv id; papers do not change between recomputations
+_arxiv_meta_cache = LRUCache(maxsize=1024)
+
+# Bumped whenever the candidates or context items change; cached
+# recommendations computed at an older version are revalidated lazily
+_index_version = 0
+_index_version_lock = threading.Lock()
+
+
+def get_index_version() -> int:
+    return _index_version
+
+
+def bump_index_version(reason: str) -> int:
+    global _index_version
+    with _index_version_lock:
+        _index_version += 1
+        print(f"[INFO] recommendation index version {_index_version} ({reason})")
+        return _index_version
+
 
 def _fetch_arxiv_meta(paper_id: str) -> Dict:
+    cached = _arxiv_meta_cache.get(paper_id)
+    if cached is not None:
+        return cached
+
     url = f"https://export.arxiv.org/api/query?search_query=id:{paper_id}&max_results=1"
     resp = requests.get(url, timeout=10)
     resp.raise_for_status()
@@ -17,38 +53,573 @@ def _fetch_arxiv_meta(paper_id: str) -> Dict:
         raise ValueError("paper not found on arXiv")
     title = entry.find("atom:title", ns).text.strip().replace("\n", " ")
     summary = entry.find("atom:summary", ns).text.strip().replace("\n", " ")
-    return {"title": title, "summary": summary}
+    meta = {"title": title, "summary": summary}
+    _arxiv_meta_cache.set(paper_id, meta)
+    return meta
+
+
+class CandidateIndex:
+    """Scraped candidates backed by the persisted "candidates" vector index.
+
+    Each post is keyed by source, id and a hash of its text, so an edited post
+    gets a fresh vector. A refresh embeds and inserts only keys the index has
+    not seen; the index itself is shared by every worker process. Sources are
+    refreshed independently, so one slow scraper does not hold up the others.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.candidates: Dict[str, Dict[str, object]] = {}  # source -> {index key: meta}
+        self.fingerprints: Dict[str, Optional[int]] = {}
+        self.model_id = None  # embedding model every row was produced with
+        self.version = 0
+        self.refreshed_at = 0.0  # time.monotonic() of the last full refresh
+        self.source_refreshed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(candidates) for candidates in self.candidates.values())
+
+    def refresh_due(self, max_age: float, source: Optional[str] = None) -> bool:
+        if source is None:
+            refreshed_at = self.refreshed_at
+        else:
+            refreshed_at = self.source_refreshed_at.get(source, 0.0)
+        return time.monotonic() - refreshed_at >= max_age
+
+    def refresh(self) -> bool:
+        """Refresh every source concurrently; True if any of them changed."""
+        futures = {
+            name: _source_executor.submit(self.refresh_source, name)
+            for name in SCRAPER_REGISTRY
+        }
+        changed = False
+        for name, future in futures.items():
+            try:
+                changed |= future.result()
+            except Exception as e:
+                print(f"[ERROR] >>> scraper {name} failed: {e}")
+        self.refreshed_at = time.monotonic()
+        return changed
+
+    def refresh_source(self, source_name: str) -> bool:
+        """Re-read one scraper index; embed and index any new posts.
+
+        Raises whatever the scraper raises.
+        """
+        metas = SCRAPER_REGISTRY[source_name].fetch_index()
+        provider = get_embedding_provider()
+        texts = [meta.title + "\n" + meta.summary for meta in metas]
+        keys = [
+            f"{source_name}:{meta.id}:{text_hash(normalize_text(text))[:16]}"
+            for meta, text in zip(metas, texts)
+        ]
+        fingerprint = hash((provider.model_id, tuple(keys)))
+        self.source_refreshed_at[source_name] = time.monotonic()
+        if fingerprint == self.fingerprints.get(source_name):
+            return False
+
+        index = get_vector_index("candidates", provider.model_id)
+        index.refresh()
+        missing = [i for i, key in enumerate(keys) if key not in index.key_rows]
+        embeddings, _ = get_embeddings([texts[i] for i in missing], provider=provider)
+        embedded = [i for i, emb in zip(missing, embeddings) if emb]
+        if embedded:
+            index.add(
+                [keys[i] for i in embedded],
+                [emb for emb in embeddings if emb],
+            )
+
+        failed = len(missing) - len(embedded)
+        with self._lock:
+            self.index = index
+            self.candidates[source_name] = {
+                key: meta for key, meta in zip(keys, metas) if key in index.key_rows
+            }
+            self.model_id = provider.model_id
+            # a failed embedding batch should be retried on the next refresh
+            self.fingerprints[source_name] = fingerprint if not failed else None
+            self.version += 1
+        print(
+            f"[PASS] >>> {source_name} candidates refreshed: "
+            f"{len(self.candidates[source_name])} posts, {len(embedded)} newly embedded"
+        )
+        bump_index_version(f"{source_name} candidates refreshed")
+        return True
+
+    def top_k(self, query: List[float], k: int, sources: Optional[set] = None) -> List[Dict]:
+        """Top-k candidates by cosine similarity to the query vector.
+
+        The query must come from the same model as the index (see model_id).
+        The index may hold posts that have since left the scraper indexes (or
+        belong to other sources), so the search over-fetches and widens until
+        k matching posts are found.
+
+        Args:
+            query: Query vector
+            k: Number of results
+            sources: Restrict to these sources (default: all)
+        """
+        with self._lock:
+            index = self.index
+            candidates = {
+                source: posts
+                for source, posts in self.candidates.items()
+                if sources is None or source in sources
+            }
+        if index is None or not any(candidates.values()) or not len(query):
+            return []
+
+        fetch = k + 16
+        while True:
+            hits = []
+            for key, score in index.search(query, fetch):
+                source = key.split(":", 1)[0]
+                meta = candidates.get(source, {}).get(key)
+                if meta is not None:
+                    hits.append((source, meta, score))
+            if len(hits) >= k or fetch >= len(index):
+                break
+            fetch *= 4
+
+        return [
+            {
+                "source": source,
+                "id": meta.id,
+                "title": meta.title,
+                "url": meta.url,
+                "summary": meta.summary,
+                "score": score,
+            }
+            for source, meta, score in hits[:k]
+        ]
+
+
+class CircuitBreaker:
+    """Per-source circuit breaker.
+
+    Opens after `threshold` consecutive failures or timeouts; while open the
+    source is skipped, and after `cooldown_seconds` one trial call is let
+    through (half-open) whose outcome closes or re-opens it.
+    """
+
+    def __init__(self, name: str, threshold: int = 3, cooldown_seconds: float = 60.0):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.trial_in_flight or time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_in_flight or time.monotonic() - self.opened_at < self.cooldown_seconds:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.threshold:
+                if self.opened_at is None or self.trial_in_flight:
+                    print(f"[WARNING] circuit for {self.name} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def stats(self) -> Dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+_candidate_index = CandidateIndex()
+
+
+def get_candidate_index(force: bool = False) -> CandidateIndex:
+    """The candidate index, re-reading the scraper indexes if they are due (or forced)."""
+    from config import candidate_refresh_seconds
+
+    if force or _candidate_index.refresh_due(candidate_refresh_seconds):
+        _candidate_index.refresh()
+    return _candidate_index
+
+
+_source_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="recommendation-source")
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+# source -> a call that timed out but is still running on _source_executor;
+# a source is skipped until it finishes, so stragglers hold one slot each
+_abandoned: Dict[str, Future] = {}
+_abandoned_lock = threading.Lock()
+
+
+def get_source_breaker(source: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if source not in _breakers:
+            from config import source_breaker_threshold, source_breaker_cooldown_seconds
+
+            _breakers[source] = CircuitBreaker(
+                source,
+                threshold=source_breaker_threshold,
+                cooldown_seconds=source_breaker_cooldown_seconds,
+            )
+        return _breakers[source]
+
+
+def _query_source(source: str, query: List[float], k: int, refresh_seconds: float) -> List[Dict]:
+    if _candidate_index.refresh_due(refresh_seconds, source):
+        _candidate_index.refresh_source(source)
+    return _candidate_index.top_k(query, k, sources={source})
+
+
+def _abandon(source: str, future: Future):
+    with _abandoned_lock:
+        _abandoned[source] = future
+
+    def release(done: Future):
+        with _abandoned_lock:
+            if _abandoned.get(source) is done:
+                del _abandoned[source]
 
+    future.add_done_callback(release)
 
-def get_recommendations(paper_id: str, top_n: int = 10) -> List[Dict]:
-    """Return list of recommendation dicts sorted by similarity."""
+
+def search_sources(
+    query: List[float], k: int, source_timeout: float, deadline: float
+) -> Iterator[Tuple[str, Dict, List[Dict]]]:
+    """
+    Query every source concurrently and yield results as each one finishes
+
+    Args:
+        query: Query vector
+        k: Results per source
+        source_timeout: Deadline for each source, in seconds
+        deadline: time.monotonic() by which the whole request must answer;
+            no source gets longer than this
+
+    Yields:
+        (source, {"status", "ms"[, "error"]}, results). Status is "ok",
+        "error", "timeout" (the call keeps running in the background and its
+        result is dropped), "busy" (skipped while its last timed-out call is
+        still running) or "circuit_open" (skipped after repeated failures).
+    """
+    from config import candidate_refresh_seconds
+
+    start = time.monotonic()
+    pending = {}
+    for source in SCRAPER_REGISTRY:
+        if start >= deadline:
+            # the budget went on the paper lookup and embedding
+            yield source, {"status": "timeout", "ms": 0}, []
+            continue
+        with _abandoned_lock:
+            busy = source in _abandoned
+        if busy:
+            yield source, {"status": "busy", "ms": 0}, []
+            continue
+        breaker = get_source_breaker(source)
+        if not breaker.allow():
+            yield source, {"status": "circuit_open", "ms": 0}, []
+            continue
+        future = _source_executor.submit(
+            _query_source, source, query, k, candidate_refresh_seconds
+        )
+        pending[future] = (source, breaker, min(start + source_timeout, deadline))
+
+    while pending:
+        next_deadline = min(deadline for _, _, deadline in pending.values())
+        done, _ = wait(
+            pending,
+            timeout=max(0.0, next_deadline - time.monotonic()),
+            return_when=FIRST_COMPLETED,
+        )
+        now = time.monotonic()
+        for future in done:
+            source, breaker, _ = pending.pop(future)
+            ms = round((now - start) * 1000, 1)
+            try:
+                results = future.result()
+            except Exception as e:
+                breaker.record_failure()
+                print(f"[ERROR] >>> source {source} failed: {e}")
+                yield source, {"status": "error", "ms": ms, "error": str(e)}, []
+                continue
+            breaker.record_success()
+            yield source, {"status": "ok", "ms": ms}, results
+
+        for future, (source, breaker, deadline) in list(pending.items()):
+            if now >= deadline:
+                del pending[future]
+                breaker.record_failure()
+                _abandon(source, future)
+                print(f"[WARNING] source {source} timed out")
+                yield source, {"status": "timeout", "ms": round((now - start) * 1000, 1)}, []
+
+
+def request_deadline() -> float:
+    """time.monotonic() by which a recommendation request must answer."""
+    from config import recommendation_budget_seconds
+
+    return time.monotonic() + recommendation_budget_seconds
+
+
+def iter_ranked(
+    query: List[float],
+    top_n: int,
+    label: str,
+    exclude: Optional[Callable[[Dict], bool]] = None,
+    headroom: int = 0,
+    deadline: Optional[float] = None,
+) -> Iterator[Dict]:
+    """
+    Yield ranked candidates for a query vector as each source finishes
+
+    Every snapshot carries the best `top_n` results merged so far; the last
+    one (with "done": True) is the complete response, where "partial" flags
+    that some source timed out, failed or was skipped.
+
+    Args:
+        query: Query vector
+        top_n: Number of results
+        label: What the results are for (for logging)
+        exclude: Drop results for which this returns True
+        headroom: Extra results to fetch per source to make up for exclusions
+        deadline: time.monotonic() deadline taken when the request came in
+            (see request_deadline); defaults to the full budget from now
+    """
+    from config import recommendation_source_timeout
+
+    merged: List[Dict] = []
+    sources: Dict[str, Dict] = {}
+    for source, status, results in search_sources(
+        query,
+        top_n + headroom,
+        recommendation_source_timeout,
+        deadline if deadline is not None else request_deadline(),
+    ):
+        sources[source] = status
+        if exclude:
+            results = [r for r in results if not exclude(r)]
+        merged = sorted(merged + results, key=lambda r: r["score"], reverse=True)[:top_n]
+        yield {"source": source, **status, "results": merged, "done": False}
+
+    partial = [source for source, status in sources.items() if status["status"] != "ok"]
+    print(
+        f"[PASS] >>> generated {len(merged)} recommendations for {label}"
+        + (f" (missing sources: {', '.join(partial)})" if partial else "")
+    )
+    yield {
+        "results": merged,
+        "sources": sources,
+        "partial": bool(partial),
+        "done": True,
+    }
+
+
+def iter_recommendations(paper_id: str, top_n: int = 10) -> Iterator[Dict]:
+    """Ranked recommendations for a paper, yielded as each source finishes (see iter_ranked)."""
+    deadline = request_deadline()
     paper_meta = _fetch_arxiv_meta(paper_id)
     paper_embedding, _ = get_embedding(
-        paper_meta["title"] + "\n" + paper_meta["summary"]
+        paper_meta["title"] + "\n" + paper_meta["summary"],
+        provider=get_embedding_provider(),
     )
 
-    candidates: List[Dict] = []
-    for source_name, scraper in SCRAPER_REGISTRY.items():
+    for snapshot in iter_ranked(paper_embedding, top_n, f"paper {paper_id}", deadline=deadline):
+        if snapshot["done"]:
+            snapshot = {"paper_id": paper_id, **snapshot}
+        yield snapshot
+
+
+def get_recommendations(paper_id: str, top_n: int = 10) -> Dict:
+    """Recommendations from every source that answered within the latency budget."""
+    for snapshot in iter_recommendations(paper_id, top_n):
+        pass
+    return snapshot
+
+
+class RecommendationCache:
+    """Serialized recommendation results per (paper_id, top_n), tagged with
+    the index version they were computed at.
+
+    An entry at the current version is served as is. An entry from an older
+    version is served stale while a background job recomputes it; entries
+    older than `max_stale_seconds` are recomputed before answering.
+
+    A partial entry (some source missed its deadline) counts as fresh for
+    `partial_fresh_seconds`, and for as long as every missing source's
+    circuit is open, since a recompute would skip those sources anyway.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        max_stale_seconds: int = 86400,
+        partial_fresh_seconds: int = 30,
+    ):
+        self.entries = LRUCache(maxsize=maxsize)
+        self.max_stale_seconds = max_stale_seconds
+        self.partial_fresh_seconds = partial_fresh_seconds
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._lock = threading.Lock()
+
+    def get(self, paper_id: str, top_n: int = 10) -> Tuple[str, str, str]:
+        """
+        Recommendations for a paper, from cache when possible
+
+        Args:
+            paper_id: arXiv paper ID
+            top_n: Number of recommendations
+
+        Returns:
+            (JSON body, ETag, cache status: "hit", "stale" or "miss")
+        """
+        from config import candidate_refresh_seconds
+
+        key = (paper_id, top_n)
+        entry = self.entries.get(key)
+        if entry is not None and time.time() - entry["computed_at"] < self.max_stale_seconds:
+            if _candidate_index.refresh_due(candidate_refresh_seconds):
+                self._submit("candidate-refresh", _candidate_index.refresh)
+            if self._is_fresh(entry):
+                with self._lock:
+                    self.fresh_hits += 1
+                return entry["body"], entry["etag"], "hit"
+
+            queued = self._submit(f"recommendations:{paper_id}:{top_n}", self.compute, paper_id, top_n)
+            with self._lock:
+                self.stale_hits += 1
+                self.revalidations += queued
+            return entry["body"], entry["etag"], "stale"
+
+        with self._lock:
+            self.misses += 1
+        entry = self.compute(paper_id, top_n)
+        return entry["body"], entry["etag"], "miss"
+
+    def stream(self, paper_id: str, top_n: int = 10) -> Iterator[str]:
+        """
+        Server-sent events for a paper's recommendations
+
+        A fresh cache entry is sent as a single "done" event. Otherwise each
+        source's arrival is sent as a "source" event carrying the merged
+        ranking so far, then the complete response as "done" (and cached).
+        """
+        entry = self.entries.get((paper_id, top_n))
+        if entry is not None and self._is_fresh(entry):
+            with self._lock:
+                self.fresh_hits += 1
+            yield f"event: done\ndata: {entry['body']}\n\n"
+            return
+
+        with self._lock:
+            self.misses += 1
+        version = get_index_version()
         try:
-            metas = scraper.fetch_index()
+            for snapshot in iter_recommendations(paper_id, top_n):
+                if snapshot["done"]:
+                    entry = self._store(paper_id, top_n, version, snapshot)
+                    yield f"event: done\ndata: {entry['body']}\n\n"
+                else:
+                    yield f"event: source\ndata: {json.dumps(snapshot)}\n\n"
         except Exception as e:
-            print(f"[ERROR] >>> scraper {source_name} failed: {e}")
-            continue
-        for meta in metas:
-            emb, _ = get_embedding(meta.title + "\n" + meta.summary)
-            score = cosine_similarity(paper_embedding, emb)
-            candidates.append(
-                {
-                    "source": source_name,
-                    "id": meta.id,
-                    "title": meta.title,
-                    "url": meta.url,
-                    "summary": meta.summary,
-                    "score": score,
-                }
-            )
+            print(f"[ERROR] >>> recommendation stream failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    def compute(self, paper_id: str, top_n: int = 10) -> Dict:
+        """Recompute and store one entry (synchronously)."""
+        # read the version first: a bump during the computation leaves the
+        # entry marked older, so it is revalidated again
+        version = get_index_version()
+        return self._store(paper_id, top_n, version, get_recommendations(paper_id, top_n))
+
+    def _store(self, paper_id: str, top_n: int, version: int, response: Dict) -> Dict:
+        body = json.dumps(response)
+        entry = {
+            "version": version,
+            "missing": [
+                source
+                for source, status in response["sources"].items()
+                if status["status"] != "ok"
+            ],
+            "computed_at": time.time(),
+            "body": body,
+            "etag": make_etag(body),
+        }
+        self.entries.set((paper_id, top_n), entry)
+        return entry
+
+    def _is_fresh(self, entry: Dict) -> bool:
+        age = time.time() - entry["computed_at"]
+        if entry["version"] != get_index_version() or age >= self.max_stale_seconds:
+            return False
+        if not entry["missing"] or age < self.partial_fresh_seconds:
+            return True
+        return all(get_source_breaker(source).state == "open" for source in entry["missing"])
+
+    @staticmethod
+    def _submit(job_key: str, func, *args) -> bool:
+        """Run func in the background unless the same job is already active."""
+        from services.job_service import get_job_manager
+
+        _, deduplicated = get_job_manager().submit(job_key, func, *args)
+        return not deduplicated
+
+    def stats(self) -> Dict:
+        lookups = self.fresh_hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "maxsize": self.entries.maxsize,
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "hit_rate": (self.fresh_hits + self.stale_hits) / lookups if lookups else 0.0,
+            "index_version": get_index_version(),
+            "candidates": len(_candidate_index),
+            "candidates_refreshed_seconds_ago": (
+                round(time.monotonic() - _candidate_index.refreshed_at, 1)
+                if _candidate_index.refreshed_at
+                else None
+            ),
+            "sources": {source: breaker.stats() for source, breaker in _breakers.items()},
+        }
+
+
+_recommendation_cache: Optional[RecommendationCache] = None
+
+
+def get_recommendation_cache() -> RecommendationCache:
+    global _recommendation_cache
+    if _recommendation_cache is None:
+        from config import (
+            recommendation_cache_size,
+            recommendation_max_stale_seconds,
+            recommendation_partial_fresh_seconds,
+        )
 
-    # sort by score descending
-    ranked = sorted(candidates, key=lambda x: x["score"], reverse=True)[:top_n]
-    print(f"[PASS] >>> generated {len(ranked)} recommendations for paper {paper_id}")
-    return ranked
+        _recommendation_cache = RecommendationCache(
+            maxsize=recommendation_cache_size,
+            max_stale_seconds=recommendation_max_stale_seconds,
+            partial_fresh_seconds=recommendation_partial_fresh_seconds,
+        )
+    return _recommendation_cache
@@ -3,18 +3,22 @@ Citation analysis routes for arxiv-buddy
 Provides endpoints for citation network analysis and paper recommendations
 """
 
-import json
+import asyncio
 import os
 from starlette.responses import JSONResponse
 from fasthtml.common import *
 
 from services.citation_service import (
+    citation_service,
     get_paper_citation_analysis,
     get_most_influential_papers,
     get_most_relevant_papers,
+    get_citation_payload,
 )
 from source_manager import get_source_manager
-from models import papers_citation_analysis
+from services.citation_graph import get_citation_graph, attach_titles
+from services.job_service import get_job_manager
+from cache import etag_json_response
 
 
 def register_citation_routes(rt):
@@ -52,11 +56,17 @@ def register_citation_routes(rt):
                     status_code=404,
                 )
 
-            # Just extract LaTeX data - let frontend handle resolution
-            from latex_parser import LaTeXParser
-
-            parser = LaTeXParser(source_dir)
-            citation_data = parser.parse_paper()
+            # Just extract LaTeX data - let frontend handle resolution.
+            # parse_latex_content serves parsed_latex.json when it exists and
+            # only parses (off the event loop) the first time
+            citation_data = await asyncio.to_thread(
+                source_manager.parse_latex_content, paper_id
+            )
+            if citation_data is None:
+                return JSONResponse(
+                    {"error": "latex parsing failed", "paper_id": paper_id},
+                    status_code=500,
+                )
 
             return JSONResponse(
                 {"success": True, "paper_id": paper_id, "citation_data": citation_data}
@@ -69,6 +79,77 @@ def register_citation_routes(rt):
             traceback.print_exc()
             return JSONResponse({"error": str(e)}, status_code=500)
 
+    @rt("/api/citations/{paper_id}/analyze", methods=["POST"])
+    async def start_citation_analysis(request):
+        """
+        Enqueue full citation analysis as a background job
+
+        Returns 202 with the job status; a job already queued or running for
+        the paper is returned instead of starting a second one
+        """
+        try:
+            paper_id = request.path_params.get("paper_id")
+
+            if not paper_id:
+                return JSONResponse({"error": "paper_id required"}, status_code=400)
+
+            # sources are stored under the cleaned id (see parse_latex_content)
+            source_manager = get_source_manager()
+            paper_id = source_manager._clean_paper_id(paper_id)
+            source_dir = os.path.join(source_manager.sources_dir, paper_id)
+
+            if not os.path.exists(source_dir):
+                return JSONResponse(
+                    {
+                        "error": "source files not found",
+                        "message": f"no latex source available for paper {paper_id}. please load the paper first to extract sources.",
+                    },
+                    status_code=404,
+                )
+
+            job, deduplicated = get_job_manager().submit(
+                f"citation-analysis:{paper_id}",
+                citation_service.analyze_paper_citations,
+                paper_id,
+                source_dir,
+            )
+
+            return JSONResponse(
+                {
+                    "success": True,
+                    "paper_id": paper_id,
+                    "deduplicated": deduplicated,
+                    "job": job,
+                },
+                status_code=202,
+            )
+
+        except Exception as e:
+            print(f"[ERROR] queueing citation analysis failed: {e}")
+            return JSONResponse({"error": str(e)}, status_code=500)
+
+    @rt("/api/citations/{paper_id}/analyze", methods=["GET"])
+    async def get_citation_analysis_status(request):
+        """
+        Poll the latest citation analysis job for a paper
+
+        Returns: Job status (queued, running, succeeded, failed) and result
+        """
+        paper_id = request.path_params.get("paper_id")
+
+        if not paper_id:
+            return JSONResponse({"error": "paper_id required"}, status_code=400)
+
+        paper_id = get_source_manager()._clean_paper_id(paper_id)
+        job = get_job_manager().get(f"citation-analysis:{paper_id}")
+        if job is None:
+            return JSONResponse(
+                {"success": False, "paper_id": paper_id, "error": "no analysis job found"},
+                status_code=404,
+            )
+
+        return JSONResponse({"success": True, "paper_id": paper_id, "job": job})
+
     # Note: Influential and relevant papers routes are deprecated
     # Citation analysis is now handled entirely in the frontend using
     # the existing citation_mapping data from window.latexData
@@ -78,23 +159,17 @@ def register_citation_routes(rt):
         """
         Get citation analysis summary for a paper
 
-        Returns: High-level metrics and analysis status
+        Returns: High-level metrics and analysis status (pre-rendered, ETagged)
         """
-        print(f"=== GET CITATION SUMMARY ===")
-
         try:
-            path_params = request.path_params
-            paper_id = path_params.get("paper_id")
+            paper_id = request.path_params.get("paper_id")
 
             if not paper_id:
                 return JSONResponse({"error": "paper_id required"}, status_code=400)
 
-            print(f"getting citation summary for: {paper_id}")
-
-            # Check if we have cached analysis
-            cached_analysis = papers_citation_analysis(where=f"arxiv_id = '{paper_id}'")
+            payload = get_citation_payload(paper_id, "summary")
 
-            if not cached_analysis:
+            if payload is None:
                 return JSONResponse(
                     {
                         "success": True,
@@ -104,33 +179,8 @@ def register_citation_routes(rt):
                     }
                 )
 
-            analysis_record = cached_analysis[0]
-            # Convert to dict if it's not already
-            if hasattr(analysis_record, "__dict__"):
-                record_dict = analysis_record.__dict__
-            elif hasattr(analysis_record, "_asdict"):
-                record_dict = analysis_record._asdict()
-            else:
-                record_dict = dict(analysis_record)
-
-            analysis_data = json.loads(record_dict["analysis_data"])
-
-            summary = {
-                "success": True,
-                "paper_id": paper_id,
-                "has_analysis": True,
-                "computed_at": record_dict["computed_at"],
-                "total_citations_found": record_dict["total_citations_found"],
-                "resolved_citations": record_dict["resolved_citations"],
-                "influence_score": record_dict["influence_score"],
-                "analysis_summary": json.loads(record_dict["relevance_metrics"]),
-                "top_influential": analysis_data["metrics"]["most_influential_papers"][
-                    :3
-                ],
-                "top_relevant": analysis_data["metrics"]["most_relevant_papers"][:3],
-            }
-
-            return JSONResponse(summary)
+            body, etag = payload
+            return etag_json_response(request, body, etag)
 
         except Exception as e:
             print(f"[ERROR] getting citation summary failed: {e}")
@@ -141,97 +191,76 @@ def register_citation_routes(rt):
         """
         Get citation network data for visualization
 
-        Returns: Nodes and edges for network visualization
+        Returns: Nodes and edges for network visualization (pre-rendered, ETagged)
         """
-        print(f"=== GET CITATION NETWORK DATA ===")
-
         try:
-            path_params = request.path_params
-            paper_id = path_params.get("paper_id")
+            paper_id = request.path_params.get("paper_id")
 
             if not paper_id:
                 return JSONResponse({"error": "paper_id required"}, status_code=400)
 
-            print(f"getting citation network data for: {paper_id}")
+            payload = get_citation_payload(paper_id, "network")
 
-            # Get cached analysis
-            cached_analysis = papers_citation_analysis(where=f"arxiv_id = '{paper_id}'")
-
-            if not cached_analysis:
+            if payload is None:
                 return JSONResponse(
                     {"success": False, "error": "no citation analysis available"},
                     status_code=404,
                 )
 
-            analysis_record = cached_analysis[0]
-            # Convert to dict if it's not already
-            if hasattr(analysis_record, "__dict__"):
-                record_dict = analysis_record.__dict__
-            elif hasattr(analysis_record, "_asdict"):
-                record_dict = analysis_record._asdict()
-            else:
-                record_dict = dict(analysis_record)
+            body, etag = payload
+            return etag_json_response(request, body, etag)
 
-            analysis_data = json.loads(record_dict["analysis_data"])
+        except Exception as e:
+            print(f"[ERROR] getting citation network data failed: {e}")
+            return JSONResponse({"error": str(e)}, status_code=500)
 
-            # Build network data for visualization
-            nodes = []
-            edges = []
+    def _run_graph_query(paper_id: str, query_name: str, limit: int) -> Dict:
+        """Refresh the graph and run one query (blocking; called off the event loop)"""
+        graph = get_citation_graph()
+        results = getattr(graph, query_name)(paper_id, limit=limit)
+        return {
+            "success": True,
+            "paper_id": paper_id,
+            "in_graph": paper_id in graph.node_index,
+            "results": attach_titles(results),
+            "graph": {
+                "papers": graph.num_nodes,
+                "edges": graph.num_edges,
+                "version": graph.version,
+            },
+        }
+
+    async def _graph_query_response(request, query_name: str):
+        """Run a citation graph query named by query_name for the path paper_id"""
+        try:
+            paper_id = request.path_params.get("paper_id")
+            if not paper_id:
+                return JSONResponse({"error": "paper_id required"}, status_code=400)
 
-            # Add the main paper as central node
-            nodes.append(
-                {
-                    "id": paper_id,
-                    "label": f"Paper {paper_id}",
-                    "type": "main_paper",
-                    "influence_score": record_dict["influence_score"],
-                    "citations_count": record_dict["total_citations_found"],
-                }
-            )
+            try:
+                limit = max(1, min(int(request.query_params.get("limit", 20)), 200))
+            except ValueError:
+                return JSONResponse({"error": "limit must be an integer"}, status_code=400)
 
-            # Add cited papers as nodes
-            for paper in analysis_data["metrics"]["most_influential_papers"]:
-                nodes.append(
-                    {
-                        "id": paper["arxiv_id"],
-                        "label": (
-                            paper["title"][:50] + "..."
-                            if len(paper["title"]) > 50
-                            else paper["title"]
-                        ),
-                        "type": "cited_paper",
-                        "influence_score": paper["influence_score"],
-                        "local_citations": paper["local_citations"],
-                        "published_date": paper["published_date"],
-                    }
-                )
+            # a graph refresh copies the adjacency; keep it off the event loop
+            payload = await asyncio.to_thread(_run_graph_query, paper_id, query_name, limit)
+            return JSONResponse(payload)
 
-                # Add edge from main paper to cited paper
-                edges.append(
-                    {
-                        "source": paper_id,
-                        "target": paper["arxiv_id"],
-                        "weight": paper["local_citations"],
-                        "type": "citation",
-                    }
-                )
+        except Exception as e:
+            print(f"[ERROR] citation graph query {query_name} failed: {e}")
+            return JSONResponse({"error": str(e)}, status_code=500)
 
-            network_data = {
-                "success": True,
-                "paper_id": paper_id,
-                "nodes": nodes,
-                "edges": edges,
-                "stats": {
-                    "total_nodes": len(nodes),
-                    "total_edges": len(edges),
-                    "max_citations": (
-                        max(edge["weight"] for edge in edges) if edges else 0
-                    ),
-                },
-            }
+    @rt("/api/citations/{paper_id}/cited-by", methods=["GET"])
+    async def get_cited_by(request):
+        """Papers in our corpus that cite this paper"""
+        return await _graph_query_response(request, "cited_by")
 
-            return JSONResponse(network_data)
+    @rt("/api/citations/{paper_id}/co-cited", methods=["GET"])
+    async def get_co_cited(request):
+        """Papers most often cited alongside this paper (co-citation)"""
+        return await _graph_query_response(request, "co_cited")
 
-        except Exception as e:
-            print(f"[ERROR] getting citation network data failed: {e}")
-            return JSONResponse({"error": str(e)}, status_code=500)
+    @rt("/api/citations/{paper_id}/coupling", methods=["GET"])
+    async def get_coupling(request):
+        """Papers sharing the most references with this paper (bibliographic coupling)"""
+        return await _graph_query_response(request, "coupling")
@@ -1,17 +1,149 @@
-from starlette.responses import JSONResponse
-from recommender import get_recommendations
-from context_manager import get_context_manager
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+from starlette.responses import JSONResponse, StreamingResponse
+from cache import etag_json_response
+from recommender import bump_index_version, get_recommendation_cache
+from context_manager import chunk_text, get_context_manager
 from meta.scrapers import get_scraper
+from embeddings import get_embeddings, get_embedding_cache, get_embedding_provider
+from services.scraper_scheduler import get_scraper_scheduler
+from services.user_profile_service import get_user_recommendations
+
+
+_fetch_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_fetch_executor() -> ThreadPoolExecutor:
+    global _fetch_executor
+    if _fetch_executor is None:
+        from config import context_fetch_workers
+
+        _fetch_executor = ThreadPoolExecutor(
+            max_workers=context_fetch_workers, thread_name_prefix="context-fetch"
+        )
+    return _fetch_executor
+
+
+async def _fetch_item(item: Dict) -> Dict:
+    """
+    Fetch one article on the bounded pool
+
+    Returns:
+        Status dict with source, id, title, url and "status": "fetched" (plus
+        "content"), "invalid", "unknown_source", "timeout" or "error"
+    """
+    from config import context_fetch_timeout
+
+    status = {k: item.get(k) for k in ("source", "id", "title", "url")}
+    if not all(status.values()):
+        return {**status, "status": "invalid", "error": "source, id, title and url are required"}
+    scraper = get_scraper(status["source"])
+    if scraper is None:
+        print(f"[ERROR] >>> unknown scraper {status['source']}")
+        return {**status, "status": "unknown_source"}
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_get_fetch_executor(), scraper.fetch_article, status["url"])
+    try:
+        content = await asyncio.wait_for(future, context_fetch_timeout)
+    except asyncio.TimeoutError:
+        print(f"[ERROR] >>> fetching article {status['url']} timed out")
+        return {**status, "status": "timeout"}
+    except Exception as e:
+        print(f"[ERROR] >>> failed fetching article {status['url']}: {e}")
+        return {**status, "status": "error", "error": str(e)}
+    return {**status, "status": "fetched", "content": content}
+
+
+def _embed_and_store(fetched: List[Dict]):
+    """
+    Chunk the fetched articles, embed all chunks in one batched call and
+    store every item in one transaction; updates each status in place to
+    "added", "exists" or "embed_failed"
+    """
+    provider = get_embedding_provider()
+    chunked = [chunk_text(item["content"]) for item in fetched]
+    embeddings, _ = get_embeddings(
+        [chunk["content"] for chunks in chunked for chunk in chunks],
+        provider=provider,
+    )
+
+    to_store, stored = [], []
+    offset = 0
+    for item, chunks in zip(fetched, chunked):
+        for chunk, emb in zip(chunks, embeddings[offset : offset + len(chunks)]):
+            chunk["embedding"] = emb
+        offset += len(chunks)
+        # the item vector is the normalized mean of its chunk vectors
+        vectors = [chunk["embedding"] for chunk in chunks if chunk["embedding"]]
+        if not vectors:
+            item["status"] = "embed_failed"
+            continue
+        mean = np.mean(vectors, axis=0)
+        norm = np.linalg.norm(mean)
+        to_store.append(
+            dict(
+                source=item["source"],
+                ref_id=item["id"],
+                title=item["title"],
+                url=item["url"],
+                content=item["content"],
+                embedding=(mean / norm if norm > 0 else mean).tolist(),
+                embedding_model=provider.model_id,
+                chunks=chunks,
+            )
+        )
+        stored.append(item)
+
+    ids = get_context_manager().add_items(to_store)
+    for item, context_id in zip(stored, ids):
+        item["status"] = "added" if context_id else "exists"
 
 
 def register_context_routes(rt):
     """Register context and recommendation routes"""
     
+    # registered before /api/recommendations/{paper_id} so "stats" is not a paper id
+    @rt("/api/recommendations/stats")
+    def recommendation_stats_route():
+        scheduler = get_scraper_scheduler()
+        return JSONResponse(
+            {
+                "results": get_recommendation_cache().stats(),
+                "embeddings": get_embedding_cache().stats(),
+                "scrapers": scheduler.status if scheduler else None,
+            }
+        )
+
+    # also ahead of /api/recommendations/{paper_id}
+    @rt("/api/recommendations/user")
+    def user_recommendations_route(session, top_n: int = 10):
+        user_id = session.get("user_id")
+        if not user_id:
+            return JSONResponse({"error": "login required"}, status_code=401)
+        try:
+            return JSONResponse(get_user_recommendations(user_id, max(1, min(top_n, 100))))
+        except Exception as e:
+            print(f"[ERROR] >>> user recommendations failed: {e}")
+            return JSONResponse({"error": str(e)}, status_code=500)
+
     @rt("/api/recommendations/{paper_id}")
-    def recommendations_route(paper_id: str):
+    def recommendations_route(request, paper_id: str, top_n: int = 10, stream: bool = False):
+        top_n = max(1, min(top_n, 100))
+        if stream:
+            return StreamingResponse(
+                get_recommendation_cache().stream(paper_id, top_n),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
         try:
-            recs = get_recommendations(paper_id)
-            return JSONResponse(recs)
+            body, etag, status = get_recommendation_cache().get(paper_id, top_n)
+            response = etag_json_response(request, body, etag)
+            response.headers["X-Cache"] = status
+            return response
         except Exception as e:
             print(f"[ERROR] >>> recommendations failed: {e}")
             return JSONResponse({"error": str(e)}, status_code=500)
@@ -23,31 +155,58 @@ def register_context_routes(rt):
         if not isinstance(items, list):
             return JSONResponse({"error": "items must be a list"}, status_code=400)
 
-        cm = get_context_manager()
-        added = 0
-        for item in items:
-            source = item.get("source")
-            url = item.get("url")
-            ref_id = item.get("id")
-            title = item.get("title")
-            if not all([source, url, ref_id, title]):
-                continue
-            scraper = get_scraper(source)
-            if scraper is None:
-                print(f"[ERROR] >>> unknown scraper {source}")
-                continue
-            try:
-                content = scraper.fetch_article(url)
-            except Exception as e:
-                print(f"[ERROR] >>> failed fetching article {url}: {e}")
-                continue
-            from embeddings import get_embedding
-
-            emb, _ = get_embedding(content[:4096])  # truncate long content for embedding
-            cm.add_item(source, ref_id, title, url, content, emb)
-            added += 1
-
-        return JSONResponse({"added": added})
+        statuses = await asyncio.gather(*(_fetch_item(item) for item in items))
+        fetched = [s for s in statuses if s["status"] == "fetched"]
+        if fetched:
+            await asyncio.to_thread(_embed_and_store, fetched)
+
+        added = sum(s["status"] == "added" for s in statuses)
+        if added:
+            bump_index_version("context items added")
+        return JSONResponse(
+            {
+                "added": added,
+                "items": [{k: v for k, v in s.items() if k != "content"} for s in statuses],
+            }
+        )
+
+    @rt("/api/context/items")
+    def context_items_route(request, source: str = None, include: str = ""):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 50)), 1), 200)
+            cursor = request.query_params.get("cursor")
+            before_id = int(cursor) if cursor else None
+        except ValueError:
+            return JSONResponse({"error": "limit and cursor must be integers"}, status_code=400)
+        fields = {f for f in include.split(",") if f}
+        if fields - {"content", "vector"}:
+            return JSONResponse({"error": "include may list content, vector"}, status_code=400)
+
+        items, next_cursor = get_context_manager().list_page(
+            limit=limit,
+            before_id=before_id,
+            source=source,
+            with_content="content" in fields,
+            with_vector="vector" in fields,
+        )
+        if "vector" in fields:
+            for item in items:
+                if item["vector"] is not None:
+                    item["vector"] = item["vector"].tolist()
+        return JSONResponse({"items": items, "next_cursor": next_cursor})
+
+    @rt("/api/context/search")
+    def context_search_route(q: str, k: int = 5):
+        if not q.strip():
+            return JSONResponse({"error": "q is required"}, status_code=400)
+        provider = get_embedding_provider()
+        embeddings, _ = get_embeddings([q], provider=provider)
+        if not embeddings[0]:
+            return JSONResponse({"error": "failed to embed query"}, status_code=502)
+        results = get_context_manager().search_passages(
+            embeddings[0], k=max(1, min(k, 50)), embedding_model=provider.model_id
+        )
+        return JSONResponse({"results": results})
 
     @rt("/api/get_title")
     def get_title_route(source: str, url: str):
@@ -1,6 +1,10 @@
+import asyncio
 from starlette.responses import JSONResponse
 from source_manager import get_source_manager
 from services.paper_service import load_paper_content
+from services.prefetch_service import get_prefetch_service
+from services.reference_preview_service import get_reference_previews
+from cache import etag_json_response
 
 
 def register_paper_routes(rt):
@@ -40,6 +44,41 @@ def register_paper_routes(rt):
                 print(f"Error getting form data: {e}")
                 return f"Error: {e}"
 
+    @rt("/api/paper/{paper_id}/reference-previews", methods=["GET"])
+    async def get_reference_previews_route(request):
+        """Preview bundle (title, authors, abstract, links) for every arXiv reference"""
+        paper_id = request.path_params.get("paper_id")
+        try:
+            payload = await asyncio.to_thread(get_reference_previews, paper_id)
+            if payload is None:
+                return JSONResponse(
+                    {
+                        "success": False,
+                        "paper_id": paper_id,
+                        "error": "No LaTeX data available (paper may not have source files)",
+                    },
+                    status_code=404,
+                )
+
+            body, etag = payload
+            return etag_json_response(request, body, etag, max_age=3600)
+        except Exception as e:
+            print(f"[ERROR] building reference previews failed: {e}")
+            return JSONResponse(
+                {"success": False, "paper_id": paper_id, "error": str(e)},
+                status_code=500,
+            )
+
+    @rt("/api/prefetch/cancel", methods=["POST"])
+    async def cancel_prefetch_route(request):
+        """Cancel background prefetch of cited papers for the current user"""
+        session = request.session if hasattr(request, "session") else {}
+        prefetch_service = get_prefetch_service()
+        cancelled = (
+            prefetch_service.cancel(session.get("user_id")) if prefetch_service else False
+        )
+        return JSONResponse({"success": True, "cancelled": cancelled})
+
     @rt("/api/paper/{paper_id}/latex", methods=["GET"])
     def get_latex_data_route(paper_id: str):
         """API endpoint to get parsed LaTeX data for a paper"""
@@ -1,8 +1,9 @@
 import json
 from datetime import datetime
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, StreamingResponse
 from models import scratchpad_notes
-from services.ai_service import search_vectorized_sources, generate_ai_reply
+from services.ai_service import search_vectorized_sources, stream_ai_reply
+from services.paper_context_service import get_paper_context_manager
 
 
 def get_scratchpad_context(
@@ -306,73 +307,108 @@ def register_scratchpad_routes(rt):
             return {"success": False, "error": str(e)}
 
     @rt("/api/scratchpad/{note_id}/ai-reply", methods=["POST"])
-    async def create_ai_reply(note_id: int, request):
-        """Generate an AI reply for a specific note"""
+    async def create_ai_reply(note_id: int, request, stream: bool = False):
+        """
+        Generate an AI reply for a specific note
+
+        With ?stream=1 the reply is sent as server-sent events: "token"
+        ({text}) as text arrives, "tool" ({name}) on tool calls, then "done"
+        ({reply_id, content, ai_metadata}) once it is stored, or "error".
+        """
         session = request.session if hasattr(request, "session") else {}
         user_id = session.get("user_id")
         if not user_id:
             return {"success": False, "error": "Authentication required"}
 
-        try:
-            # get the original note
-            notes = list(scratchpad_notes(where=f"id = {note_id}"))
-            if not notes:
-                return {"success": False, "error": "Note not found"}
+        # get the original note
+        notes = list(scratchpad_notes(where=f"id = {note_id}"))
+        if not notes:
+            return {"success": False, "error": "Note not found"}
 
-            note = notes[0]
-            if note.user_id != user_id:
-                return {"success": False, "error": "Access denied"}
+        note = notes[0]
+        if note.user_id != user_id:
+            return {"success": False, "error": "Access denied"}
 
-            # Use direct arXiv HTTPS URL for PDF context
-            pdf_url = f"https://arxiv.org/pdf/{note.paper_id}"
+        # Get scratchpad context using helper function
+        scratchpad_context = get_scratchpad_context(user_id, note.paper_id, note_id)
 
-            # Get scratchpad context using helper function
-            scratchpad_context = get_scratchpad_context(user_id, note.paper_id, note_id)
+        # Handle anchored notes
+        anchor = ""
+        if note.note_type == "anchored" and note.anchor_data:
+            anchor = f"Anchored to: \"{json.loads(note.anchor_data).get('selection_text', '')}\"\n\n"
 
-            # Handle anchored notes
-            anchor = ""
-            if note.note_type == "anchored" and note.anchor_data:
-                anchor = f"Anchored to: \"{json.loads(note.anchor_data).get('selection_text', '')}\"\n\n"
-
-            # generate AI reply with PDF context from arXiv
-            ai_reply_content = generate_ai_reply(
+        async def events():
+            """Stream the reply, then store it with its token and latency metadata"""
+            async for event in stream_ai_reply(
                 note_content=anchor + note.content if anchor else note.content,
-                pdf_url=pdf_url,
+                paper_id=note.paper_id,
                 scratchpad_context=scratchpad_context,
-            )
+            ):
+                if event["type"] != "done":
+                    yield event
+                    continue
+
+                metadata = event["metadata"]
+                ai_metadata = {
+                    **metadata,
+                    "pdf_context": "paper_context" in metadata,
+                    "pdf_url": metadata.get("paper_context", {}).get("pdf_url"),
+                }
+                reply = scratchpad_notes.insert(
+                    user_id=user_id,
+                    paper_id=note.paper_id,
+                    content=event["content"],
+                    note_type="ai_reply",
+                    anchor_data=None,
+                    created_at=datetime.now().isoformat(),
+                    updated_at=datetime.now().isoformat(),
+                    position=0,
+                    is_deleted=False,
+                    parent_note_id=note_id,
+                    reply_type="ai",
+                    ai_metadata=json.dumps(ai_metadata),
+                )
+                yield {
+                    "type": "done",
+                    "reply_id": reply.id,
+                    "content": event["content"],
+                    "ai_metadata": ai_metadata,
+                }
 
-            # create the AI reply note
-            ai_metadata = {
-                "model": "claude-3-5-sonnet-20241022",
-                "pdf_context": True,
-                "pdf_url": pdf_url,
-            }
+        if stream:
 
-            reply_id = scratchpad_notes.insert(
-                user_id=user_id,
-                paper_id=note.paper_id,
-                content=ai_reply_content,
-                note_type="ai_reply",
-                anchor_data=None,
-                created_at=datetime.now().isoformat(),
-                updated_at=datetime.now().isoformat(),
-                position=0,
-                is_deleted=False,
-                parent_note_id=note_id,
-                reply_type="ai",
-                ai_metadata=json.dumps(ai_metadata),
+            async def sse():
+                try:
+                    async for event in events():
+                        kind = event.pop("type")
+                        yield f"event: {kind}\ndata: {json.dumps(event)}\n\n"
+                except Exception as e:
+                    print(f"❌ AI reply error: {e}")
+                    yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+            return StreamingResponse(
+                sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
             )
 
-            return {
-                "success": True,
-                "reply_id": reply_id,
-                "content": ai_reply_content,
-                "ai_metadata": ai_metadata,
-            }
+        try:
+            async for event in events():
+                if event["type"] == "done":
+                    return {
+                        "success": True,
+                        "reply_id": event["reply_id"],
+                        "content": event["content"],
+                        "ai_metadata": event["ai_metadata"],
+                    }
+            return {"success": False, "error": "no reply generated"}
         except Exception as e:
             print(f"❌ AI reply error: {e}")
             return {"success": False, "error": str(e)}
 
+    @rt("/api/ai/paper-context/stats")
+    def paper_context_stats():
+        """Prompt-cache builds, hits and token counts of the paper context blocks"""
+        return JSONResponse(get_paper_context_manager().stats())
+
     @rt("/api/scratchpad/{note_id}/reply", methods=["POST"])
     async def create_user_reply(note_id: int, request):
         """Create a user reply to a specific note"""
@@ -1,8 +1,11 @@
-from typing import Optional, Dict, Any, List
+import asyncio
+import time
+from typing import Optional, Dict, Any, List, AsyncIterator
 from datetime import datetime, timedelta
-from config import supabase, get_claude_msg
-from embeddings import get_embedding
-from claudette import Chat
+from anthropic import AsyncAnthropic
+from config import supabase, anthropic_api_key
+from embeddings import get_embedding, OPENAI_EMBEDDING_MODEL
+from claudette import AsyncChat, AsyncClient
 from msglm import mk_msg
 
 # Simple in-memory cache for search results
@@ -77,7 +80,8 @@ def search_vectorized_sources(
         _clean_cache()  # Clean cache periodically
 
         # Generate query embedding
-        query_embedding, token_count = get_embedding(query)
+        # the pgvector index holds OpenAI vectors, so the query must use that model
+        query_embedding, token_count = get_embedding(query, model=OPENAI_EMBEDDING_MODEL)
         if not query_embedding:
             print("[ERROR] failed to generate query embedding")
             return _fallback_keyword_search(query, limit)
@@ -251,62 +255,129 @@ def _fallback_keyword_search(query: str, limit: int) -> List[Dict[str, Any]]:
         return []
 
 
-def generate_ai_reply(
-    note_content: str, pdf_url: str = None, scratchpad_context: str = None
-):
-    """Generate AI reply based on note content and PDF context"""
+AI_REPLY_MODEL = "claude-sonnet-4-20250514"
 
-    try:
-        # Build message content with text and optional PDF
-        content_list = []
+_anthropic_client: Optional[AsyncAnthropic] = None
 
-        if pdf_url:
-            content_list.append(
-                {"type": "document", "source": {"type": "url", "url": pdf_url}}
-            )
 
-        # Build context-aware prompt
-        context_section = ""
-        if scratchpad_context:
-            context_section = f"""Here are the user's other notes on this paper:
+def _get_anthropic() -> AsyncAnthropic:
+    """Shared async Anthropic client (one connection pool for all replies)"""
+    global _anthropic_client
+    if _anthropic_client is None:
+        _anthropic_client = AsyncAnthropic(api_key=anthropic_api_key)
+    return _anthropic_client
 
-{scratchpad_context}
 
-"""
+async def search_research_sources(
+    query: str,  # What to search for
+    limit: int = 5,  # Maximum number of results
+) -> List[Dict[str, Any]]:
+    "Search vectorized research sources (papers, blog posts) for passages relevant to a query."
+    # the supabase search is blocking; keep it off the event loop
+    return await asyncio.to_thread(search_vectorized_sources, query, limit)
 
-        prompt = f"""You are an AI assistant helping a researcher understand a paper {context_section}The user has written the following new note:
 
-"{note_content}"
+# stable across replies, so it sits in the cached prefix with the paper
+AI_REPLY_SYSTEM_PROMPT = """You are an AI assistant helping a researcher understand the attached paper. Provide a helpful response to the user's new note that is thoughtful but concise. Only reference other notes if they directly relate to the current note. Aim for around 50 words."""
 
-Provide a helpful response that is thoughtful but concise. Only reference other notes if they directly relate to the current note. Aim for around 50 words."""
 
-        content_list.append({"type": "text", "text": prompt})
+def _ai_reply_prompt(note_content: str, scratchpad_context: str = None) -> str:
+    context_section = ""
+    if scratchpad_context:
+        context_section = f"""Here are the user's other notes on this paper:
 
-        # Get the configured Claude client with tools
-        # claude_msg = get_claude_msg()
-        claude_msg = Chat("claude-sonnet-4-20250514", tools=[search_vectorized_sources])
-        if not claude_msg:
-            return "Claude client not available"
-        # the response from claude's toolloop is a messages object that contains
-        # the full conversation history and metadata. we should pass this through
-        # to let the routes handle formatting, rather than converting to string here
-        final_msg = mk_msg(
-            content_list,
-        )
-        response = claude_msg.toolloop(final_msg)
-        messages = list(claude_msg.toolloop(final_msg))
+{scratchpad_context}
 
-        # get the most recent message
-        last_msg = messages[-1]
+"""
 
-        # extract any text blocks in that message
-        texts = [b.text for b in last_msg.content]
+    return (
+        f"{context_section}The user has written the following new note:\n\n"
+        f'"{note_content}"'
+    )
 
-        # join them (in case there's more than one)
-        latest_output = "\n".join(texts)
 
-        print(latest_output)
-        return latest_output
-    except Exception as e:
-        print(f"[ERROR] ai reply generation error: {e}")
-        return f"ai reply generation failed: {str(e)}"
+async def stream_ai_reply(
+    note_content: str, paper_id: str = None, scratchpad_context: str = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate an AI reply to a note, streaming it as it is produced
+
+    The tool loop runs once; text from every step is streamed, so the user
+    sees the first tokens while later steps (after tool calls) are pending.
+    The paper comes from the paper context manager as a prompt-cached block
+    ahead of the note, so later replies on the same paper read it from the
+    provider's cache.
+
+    Yields:
+        {"type": "token", "text"} for each text delta,
+        {"type": "tool", "name"} when the model calls a tool, and finally
+        {"type": "done", "content", "metadata"} where metadata holds the
+        model, stop reason, tool call count, token usage, latency (ms to
+        first token and in total) and the paper context used
+    """
+    from services.paper_context_service import get_paper_context_manager
+
+    # cached paper block first, volatile note and scratchpad context after it
+    content_list = []
+    paper_key = None
+    if paper_id:
+        paper_key, paper_block = get_paper_context_manager().context_block(paper_id)
+        content_list.append(paper_block)
+    content_list.append({"type": "text", "text": _ai_reply_prompt(note_content, scratchpad_context)})
+
+    # chat history is per reply; the HTTP connection pool is shared
+    client = AsyncClient(AI_REPLY_MODEL, cli=_get_anthropic())
+    chat = AsyncChat(cli=client, sp=AI_REPLY_SYSTEM_PROMPT, tools=[search_research_sources])
+
+    start = time.perf_counter()
+    first_token_ms = None
+    steps: List[str] = []
+    tool_calls = 0
+    async for step in chat.toolloop(mk_msg(content_list), stream=True):
+        if not hasattr(step, "__aiter__"):
+            continue  # tool results fed back to the model
+        parts = []
+        async for text in step:
+            if not text:
+                continue
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - start) * 1e3
+            parts.append(text)
+            yield {"type": "token", "text": text}
+        for block in getattr(client.result, "content", []):
+            if getattr(block, "type", None) == "tool_use":
+                tool_calls += 1
+                yield {"type": "tool", "name": block.name}
+        if parts:
+            steps.append("".join(parts))
+
+    use = client.use
+    metadata = {
+        "model": AI_REPLY_MODEL,
+        "stop_reason": client.stop_reason,
+        "tool_calls": tool_calls,
+        "usage": {
+            "input_tokens": use.input_tokens,
+            "output_tokens": use.output_tokens,
+            "cache_creation_input_tokens": getattr(use, "cache_creation_input_tokens", 0) or 0,
+            "cache_read_input_tokens": getattr(use, "cache_read_input_tokens", 0) or 0,
+        },
+        "latency_ms": {
+            "first_token": round(first_token_ms) if first_token_ms is not None else None,
+            "total": round((time.perf_counter() - start) * 1e3),
+        },
+    }
+    if paper_key:
+        metadata["paper_context"] = {
+            "paper_id": paper_key[0],
+            "version": paper_key[1],
+            "pdf_url": paper_block["source"]["url"],
+            "cache_hit": get_paper_context_manager().record_usage(paper_key, metadata["usage"]),
+        }
+    content = "\n\n".join(step.strip() for step in steps)
+    print(
+        f"[PASS] ai reply: {metadata['usage']['output_tokens']} tokens, "
+        f"{metadata['usage']['cache_read_input_tokens']} cached input tokens, first token "
+        f"{metadata['latency_ms']['first_token']}ms, total {metadata['latency_ms']['total']}ms"
+    )
+    yield {"type": "done", "content": content, "metadata": metadata}
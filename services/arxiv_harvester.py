@@ -0,0 +1,340 @@
+"""
+Incremental arXiv metadata harvester
+Pulls arXiv metadata in bulk over OAI-PMH (ListRecords with resumption tokens
+and a from-date watermark) into the local papers_metadata store
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from xml.etree import ElementTree as ET
+
+import requests
+
+from models import db, papers_metadata, harvest_state
+
+OAI_NS = "{http://www.openarchives.org/OAI/2.0/}"
+ARXIV_NS = "{http://arxiv.org/OAI/arXiv/}"
+
+
+class HarvestError(Exception):
+    """Raised when the OAI-PMH endpoint returns an unrecoverable error"""
+
+
+class ArxivHarvester:
+    """Harvests arXiv metadata into papers_metadata, resumable across restarts"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        set_spec: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        batch_size: int = 500,
+        request_delay: float = 3.0,
+        max_retries: int = 5,
+    ):
+        """
+        Args:
+            base_url: OAI-PMH endpoint (defaults to ARXIV_OAI_URL); point this at
+                a local stand-in feed for testing
+            set_spec: Optional OAI set to restrict the harvest (e.g. "cs")
+            session: requests session used for all HTTP calls
+            batch_size: Records per database upsert batch
+            request_delay: Seconds to wait between page requests (arXiv asks for 3)
+            max_retries: Retries for 503/Retry-After and transient failures
+        """
+        if base_url is None:
+            from config import arxiv_oai_url
+
+            base_url = arxiv_oai_url
+
+        self.base_url = base_url
+        self.set_spec = set_spec
+        self.session = session or requests.Session()
+        self.batch_size = batch_size
+        self.request_delay = request_delay
+        self.max_retries = max_retries
+        self.state_key = f"arxiv-oai:{set_spec or 'all'}"
+
+    def harvest(
+        self, from_date: Optional[str] = None, max_pages: Optional[int] = None
+    ) -> Dict:
+        """
+        Run (or resume) an incremental harvest
+
+        Args:
+            from_date: YYYY-MM-DD override for the watermark
+            max_pages: Stop after this many pages (the harvest resumes from the
+                saved resumption token on the next run)
+
+        Returns:
+            Summary with records harvested, pages fetched and the new watermark
+        """
+        state = self._load_state()
+        token = state.get("resumption_token") or None
+        listing_from = state.get("listing_from") or from_date or state.get("watermark")
+
+        if from_date and not token:
+            listing_from = from_date
+
+        if token:
+            print(f"[INFO] resuming harvest {self.state_key} from saved token")
+        else:
+            print(f"[INFO] starting harvest {self.state_key} from {listing_from or 'the beginning'}")
+
+        pages = 0
+        harvested = 0
+        # pages fetched before a restart count towards the watermark too
+        latest_datestamp = (token and state.get("latest_datestamp")) or listing_from or ""
+        started_at = datetime.now().date().isoformat()
+
+        while True:
+            params = {"verb": "ListRecords"}
+            if token:
+                params["resumptionToken"] = token
+            else:
+                params["metadataPrefix"] = "arXiv"
+                if listing_from:
+                    params["from"] = listing_from
+                if self.set_spec:
+                    params["set"] = self.set_spec
+
+            try:
+                root = self._fetch_page(params)
+            except HarvestError as e:
+                if token and "badResumptionToken" in str(e):
+                    # Tokens expire; restart this listing from its from-date
+                    print("[WARNING] resumption token expired, restarting listing")
+                    token = None
+                    continue
+                raise
+
+            records, token, page_latest = self._parse_page(root)
+            latest_datestamp = max(latest_datestamp, page_latest)
+
+            for start in range(0, len(records), self.batch_size):
+                self._upsert_batch(records[start : start + self.batch_size])
+            harvested += len(records)
+            pages += 1
+
+            self._save_state(
+                listing_from=listing_from or "",
+                resumption_token=token or "",
+                latest_datestamp=latest_datestamp,
+                records=len(records),
+            )
+            print(f"[INFO] harvested page {pages} ({len(records)} records)")
+
+            if not token:
+                # Listing complete: advance the watermark so the next run is incremental
+                watermark = latest_datestamp or started_at
+                self._save_state(
+                    watermark=watermark,
+                    listing_from="",
+                    resumption_token="",
+                    latest_datestamp="",
+                )
+                print(f"[PASS] harvest complete: {harvested} records, watermark {watermark}")
+                return {
+                    "records": harvested,
+                    "pages": pages,
+                    "watermark": watermark,
+                    "complete": True,
+                }
+
+            if max_pages and pages >= max_pages:
+                print(f"[INFO] harvest paused after {pages} pages; will resume from token")
+                return {
+                    "records": harvested,
+                    "pages": pages,
+                    "watermark": state.get("watermark") or "",
+                    "complete": False,
+                }
+
+            time.sleep(self.request_delay)
+
+    def _fetch_page(self, params: Dict) -> ET.Element:
+        """Fetch and parse one OAI-PMH page, honouring 503 Retry-After"""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=60)
+                if response.status_code == 503:
+                    retry_after = response.headers.get("Retry-After", "")
+                    delay = int(retry_after) if retry_after.isdigit() else 10
+                    print(f"[INFO] oai endpoint busy, retrying in {delay}s")
+                    time.sleep(delay)
+                    continue
+                response.raise_for_status()
+                root = ET.fromstring(response.content)
+            except (requests.RequestException, ET.ParseError) as e:
+                last_error = e
+                time.sleep(min(2**attempt, 30))
+                continue
+
+            error = root.find(f"{OAI_NS}error")
+            if error is not None:
+                code = error.get("code", "")
+                if code == "noRecordsMatch":
+                    return root
+                raise HarvestError(f"{code}: {(error.text or '').strip()}")
+            return root
+
+        raise HarvestError(f"giving up after {self.max_retries} retries: {last_error}")
+
+    def _parse_page(self, root: ET.Element) -> Tuple[List[Dict], Optional[str], str]:
+        """
+        Parse a ListRecords page
+
+        Returns:
+            (papers_metadata records, next resumption token or None, latest datestamp)
+        """
+        records = []
+        latest_datestamp = ""
+        list_records = root.find(f"{OAI_NS}ListRecords")
+        if list_records is None:
+            return records, None, latest_datestamp
+
+        fetched_at = datetime.now().isoformat()
+        for record in list_records.findall(f"{OAI_NS}record"):
+            header = record.find(f"{OAI_NS}header")
+            if header is None:
+                continue
+
+            datestamp = header.findtext(f"{OAI_NS}datestamp", "")
+            latest_datestamp = max(latest_datestamp, datestamp)
+
+            if header.get("status") == "deleted":
+                identifier = header.findtext(f"{OAI_NS}identifier", "")
+                arxiv_id = identifier.replace("oai:arXiv.org:", "")
+                if arxiv_id:
+                    records.append({"arxiv_id": arxiv_id, "is_active": False})
+                continue
+
+            meta = record.find(f"{OAI_NS}metadata/{ARXIV_NS}arXiv")
+            if meta is None:
+                continue
+
+            authors = []
+            for author in meta.findall(f"{ARXIV_NS}authors/{ARXIV_NS}author"):
+                name = " ".join(
+                    part
+                    for part in (
+                        author.findtext(f"{ARXIV_NS}forenames", ""),
+                        author.findtext(f"{ARXIV_NS}keyname", ""),
+                    )
+                    if part
+                )
+                if name:
+                    authors.append(name.strip())
+
+            records.append(
+                {
+                    "arxiv_id": meta.findtext(f"{ARXIV_NS}id", "").strip(),
+                    "title": _clean_text(meta.findtext(f"{ARXIV_NS}title", "")),
+                    "authors": json.dumps(authors),
+                    "abstract": _clean_text(meta.findtext(f"{ARXIV_NS}abstract", "")),
+                    "categories": json.dumps(
+                        meta.findtext(f"{ARXIV_NS}categories", "").split()
+                    ),
+                    "published_date": meta.findtext(f"{ARXIV_NS}created", ""),
+                    "updated_date": meta.findtext(f"{ARXIV_NS}updated", ""),
+                    "doi": meta.findtext(f"{ARXIV_NS}doi", ""),
+                    "journal_ref": meta.findtext(f"{ARXIV_NS}journal-ref", ""),
+                    "comment": meta.findtext(f"{ARXIV_NS}comments", ""),
+                    "fetched_at": fetched_at,
+                    "is_active": True,
+                }
+            )
+
+        token_elem = list_records.find(f"{OAI_NS}resumptionToken")
+        token = (token_elem.text or "").strip() if token_elem is not None else ""
+        return [r for r in records if r["arxiv_id"]], token or None, latest_datestamp
+
+    def _upsert_batch(self, records: List[Dict]):
+        """Upsert a batch of records into papers_metadata in one transaction"""
+        if not records:
+            return
+
+        active = [r for r in records if r.get("is_active", True)]
+        deleted = [r["arxiv_id"] for r in records if not r.get("is_active", True)]
+
+        with db.conn:
+            if active:
+                papers_metadata.upsert_all(active, pk="arxiv_id")
+            if deleted:
+                db.conn.executemany(
+                    "UPDATE papers_metadata SET is_active = 0 WHERE arxiv_id = ?",
+                    [(arxiv_id,) for arxiv_id in deleted],
+                )
+
+        from services.citation_resolver import get_resolution_index
+
+        index = get_resolution_index(build=False)
+        if index:
+            for record in active:
+                index.add_metadata(record)
+
+    def _load_state(self) -> Dict:
+        try:
+            row = harvest_state[self.state_key]
+        except Exception:
+            return {}
+        return row.__dict__ if hasattr(row, "__dict__") else dict(row)
+
+    def _save_state(self, records: int = 0, **fields):
+        state = self._load_state()
+        state.update(fields)
+        state["source"] = self.state_key
+        state["records_harvested"] = (state.get("records_harvested") or 0) + records
+        state["updated_at"] = datetime.now().isoformat()
+        harvest_state.upsert(state, pk="source")
+
+
+def _clean_text(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def harvest_arxiv_metadata(
+    from_date: Optional[str] = None,
+    set_spec: Optional[str] = None,
+    max_pages: Optional[int] = None,
+) -> Dict:
+    """
+    Convenience entry point for running an incremental harvest
+
+    Args:
+        from_date: YYYY-MM-DD override for the stored watermark
+        set_spec: Optional OAI set (e.g. "cs")
+        max_pages: Optional page limit for this run
+
+    Returns:
+        Harvest summary
+    """
+    harvester = ArxivHarvester(set_spec=set_spec)
+    return harvester.harvest(from_date=from_date, max_pages=max_pages)
+
+
+def main():
+    """command-line interface."""
+    parser = argparse.ArgumentParser(description="harvest arxiv metadata over oai-pmh.")
+    parser.add_argument("--from-date", help="yyyy-mm-dd override for the watermark.")
+    parser.add_argument("--set", dest="set_spec", help="oai set, e.g. cs.")
+    parser.add_argument("--max-pages", type=int, help="stop after this many pages.")
+    parser.add_argument("--base-url", help="oai-pmh endpoint (e.g. a local stand-in feed).")
+    parser.add_argument(
+        "--delay", type=float, default=3.0, help="seconds between page requests."
+    )
+    args = parser.parse_args()
+
+    harvester = ArxivHarvester(
+        base_url=args.base_url, set_spec=args.set_spec, request_delay=args.delay
+    )
+    summary = harvester.harvest(from_date=args.from_date, max_pages=args.max_pages)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Corpus-wide citation graph
+Keeps every citations_network edge in sparse CSR adjacency matrices and
+answers cross-paper queries (cited-by, co-citation, bibliographic coupling)
+with sparse matrix products
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from models import db
+
+
+class CitationGraph:
+    """Sparse adjacency over all analyzed citation edges, refreshed incrementally"""
+
+    def __init__(self):
+        self.node_index: Dict[str, int] = {}
+        self.node_ids: List[str] = []
+        self.last_edge_id = 0
+        self.version = 0
+        # adjacency[i, j] == 1 when paper i cites paper j
+        self.adjacency = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.adjacency_t = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.pagerank_vector: Optional[np.ndarray] = None
+        self.pagerank_edge_id = 0
+        self._lock = threading.RLock()
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return int(self.adjacency.nnz)
+
+    def refresh(self) -> int:
+        """
+        Load edges added since the last refresh and merge them into the matrices
+
+        Returns:
+            Number of new edges read
+        """
+        with self._lock:
+            rows = db.q(
+                "SELECT id, citing_paper_id, cited_paper_id FROM citations_network "
+                "WHERE id > ? ORDER BY id",
+                [self.last_edge_id],
+            )
+            if not rows:
+                return 0
+
+            sources = np.fromiter(
+                (self._node(r["citing_paper_id"]) for r in rows), dtype=np.int64
+            )
+            targets = np.fromiter(
+                (self._node(r["cited_paper_id"]) for r in rows), dtype=np.int64
+            )
+            self.last_edge_id = rows[-1]["id"]
+
+            n = self.num_nodes
+            delta = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=np.float32), (sources, targets)), shape=(n, n)
+            )
+            adjacency = self.adjacency.copy()
+            adjacency.resize((n, n))
+            adjacency = adjacency + delta
+            # Several citation keys can point at the same paper: keep edges binary
+            adjacency.data[:] = 1.0
+            adjacency.eliminate_zeros()
+
+            self.adjacency = adjacency.tocsr()
+            self.adjacency_t = self.adjacency.T.tocsr()
+            self.version += 1
+
+            print(
+                f"[PASS] citation graph refreshed: +{len(rows)} edges, "
+                f"{self.num_nodes} papers, {self.num_edges} edges"
+            )
+            return len(rows)
+
+    def cited_by(self, arxiv_id: str, limit: int = 50) -> List[Dict]:
+        """Papers in the corpus that cite arxiv_id"""
+        index = self.node_index.get(arxiv_id)
+        if index is None:
+            return []
+        row = self.adjacency_t.getrow(index)
+        citing = row.indices[:limit]
+        out_degree = np.diff(self.adjacency.indptr)
+        return [
+            {"arxiv_id": self.node_ids[i], "references": int(out_degree[i])}
+            for i in citing
+        ]
+
+    def co_cited(self, arxiv_id: str, limit: int = 20) -> List[Dict]:
+        """
+        Papers most often cited together with arxiv_id
+
+        Co-citation counts come from one sparse product: A^T (A e_x), i.e. for
+        every paper, how many citing papers also cite arxiv_id
+        """
+        index = self.node_index.get(arxiv_id)
+        if index is None:
+            return []
+
+        citing_column = self.adjacency_t.getrow(index)  # who cites x
+        counts = citing_column @ self.adjacency  # what else they cite
+        in_degree = np.diff(self.adjacency_t.indptr)
+        return self._rank(counts, index, in_degree, limit, "co_citations")
+
+    def coupling(self, arxiv_id: str, limit: int = 20) -> List[Dict]:
+        """
+        Papers sharing the most references with arxiv_id (bibliographic coupling)
+
+        Shared-reference counts come from one sparse product: A (A^T e_x)
+        """
+        index = self.node_index.get(arxiv_id)
+        if index is None:
+            return []
+
+        references = self.adjacency.getrow(index)  # what x cites
+        counts = references @ self.adjacency_t  # who else cites them
+        out_degree = np.diff(self.adjacency.indptr)
+        return self._rank(counts, index, out_degree, limit, "shared_references")
+
+    def compute_pagerank(
+        self, damping: float = 0.85, tol: float = 1e-10, max_iter: int = 200
+    ) -> np.ndarray:
+        """
+        PageRank over the citation graph by sparse power iteration
+
+        Rank flows from citing to cited papers; papers with no outgoing edges
+        spread their mass uniformly. Iteration starts from the previous vector
+        (new papers get the uniform share), so after a small batch of new edges
+        it converges in a handful of iterations.
+
+        Returns:
+            Stationary distribution indexed like node_ids
+        """
+        with self._lock:
+            n = self.num_nodes
+            if n == 0:
+                return np.zeros(0)
+
+            rank = np.full(n, 1.0 / n)
+            if self.pagerank_vector is not None and self.pagerank_vector.size:
+                previous = self.pagerank_vector[:n]
+                rank[: previous.size] = previous
+                rank /= rank.sum()
+
+            out_degree = np.diff(self.adjacency.indptr).astype(np.float64)
+            dangling = out_degree == 0
+            inv_out_degree = np.divide(
+                1.0, out_degree, out=np.zeros(n), where=~dangling
+            )
+
+            for iteration in range(1, max_iter + 1):
+                spread = self.adjacency_t @ (rank * inv_out_degree)
+                new_rank = damping * spread + (
+                    damping * rank[dangling].sum() + (1.0 - damping)
+                ) / n
+                delta = np.abs(new_rank - rank).sum()
+                rank = new_rank
+                if delta < tol:
+                    break
+
+            self.pagerank_vector = rank
+            self.pagerank_edge_id = self.last_edge_id
+            print(f"[PASS] pagerank converged in {iteration} iterations over {n} papers")
+            return rank
+
+    def _rank(
+        self,
+        counts: sparse.csr_matrix,
+        index: int,
+        degree: np.ndarray,
+        limit: int,
+        count_field: str,
+    ) -> List[Dict]:
+        """Top-k of a sparse count row, scored by cosine (Salton) normalization"""
+        counts = counts.tocsr()
+        neighbours = counts.indices
+        values = counts.data
+        keep = neighbours != index
+        neighbours, values = neighbours[keep], values[keep]
+        if neighbours.size == 0:
+            return []
+
+        scores = values / np.sqrt(np.maximum(degree[neighbours] * degree[index], 1))
+        if neighbours.size > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(neighbours.size)
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {
+                "arxiv_id": self.node_ids[neighbours[i]],
+                count_field: int(values[i]),
+                "score": round(float(scores[i]), 4),
+            }
+            for i in top
+        ]
+
+    def _node(self, arxiv_id: str) -> int:
+        index = self.node_index.get(arxiv_id)
+        if index is None:
+            index = len(self.node_ids)
+            self.node_index[arxiv_id] = index
+            self.node_ids.append(arxiv_id)
+        return index
+
+
+_citation_graph: Optional[CitationGraph] = None
+_graph_lock = threading.Lock()
+
+
+def get_citation_graph(refresh: bool = True) -> CitationGraph:
+    """Get the process-wide citation graph, pulling in any new edges first"""
+    global _citation_graph
+    with _graph_lock:
+        if _citation_graph is None:
+            _citation_graph = CitationGraph()
+    if refresh:
+        _citation_graph.refresh()
+    return _citation_graph
+
+
+def update_influence_scores() -> bool:
+    """
+    Recompute global PageRank if new edges arrived and persist it to paper_influence
+
+    The first call in a process warm-starts from the persisted scores.
+
+    Returns:
+        True if scores were recomputed
+    """
+    graph = get_citation_graph()
+    with graph._lock:
+        if graph.pagerank_vector is None:
+            _load_persisted_pagerank(graph)
+        if graph.pagerank_edge_id == graph.last_edge_id and graph.pagerank_vector is not None:
+            return False
+
+        rank = graph.compute_pagerank()
+        n = rank.size
+        computed_at = datetime.now().isoformat()
+        rows = [
+            (arxiv_id, float(rank[i]), float(rank[i] * n), graph.last_edge_id, computed_at)
+            for i, arxiv_id in enumerate(graph.node_ids)
+        ]
+
+    with db.conn:
+        db.conn.executemany(
+            """INSERT OR REPLACE INTO paper_influence (
+                arxiv_id, pagerank, influence_score, graph_version, computed_at
+            ) VALUES (?, ?, ?, ?, ?)""",
+            rows,
+        )
+    print(f"[PASS] persisted influence scores for {len(rows)} papers")
+    return True
+
+
+def _load_persisted_pagerank(graph: CitationGraph):
+    """Seed the graph's PageRank vector from paper_influence (warm start across restarts)"""
+    rows = db.q("SELECT arxiv_id, pagerank, graph_version FROM paper_influence")
+    if not rows:
+        return
+
+    rank = np.full(graph.num_nodes, 0.0)
+    for row in rows:
+        index = graph.node_index.get(row["arxiv_id"])
+        if index is not None:
+            rank[index] = row["pagerank"] or 0.0
+    if rank.sum() > 0:
+        graph.pagerank_vector = rank
+        graph.pagerank_edge_id = max(row["graph_version"] or 0 for row in rows)
+
+
+def attach_titles(results: List[Dict]) -> List[Dict]:
+    """Add cached titles from papers_metadata to graph query results (one query)"""
+    if not results:
+        return results
+    ids = [r["arxiv_id"] for r in results]
+    placeholders = ", ".join("?" for _ in ids)
+    rows = db.q(
+        f"SELECT arxiv_id, title FROM papers_metadata WHERE arxiv_id IN ({placeholders})",
+        ids,
+    )
+    titles = {row["arxiv_id"]: row["title"] for row in rows}
+    for result in results:
+        result["title"] = titles.get(result["arxiv_id"], "")
+    return results
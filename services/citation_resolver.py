@@ -0,0 +1,450 @@
+"""
+Local citation resolution index
+Resolves bibliography references to arXiv IDs without network calls, using
+explicit arXiv identifiers first and then MinHash title matching against
+papers_metadata plus an optional arXiv metadata snapshot
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from dataclasses import asdict, is_dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from models import papers_metadata
+
+# MinHash / LSH parameters: 16 bands of 4 rows gives ~99% recall at Jaccard 0.7
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 4
+MIN_CONFIDENCE = 0.75
+
+_HASH_PRIME = np.uint64(4294967291)  # largest prime below 2**32
+_rng = np.random.RandomState(1729)
+_PERM_A = _rng.randint(1, 2**32 - 5, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, 2**32 - 5, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+_ARXIV_PATTERNS = [
+    (r"10\.48550/arXiv\.(\d{4}\.\d{4,5})", 1.0),  # arXiv-issued DOI
+    (r"arXiv:(\d{4}\.\d{4,5})", 1.0),
+    (r"arxiv\.org/abs/(\d{4}\.\d{4,5})", 1.0),
+    (r"(\d{4}\.\d{4,5})", 0.8),  # Simple pattern as fallback
+]
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, strip LaTeX markup and accents, collapse to alphanumeric words"""
+    if not title:
+        return ""
+    text = re.sub(r"\\[a-zA-Z]+\*?", " ", title)
+    text = text.replace("~", " ")
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    text = re.sub(r"[^a-z0-9]+", " ", text.lower())
+    return text.strip()
+
+
+def title_shingles(normalized: str) -> Set[str]:
+    """Character shingles of a normalized title"""
+    compact = normalized.replace(" ", "_")
+    if len(compact) <= SHINGLE_SIZE:
+        return {compact} if compact else set()
+    return {
+        compact[i : i + SHINGLE_SIZE] for i in range(len(compact) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash_signature(shingles: Iterable[str]) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint64 values) for a set of shingles"""
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64
+    )
+    if hashes.size == 0:
+        return np.full(NUM_PERM, _HASH_PRIME, dtype=np.uint64)
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) % _HASH_PRIME).min(axis=0)
+
+
+def author_surnames(authors) -> Set[str]:
+    """
+    Extract normalized author surnames
+
+    Args:
+        authors: BibTeX author string ("Last, First and ..."), free-text
+            bibliography author list, or a list of full names
+
+    Returns:
+        Set of lowercase ASCII surnames
+    """
+    if not authors:
+        return set()
+
+    if isinstance(authors, str):
+        text = re.sub(r"\\[a-zA-Z]+\*?", " ", authors).replace("~", " ")
+        text = text.replace("{", "").replace("}", "")
+        parts = text.split(" and ")
+        if all(part.count(",") == 1 for part in parts):
+            # BibTeX style: "Last, First and Last, First"
+            names = [part.split(",")[0] for part in parts]
+        else:
+            names = re.split(r",|\band\b|&", text)
+    else:
+        names = list(authors)
+
+    surnames = set()
+    for name in names:
+        if isinstance(name, (list, tuple)):
+            # authors_parsed style: [last, first, suffix]
+            name = name[0] if name else ""
+        tokens = [t for t in re.split(r"[\s.]+", normalize_title(str(name))) if t]
+        tokens = [t for t in tokens if len(t) > 1 and t not in ("et", "al")]
+        if tokens:
+            surnames.add(tokens[-1])
+    return surnames
+
+
+def arxiv_id_year(arxiv_id: str) -> Optional[int]:
+    """Submission year encoded in an arXiv identifier"""
+    match = re.match(r"(\d{2})(\d{2})\.\d{4,5}", arxiv_id or "")
+    if not match:
+        match = re.match(r"[a-z\-]+(?:\.[A-Z]{2})?/(\d{2})(\d{2})\d{3}", arxiv_id or "")
+    if not match:
+        return None
+    yy = int(match.group(1))
+    return 2000 + yy if yy < 91 else 1900 + yy
+
+
+def _parse_year(value) -> Optional[int]:
+    match = re.search(r"\b(19|20)\d{2}\b", str(value or ""))
+    return int(match.group(0)) if match else None
+
+
+def _reference_to_dict(reference) -> Dict:
+    if is_dataclass(reference):
+        return asdict(reference)
+    return dict(reference or {})
+
+
+def _reference_title_candidates(reference: Dict) -> List[str]:
+    """
+    Possible titles for a reference; .bbl entries often only carry the title
+    as the second \\newblock segment, so try that alongside the parsed title
+    """
+    candidates = []
+    if reference.get("title"):
+        candidates.append(reference["title"])
+
+    blocks = re.split(r"\\newblock", reference.get("raw_entry", "") or "")
+    if len(blocks) > 1:
+        candidates.append(blocks[1])
+    return candidates
+
+
+def _reference_authors(reference: Dict) -> str:
+    if reference.get("authors"):
+        return reference["authors"]
+    # .bbl entries list authors before the first \newblock
+    raw_entry = reference.get("raw_entry", "") or ""
+    return re.split(r"\\newblock", raw_entry)[0] if "\\newblock" in raw_entry else ""
+
+
+class CitationResolutionIndex:
+    """In-memory MinHash/LSH index of arXiv titles for offline citation resolution"""
+
+    def __init__(self):
+        self.arxiv_ids: List[str] = []
+        self.signatures: List[np.ndarray] = []
+        self.surnames: List[Set[str]] = []
+        self.years: List[Optional[int]] = []
+        self.exact_titles: Dict[str, int] = {}
+        self.id_positions: Dict[str, int] = {}
+        self.bands: List[Dict[bytes, List[int]]] = [{} for _ in range(LSH_BANDS)]
+        self.is_loaded = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.arxiv_ids)
+
+    def add_paper(
+        self, arxiv_id: str, title: str, authors=None, year: Optional[int] = None
+    ) -> bool:
+        """
+        Add (or skip, if already present) a single paper to the index
+
+        Args:
+            arxiv_id: arXiv paper ID
+            title: Paper title
+            authors: Author names in any format accepted by author_surnames
+            year: Submission year; derived from the arXiv ID when omitted
+
+        Returns:
+            True if the paper was added
+        """
+        normalized = normalize_title(title)
+        if not arxiv_id or not normalized:
+            return False
+
+        with self._lock:
+            if arxiv_id in self.id_positions:
+                return False
+
+            position = len(self.arxiv_ids)
+            signature = minhash_signature(title_shingles(normalized))
+
+            self.arxiv_ids.append(arxiv_id)
+            self.signatures.append(signature)
+            self.surnames.append(author_surnames(authors))
+            self.years.append(year or arxiv_id_year(arxiv_id))
+            self.id_positions[arxiv_id] = position
+            self.exact_titles.setdefault(normalized, position)
+
+            for band, key in enumerate(self._band_keys(signature)):
+                self.bands[band].setdefault(key, []).append(position)
+
+        return True
+
+    def add_metadata(self, metadata: Dict) -> bool:
+        """Add a papers_metadata-shaped record to the index"""
+        authors = metadata.get("authors", "[]")
+        if isinstance(authors, str):
+            try:
+                authors = json.loads(authors)
+            except json.JSONDecodeError:
+                pass
+        return self.add_paper(
+            metadata.get("arxiv_id", ""),
+            metadata.get("title", ""),
+            authors,
+            arxiv_id_year(metadata.get("arxiv_id", ""))
+            or _parse_year(metadata.get("published_date")),
+        )
+
+    def load_from_metadata_table(self) -> int:
+        """Index every paper in the papers_metadata cache"""
+        added = 0
+        for row in papers_metadata():
+            record = row.__dict__ if hasattr(row, "__dict__") else dict(row)
+            if self.add_metadata(record):
+                added += 1
+        print(f"[PASS] indexed {added} papers from papers_metadata")
+        return added
+
+    def load_snapshot(self, path: str, categories: Optional[List[str]] = None) -> int:
+        """
+        Index an arXiv metadata snapshot (JSON lines, one paper per line, as in
+        the public arXiv OAI snapshot dump)
+
+        Args:
+            path: Path to the snapshot file
+            categories: Optional category prefixes to keep (e.g. ["cs.", "stat.ML"])
+
+        Returns:
+            Number of papers added
+        """
+        added = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+                if categories:
+                    entry_categories = (entry.get("categories") or "").split()
+                    if not any(
+                        c.startswith(prefix)
+                        for c in entry_categories
+                        for prefix in categories
+                    ):
+                        continue
+
+                arxiv_id = entry.get("id") or entry.get("arxiv_id", "")
+                authors = entry.get("authors_parsed") or entry.get("authors", "")
+                if self.add_paper(arxiv_id, entry.get("title", ""), authors):
+                    added += 1
+
+        print(f"[PASS] indexed {added} papers from snapshot {path}")
+        return added
+
+    def lookup(
+        self, title: str, authors="", year=None
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Find the best matching arXiv paper for a title
+
+        Args:
+            title: Reference title
+            authors: Reference authors (used as a filter when both sides have them)
+            year: Reference year (arXiv submission must fall within a few years)
+
+        Returns:
+            (arxiv_id, confidence) or None when no confident match exists
+        """
+        normalized = normalize_title(title)
+        if len(normalized) < 10:
+            return None
+
+        query_surnames = author_surnames(authors)
+        query_year = _parse_year(year)
+
+        exact = self.exact_titles.get(normalized)
+        if exact is not None and self._passes_filters(exact, query_year):
+            return self.arxiv_ids[exact], self._confidence(1.0, exact, query_surnames)
+
+        signature = minhash_signature(title_shingles(normalized))
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self.bands[band].get(key, ()))
+
+        best = None
+        for position in candidates:
+            if not self._passes_filters(position, query_year):
+                continue
+            similarity = float(np.mean(self.signatures[position] == signature))
+            confidence = self._confidence(similarity, position, query_surnames)
+            if best is None or confidence > best[1]:
+                best = (self.arxiv_ids[position], confidence)
+
+        if best and best[1] >= MIN_CONFIDENCE:
+            return best
+        return None
+
+    def resolve(self, reference) -> Optional[Tuple[str, float]]:
+        """Resolve a Reference (dataclass or dict) by title, authors and year"""
+        reference = _reference_to_dict(reference)
+        authors = _reference_authors(reference)
+
+        best = None
+        for title in _reference_title_candidates(reference):
+            match = self.lookup(title, authors, reference.get("year"))
+            if match and (best is None or match[1] > best[1]):
+                best = match
+        return best
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * LSH_ROWS : (band + 1) * LSH_ROWS].tobytes()
+            for band in range(LSH_BANDS)
+        ]
+
+    def _passes_filters(self, position: int, query_year: Optional[int]) -> bool:
+        candidate_year = self.years[position]
+        if query_year and candidate_year:
+            # arXiv preprints precede (or coincide with) the venue version
+            if not (query_year - 3 <= candidate_year <= query_year + 1):
+                return False
+        return True
+
+    def _confidence(
+        self, similarity: float, position: int, query_surnames: Set[str]
+    ) -> float:
+        candidate_surnames = self.surnames[position]
+        if query_surnames and candidate_surnames:
+            if query_surnames & candidate_surnames:
+                return min(1.0, similarity + 0.1)
+            # authors disagree: only trust a near-identical title
+            return similarity - 0.2
+        return similarity * 0.95
+
+
+_index: Optional[CitationResolutionIndex] = None
+_index_lock = threading.Lock()
+_build_thread: Optional[threading.Thread] = None
+_build_thread_lock = threading.Lock()
+
+
+def get_resolution_index(build: bool = True) -> Optional[CitationResolutionIndex]:
+    """
+    Get the process-wide resolution index, building it on first use from
+    papers_metadata and the configured arXiv snapshot file
+
+    Args:
+        build: When False, return None instead of building an unloaded index
+    """
+    global _index
+    if _index is not None and _index.is_loaded:
+        return _index
+    if not build:
+        return None
+
+    with _index_lock:
+        if _index is None or not _index.is_loaded:
+            from config import arxiv_snapshot_path
+
+            index = CitationResolutionIndex()
+            try:
+                index.load_from_metadata_table()
+            except Exception as e:
+                print(f"[WARNING] could not index papers_metadata: {e}")
+            if arxiv_snapshot_path and os.path.exists(arxiv_snapshot_path):
+                try:
+                    index.load_snapshot(arxiv_snapshot_path)
+                except (IOError, OSError) as e:
+                    print(f"[WARNING] could not load arxiv snapshot: {e}")
+            index.is_loaded = True
+            _index = index
+    return _index
+
+
+def start_resolution_index_build():
+    """Build the resolution index on a background thread (startup hook; idempotent)"""
+    global _build_thread
+    with _build_thread_lock:
+        if _index is not None and _index.is_loaded:
+            return
+        if _build_thread is not None and _build_thread.is_alive():
+            return
+        _build_thread = threading.Thread(
+            target=get_resolution_index, name="citation-index-build", daemon=True
+        )
+        _build_thread.start()
+    print("[INFO] building citation resolution index in the background")
+
+
+def resolve_reference(reference, wait_for_index: bool = False) -> Tuple[Optional[str], str, float]:
+    """
+    Resolve a single reference to an arXiv ID without network access
+
+    Until the title index has been built only explicit IDs and arXiv DOIs
+    are matched; other references come back as "index_loading" so callers
+    can retry them later instead of treating them as unresolvable.
+
+    Args:
+        reference: Reference object (or dict) from the LaTeX parser
+        wait_for_index: Build the index inline if it is not ready (background
+            jobs); request paths leave this off
+
+    Returns:
+        (arxiv_id or None, resolution_method, confidence_score)
+    """
+    reference = _reference_to_dict(reference)
+    raw_entry = reference.get("raw_entry", "") or ""
+
+    # Strategy 1: arXiv ID extracted by the parser (e.g. BibTeX eprint field)
+    explicit_id = re.search(r"\d{4}\.\d{4,5}", reference.get("arxiv_id", "") or "")
+    if explicit_id:
+        return explicit_id.group(0), "arxiv_id_field", 1.0
+
+    # Strategy 2: arXiv ID patterns in the raw entry
+    for pattern, confidence in _ARXIV_PATTERNS:
+        matches = re.findall(pattern, raw_entry, re.IGNORECASE)
+        if matches:
+            return matches[0], "arxiv_pattern", confidence
+
+    # Strategy 3: title/author/year matching against the local index
+    index = get_resolution_index(build=wait_for_index)
+    if index is None:
+        start_resolution_index_build()
+        return None, "index_loading", 0.0
+    match = index.resolve(reference)
+    if match:
+        return match[0], "title_index", round(match[1], 3)
+
+    return None, "unresolved", 0.0
@@ -4,15 +4,27 @@ Integrates with existing LaTeX parser and arXiv metadata fetching
 """
 
 import json
+import os
 import re
+import threading
+import time
 import requests
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import asdict
+from xml.etree import ElementTree as ET
 
-from models import citations_network, papers_metadata, papers_citation_analysis
-from latex_parser import LaTeXParser
-from config import supabase, claude_client, claude_msg
+from models import db, papers_metadata, papers_citation_analysis
+from latex_parser import LaTeXParser, load_parsed_data, save_parsed_data
+from services.citation_graph import update_influence_scores
+from cache import LRUCache, make_etag
+from services.citation_resolver import resolve_reference, get_resolution_index
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+ARXIV_API_NS = "{http://arxiv.org/schemas/atom}"
+
+
+def _strip_version(arxiv_id: str) -> str:
+    return re.sub(r"v\d+$", "", arxiv_id)
 
 
 class CitationAnalysisService:
@@ -90,12 +102,19 @@ class CitationAnalysisService:
     async def _extract_citations_from_latex(
         self, arxiv_id: str, source_dir: str
     ) -> Dict[str, Any]:
-        """Extract citations using existing LaTeX parser"""
+        """Extract citations using existing LaTeX parser (reusing parsed_latex.json)"""
         print(f"[INFO] extracting citations from latex source in {source_dir}")
 
         try:
-            parser = LaTeXParser(source_dir)
-            citation_data = parser.parse_paper()
+            parsed_path = os.path.join(source_dir, "parsed_latex.json")
+            citation_data = None
+            if os.path.exists(parsed_path):
+                citation_data = load_parsed_data(parsed_path)
+
+            if not citation_data:
+                parser = LaTeXParser(source_dir)
+                citation_data = parser.parse_paper()
+                save_parsed_data(citation_data, parsed_path)
 
             print(
                 f"[PASS] found {len(citation_data['citations'])} citations and {len(citation_data['references'])} references"
@@ -133,7 +152,11 @@ class CitationAnalysisService:
                 continue
 
             # Try to resolve this citation to an arXiv ID
-            resolved_arxiv_id = await self._resolve_single_citation(reference)
+            (
+                resolved_arxiv_id,
+                resolution_method,
+                confidence_score,
+            ) = await self._resolve_single_citation(reference)
 
             resolved_citation = {
                 "citation_key": citation_key,
@@ -143,8 +166,8 @@ class CitationAnalysisService:
                 "file_name": citation.get("file_name", ""),
                 "line_number": citation.get("line_number", 0),
                 "resolved_arxiv_id": resolved_arxiv_id,
-                "confidence_score": 0.0,  # Will be updated by resolution process
-                "resolution_method": "unknown",
+                "confidence_score": confidence_score,
+                "resolution_method": resolution_method,
             }
 
             resolved_citations.append(resolved_citation)
@@ -154,7 +177,9 @@ class CitationAnalysisService:
         )
         return resolved_citations
 
-    async def _resolve_single_citation(self, reference: Dict) -> Optional[str]:
+    async def _resolve_single_citation(
+        self, reference: Dict
+    ) -> Tuple[Optional[str], str, float]:
         """
         Resolve a single reference to an arXiv ID using multiple strategies
 
@@ -162,36 +187,19 @@ class CitationAnalysisService:
             reference: Reference object from LaTeX parser
 
         Returns:
-            arXiv ID if found, None otherwise
+            (arXiv ID or None, resolution method, confidence score)
         """
-        raw_entry = reference.get("raw_entry", "")
-        title = reference.get("title", "")
-        authors = reference.get("authors", "")
-
-        # Strategy 1: Look for arXiv ID patterns in raw entry
-        arxiv_patterns = [
-            r"arXiv:(\d{4}\.\d{4,5})",
-            r"arxiv\.org/abs/(\d{4}\.\d{4,5})",
-            r"(\d{4}\.\d{4,5})",  # Simple pattern as fallback
-        ]
+        # Explicit arXiv IDs and arXiv DOIs first, then title/author matching
+        # against the local metadata index - no network calls on this path.
+        # Analyses run as background jobs, so they can wait for the title index
+        arxiv_id, method, confidence = resolve_reference(reference, wait_for_index=True)
 
-        for pattern in arxiv_patterns:
-            matches = re.findall(pattern, raw_entry, re.IGNORECASE)
-            if matches:
-                arxiv_id = matches[0]
-                # Validate format
-                if re.match(r"\d{4}\.\d{4,5}", arxiv_id):
-                    print(f"[PASS] found arxiv id via pattern: {arxiv_id}")
-                    return arxiv_id
-
-        # TODO: Add more sophisticated citation resolution methods
-        # - DOI lookup and resolution
-        # - Title/author matching against arXiv database
-        # - Venue/conference paper matching
-        # - Citation database lookup (Semantic Scholar, CrossRef, etc.)
-
-        print(f"[WARNING] could not resolve reference: {raw_entry[:100]}...")
-        return None
+        if arxiv_id:
+            print(f"[PASS] found arxiv id via {method}: {arxiv_id} ({confidence:.2f})")
+        else:
+            raw_entry = reference.get("raw_entry", "")
+            print(f"[WARNING] could not resolve reference: {raw_entry[:100]}...")
+        return arxiv_id, method, confidence
 
     async def _fetch_papers_metadata_batch(
         self, resolved_citations: List[Dict]
@@ -220,151 +228,130 @@ class CitationAnalysisService:
 
         print(f"[INFO] fetching metadata for {len(arxiv_ids)} unique papers")
 
-        metadata_results = {}
-        for arxiv_id in arxiv_ids:
-            try:
-                metadata = await self._fetch_single_paper_metadata(arxiv_id)
-                if metadata:
-                    metadata_results[arxiv_id] = metadata
-            except Exception as e:
-                print(f"[ERROR] failed to fetch metadata for {arxiv_id}: {e}")
-                continue
+        # One cache query for every paper, then one batched write for the misses
+        metadata_results = self._get_cached_metadata_batch(arxiv_ids)
+        print(f"[PASS] using cached metadata for {len(metadata_results)} papers")
+
+        missing = [arxiv_id for arxiv_id in arxiv_ids if arxiv_id not in metadata_results]
+        fresh_metadata = self.fetch_metadata_id_list(missing)
+        metadata_results.update(fresh_metadata)
+
+        self._cache_metadata_batch(list(fresh_metadata.values()))
 
         print(
             f"[PASS] successfully fetched metadata for {len(metadata_results)} papers"
         )
         return metadata_results
 
-    async def _fetch_single_paper_metadata(self, arxiv_id: str) -> Optional[Dict]:
+    def fetch_metadata_id_list(
+        self, arxiv_ids: List[str], chunk_size: int = 100
+    ) -> Dict[str, Dict]:
         """
-        Fetch metadata for a single arXiv paper, using cache when possible
+        Fetch metadata for many papers with batched id_list queries (no caching)
 
         Args:
-            arxiv_id: arXiv paper ID
+            arxiv_ids: arXiv paper IDs
+            chunk_size: IDs per arXiv API request
 
         Returns:
-            Paper metadata dictionary or None if failed
-        """
-        # Check if we have recent cached data
-        cached_data = self._get_cached_metadata(arxiv_id)
-        if cached_data:
-            print(f"[PASS] using cached metadata for {arxiv_id}")
-            return cached_data
-
-        # Fetch from arXiv API
-        try:
-            print(f"[INFO] fetching fresh metadata for {arxiv_id}")
-
-            # Query arXiv API
-            params = {"search_query": f"id:{arxiv_id}", "start": 0, "max_results": 1}
-
-            response = requests.get(self.arxiv_api_base, params=params, timeout=10)
-            response.raise_for_status()
-
-            # Parse XML response (simplified - you might want to use xml.etree.ElementTree)
-            content = response.text
-
-            # Extract basic info (this is a simplified parser - consider using xml.etree.ElementTree)
-            metadata = self._parse_arxiv_xml_response(content, arxiv_id)
-
-            if metadata:
-                # Cache the result
-                self._cache_metadata(arxiv_id, metadata)
-                return metadata
-
-        except Exception as e:
-            print(f"[ERROR] failed to fetch metadata for {arxiv_id}: {e}")
-
-        return None
-
-    def _parse_arxiv_xml_response(
-        self, xml_content: str, arxiv_id: str
-    ) -> Optional[Dict]:
-        """
-        Parse arXiv API XML response to extract paper metadata
-        (Simplified version - consider using xml.etree.ElementTree for production)
+            Dictionary mapping the requested arXiv IDs to papers_metadata records
         """
-        try:
-            # Extract title
-            title_match = re.search(
-                r"<title>([^<]+)</title>", xml_content, re.IGNORECASE
-            )
-            title = title_match.group(1).strip() if title_match else ""
-
-            # Extract summary/abstract
-            summary_match = re.search(
-                r"<summary>([^<]+)</summary>", xml_content, re.IGNORECASE
-            )
-            abstract = summary_match.group(1).strip() if summary_match else ""
-
-            # Extract authors (simplified)
-            authors_pattern = r"<name>([^<]+)</name>"
-            authors = re.findall(authors_pattern, xml_content, re.IGNORECASE)
-
-            # Extract published date
-            published_match = re.search(
-                r"<published>([^<]+)</published>", xml_content, re.IGNORECASE
-            )
-            published_date = published_match.group(1).strip() if published_match else ""
-
-            # Extract categories
-            category_pattern = r'<category term="([^"]+)"'
-            categories = re.findall(category_pattern, xml_content, re.IGNORECASE)
-
-            if title:  # At minimum we need a title
-                return {
-                    "arxiv_id": arxiv_id,
-                    "title": title,
-                    "authors": json.dumps(authors),
-                    "abstract": abstract,
-                    "categories": json.dumps(categories),
-                    "published_date": published_date,
-                    "updated_date": "",
-                    "doi": "",
-                    "journal_ref": "",
-                    "comment": "",
-                    "fetched_at": datetime.now().isoformat(),
-                    "is_active": True,
-                }
-
-        except Exception as e:
-            print(f"[ERROR] failed to parse arxiv xml for {arxiv_id}: {e}")
+        results = {}
+        for start in range(0, len(arxiv_ids), chunk_size):
+            chunk = arxiv_ids[start : start + chunk_size]
+            if start:
+                time.sleep(3)  # arXiv API asks for 3s between requests
+            try:
+                print(f"[INFO] fetching fresh metadata for {len(chunk)} papers")
+                response = requests.get(
+                    self.arxiv_api_base,
+                    params={
+                        "id_list": ",".join(chunk),
+                        "start": 0,
+                        "max_results": len(chunk),
+                    },
+                    timeout=30,
+                )
+                response.raise_for_status()
+                results.update(self._parse_arxiv_feed(response.content, chunk))
+            except Exception as e:
+                print(f"[ERROR] failed to fetch metadata batch: {e}")
+        return results
+
+    def _parse_arxiv_feed(self, content: bytes, requested_ids: List[str]) -> Dict[str, Dict]:
+        """Parse an arXiv API Atom feed into papers_metadata records keyed by requested ID"""
+        requested = {_strip_version(arxiv_id): arxiv_id for arxiv_id in requested_ids}
+        fetched_at = datetime.now().isoformat()
+        results = {}
+
+        root = ET.fromstring(content)
+        for entry in root.findall(f"{ATOM_NS}entry"):
+            entry_id = entry.findtext(f"{ATOM_NS}id", "").rsplit("/abs/", 1)[-1]
+            arxiv_id = requested.get(_strip_version(entry_id))
+            title = " ".join(entry.findtext(f"{ATOM_NS}title", "").split())
+            if not arxiv_id or not title:
+                continue
 
-        return None
+            results[arxiv_id] = {
+                "arxiv_id": arxiv_id,
+                "title": title,
+                "authors": json.dumps(
+                    [
+                        " ".join(name.split())
+                        for name in (
+                            author.findtext(f"{ATOM_NS}name", "")
+                            for author in entry.findall(f"{ATOM_NS}author")
+                        )
+                        if name
+                    ]
+                ),
+                "abstract": " ".join(entry.findtext(f"{ATOM_NS}summary", "").split()),
+                "categories": json.dumps(
+                    [c.get("term") for c in entry.findall(f"{ATOM_NS}category")]
+                ),
+                "published_date": entry.findtext(f"{ATOM_NS}published", ""),
+                "updated_date": entry.findtext(f"{ATOM_NS}updated", ""),
+                "doi": entry.findtext(f"{ARXIV_API_NS}doi", ""),
+                "journal_ref": entry.findtext(f"{ARXIV_API_NS}journal_ref", ""),
+                "comment": entry.findtext(f"{ARXIV_API_NS}comment", ""),
+                "fetched_at": fetched_at,
+                "is_active": True,
+            }
+        return results
 
-    def _get_cached_metadata(self, arxiv_id: str) -> Optional[Dict]:
-        """Check if we have recent cached metadata for this paper"""
+    def _get_cached_metadata_batch(self, arxiv_ids: List[str]) -> Dict[str, Dict]:
+        """Look up recent cached metadata for many papers with one query per 500 IDs"""
+        cached = {}
+        cutoff = (datetime.now() - timedelta(days=self.cache_ttl_days)).isoformat()
         try:
-            cached = papers_metadata(where=f"arxiv_id = '{arxiv_id}'")
-            if cached:
-                cached_entry = cached[0]
-                # Convert to dict if it's not already
-                if hasattr(cached_entry, "__dict__"):
-                    cached_dict = cached_entry.__dict__
-                elif hasattr(cached_entry, "_asdict"):
-                    cached_dict = cached_entry._asdict()
-                else:
-                    cached_dict = dict(cached_entry)
-
-                fetched_at = datetime.fromisoformat(cached_dict["fetched_at"])
-
-                # Check if cache is still valid
-                if datetime.now() - fetched_at < timedelta(days=self.cache_ttl_days):
-                    return cached_dict
-
+            for start in range(0, len(arxiv_ids), 500):
+                chunk = arxiv_ids[start : start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = db.q(
+                    f"SELECT * FROM papers_metadata WHERE arxiv_id IN ({placeholders}) "
+                    "AND fetched_at >= ?",
+                    [*chunk, cutoff],
+                )
+                cached.update({row["arxiv_id"]: row for row in rows})
         except Exception as e:
-            print(f"[WARNING] error checking cache for {arxiv_id}: {e}")
+            print(f"[WARNING] error checking metadata cache: {e}")
+        return cached
 
-        return None
-
-    def _cache_metadata(self, arxiv_id: str, metadata: Dict):
-        """Store metadata in cache"""
+    def _cache_metadata_batch(self, records: List[Dict]):
+        """Store many metadata records in one transaction"""
+        if not records:
+            return
         try:
-            # Use upsert to handle existing records
-            papers_metadata.upsert(metadata, pk="arxiv_id")
-            print(f"[PASS] cached metadata for {arxiv_id}")
+            with db.conn:
+                papers_metadata.upsert_all(records, pk="arxiv_id")
+            print(f"[PASS] cached metadata for {len(records)} papers")
+
+            index = get_resolution_index(build=False)
+            if index:
+                for metadata in records:
+                    index.add_metadata(metadata)
         except Exception as e:
-            print(f"[WARNING] failed to cache metadata for {arxiv_id}: {e}")
+            print(f"[WARNING] failed to cache metadata batch: {e}")
 
     def _calculate_citation_metrics(
         self, resolved_citations: List[Dict], metadata_results: Dict[str, Dict]
@@ -390,6 +377,10 @@ class CitationAnalysisService:
             if arxiv_id:
                 citation_counts[arxiv_id] = citation_counts.get(arxiv_id, 0) + 1
 
+        # Global influence (PageRank over the whole citation graph, 1.0 = average);
+        # papers the graph has not scored yet count as 0 until the next update
+        influence = _load_influence(list(citation_counts))
+
         # Create paper rankings
         papers_with_metrics = []
 
@@ -405,15 +396,7 @@ class CitationAnalysisService:
             # Calculate recency bonus (newer papers get slight boost)
             recency_score = self._calculate_recency_score(published_date)
 
-            # Calculate category relevance (papers in ML/CS get boost for now)
-            category_score = self._calculate_category_relevance(categories)
-
-            # Hybrid influence score: local citations + recency + category relevance
-            influence_score = (
-                local_citation_count * 2.0  # Local citation count (most important)
-                + recency_score * 0.3  # Recency bonus
-                + category_score * 0.2  # Category relevance
-            )
+            influence_score = influence.get(arxiv_id, 0.0)
 
             # Relevance score: how often cited + context diversity
             relevance_score = local_citation_count * 1.5 + recency_score * 0.5
@@ -436,9 +419,11 @@ class CitationAnalysisService:
                 }
             )
 
-        # Sort by different metrics
+        # Sort by different metrics (local citations break influence ties)
         most_influential = sorted(
-            papers_with_metrics, key=lambda x: x["influence_score"], reverse=True
+            papers_with_metrics,
+            key=lambda x: (x["influence_score"], x["local_citations"]),
+            reverse=True,
         )
         most_relevant = sorted(
             papers_with_metrics, key=lambda x: x["relevance_score"], reverse=True
@@ -490,23 +475,6 @@ class CitationAnalysisService:
         except Exception:
             return 0.0
 
-    def _calculate_category_relevance(self, categories: List[str]) -> float:
-        """Calculate category relevance score"""
-        # Define relevant categories (this could be made configurable)
-        high_relevance = ["cs.LG", "cs.AI", "cs.CL", "cs.CV", "stat.ML"]
-        medium_relevance = ["cs.IR", "cs.NE", "cs.HC", "cs.RO"]
-
-        score = 0.0
-        for category in categories:
-            if category in high_relevance:
-                score += 1.0
-            elif category in medium_relevance:
-                score += 0.5
-            else:
-                score += 0.1  # Small bonus for any category
-
-        return min(score, 2.0)  # Cap at 2.0
-
     async def _store_citation_analysis(self, arxiv_id: str, analysis_data: Dict):
         """Store citation analysis results in database"""
         try:
@@ -529,46 +497,495 @@ class CitationAnalysisService:
                 "latex_parsed": True,
             }
 
-            # Use upsert to handle existing records
-            papers_citation_analysis.upsert(analysis_record, pk="arxiv_id")
-
-            # Store individual citation relationships
-            for citation in analysis_data["citations"]:
-                if citation.get("resolved_arxiv_id"):
-                    citation_record = {
-                        "citing_paper_id": arxiv_id,
-                        "cited_paper_id": citation["resolved_arxiv_id"],
-                        "citation_key": citation["citation_key"],
-                        "citation_context": citation["citation_context"],
-                        "citation_command": citation["citation_command"],
-                        "raw_reference": citation["raw_reference"],
-                        "confidence_score": citation.get("confidence_score", 0.0),
-                        "resolved_at": datetime.now().isoformat(),
-                        "file_name": citation["file_name"],
-                        "line_number": citation["line_number"],
-                    }
-
-                    # Use upsert for citation relationships (they should be unique by combination)
-                    # Note: citations_network doesn't have a simple primary key, so we use insert with ignore
-                    try:
-                        citations_network.insert(citation_record)
-                    except Exception:
-                        # Skip if already exists (duplicate citation relationship)
-                        pass
-
+            # Pre-render the summary/network payloads and ranked paper rows so
+            # reads never have to parse analysis_data
+            views, paper_rows = self._build_materialized_views(
+                arxiv_id, analysis_record, analysis_data["metrics"]
+            )
+            analysis_record.update(views)
+
+            # Individual citation relationships; the unique index on
+            # (citing_paper_id, cited_paper_id, citation_key) makes re-runs idempotent
+            resolved_at = datetime.now().isoformat()
+            citation_rows = [
+                (
+                    arxiv_id,
+                    citation["resolved_arxiv_id"],
+                    citation["citation_key"],
+                    citation["citation_context"],
+                    citation["citation_command"],
+                    citation["raw_reference"],
+                    citation.get("confidence_score", 0.0),
+                    citation.get("resolution_method", ""),
+                    resolved_at,
+                    citation["file_name"],
+                    citation["line_number"],
+                )
+                for citation in analysis_data["citations"]
+                if citation.get("resolved_arxiv_id")
+            ]
+
+            # Whole analysis in one transaction
+            with db.conn:
+                papers_citation_analysis.upsert(analysis_record, pk="arxiv_id")
+                db.conn.executemany(
+                    """INSERT OR IGNORE INTO citations_network (
+                        citing_paper_id, cited_paper_id, citation_key,
+                        citation_context, citation_command, raw_reference,
+                        confidence_score, resolution_method, resolved_at,
+                        file_name, line_number
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    citation_rows,
+                )
+                self._write_analysis_papers(arxiv_id, paper_rows)
+
+            _invalidate_citation_payloads(arxiv_id)
             print(f"[PASS] stored citation analysis for {arxiv_id}")
 
+            # New edges: PageRank is recomputed in the background, coalescing
+            # analyses stored while an update is running
+            schedule_influence_update()
+
         except Exception as e:
             print(f"[ERROR] failed to store citation analysis: {e}")
             import traceback
 
             traceback.print_exc()
 
+    def _build_materialized_views(
+        self,
+        arxiv_id: str,
+        analysis_record: Dict,
+        metrics: Dict,
+    ) -> Tuple[Dict[str, str], List[Tuple]]:
+        """
+        Render the summary/network payloads and normalized ranking rows for an analysis
+
+        The payloads rank cited papers like get_most_influential_papers, by
+        current global influence with the stored order breaking ties. The
+        rows record the influence each paper was rendered with, which
+        refresh_influence_payloads compares against later updates.
+
+        Returns:
+            (payload columns for papers_citation_analysis, citation_analysis_papers rows)
+        """
+        influence = _load_influence(
+            [paper["arxiv_id"] for paper in metrics["most_influential_papers"]]
+        )
+        views = _render_payloads(arxiv_id, analysis_record, metrics, influence)
+
+        relevance_ranks = {
+            paper["arxiv_id"]: rank
+            for rank, paper in enumerate(metrics["most_relevant_papers"])
+        }
+        paper_rows = [
+            (
+                arxiv_id,
+                paper["arxiv_id"],
+                paper["title"],
+                json.dumps(paper["authors"]),
+                json.dumps(paper["categories"]),
+                paper["abstract"],
+                paper["published_date"],
+                paper["local_citations"],
+                influence.get(paper["arxiv_id"], 0.0),
+                paper["relevance_score"],
+                rank,
+                relevance_ranks.get(paper["arxiv_id"], rank),
+            )
+            for rank, paper in enumerate(metrics["most_influential_papers"])
+        ]
+        return views, paper_rows
+
+    def _write_analysis_papers(self, arxiv_id: str, paper_rows: List[Tuple]):
+        """Replace the ranked cited-paper rows for an analysis (call inside a transaction)"""
+        db.conn.execute(
+            "DELETE FROM citation_analysis_papers WHERE arxiv_id = ?", (arxiv_id,)
+        )
+        db.conn.executemany(
+            """INSERT INTO citation_analysis_papers (
+                arxiv_id, cited_paper_id, title, authors, categories, abstract,
+                published_date, local_citations, influence_score, relevance_score,
+                influence_rank, relevance_rank
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            paper_rows,
+        )
+
+    def _backfill_materialized_views(self, arxiv_id: str) -> bool:
+        """
+        Materialize payloads for an analysis stored before they existed
+        (one-off parse of analysis_data)
+        """
+        rows = db.q(
+            "SELECT * FROM papers_citation_analysis WHERE arxiv_id = ?", [arxiv_id]
+        )
+        if not rows or rows[0].get("summary_etag"):
+            return False
+
+        record = rows[0]
+        metrics = json.loads(record["analysis_data"])["metrics"]
+        metrics.setdefault(
+            "analysis_summary", json.loads(record.get("relevance_metrics") or "{}")
+        )
+        views, paper_rows = self._build_materialized_views(arxiv_id, record, metrics)
+
+        with db.conn:
+            db.conn.execute(
+                """UPDATE papers_citation_analysis
+                SET summary_json = ?, summary_etag = ?, network_json = ?, network_etag = ?
+                WHERE arxiv_id = ?""",
+                (
+                    views["summary_json"],
+                    views["summary_etag"],
+                    views["network_json"],
+                    views["network_etag"],
+                    arxiv_id,
+                ),
+            )
+            self._write_analysis_papers(arxiv_id, paper_rows)
+
+        print(f"[PASS] backfilled citation payloads for {arxiv_id}")
+        return True
+
+
+def _load_influence(arxiv_ids: List[str]) -> Dict[str, float]:
+    """Global influence scores of the given papers (unscored papers are absent)"""
+    influence = {}
+    for start in range(0, len(arxiv_ids), 500):
+        chunk = arxiv_ids[start : start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        rows = db.q(
+            f"SELECT arxiv_id, influence_score FROM paper_influence WHERE arxiv_id IN ({placeholders})",
+            chunk,
+        )
+        influence.update({row["arxiv_id"]: row["influence_score"] or 0.0 for row in rows})
+    return influence
+
+
+def _render_payloads(
+    arxiv_id: str, record: Dict, metrics: Dict, influence: Dict[str, float]
+) -> Dict[str, str]:
+    """Summary/network payload columns, with cited papers in global influence order"""
+    papers = [
+        {**paper, "influence_score": influence.get(paper["arxiv_id"], 0.0)}
+        for paper in metrics["most_influential_papers"]
+    ]
+    # stable sort: the stored order breaks ties
+    metrics = {
+        **metrics,
+        "most_influential_papers": sorted(papers, key=lambda paper: -paper["influence_score"]),
+    }
+    summary_json = json.dumps(_build_summary_payload(arxiv_id, record, metrics))
+    network_json = json.dumps(_build_network_payload(arxiv_id, record, metrics))
+    return {
+        "summary_json": summary_json,
+        "summary_etag": make_etag(summary_json),
+        "network_json": network_json,
+        "network_etag": make_etag(network_json),
+    }
+
+
+PAPER_PAYLOAD_FIELDS = (
+    "arxiv_id",
+    "title",
+    "authors",
+    "local_citations",
+    "influence_score",
+    "relevance_score",
+    "published_date",
+    "categories",
+    "abstract",
+)
+
+# payloads are re-rendered once a cited paper's influence has moved this much
+# (relative) from the value they were rendered with
+INFLUENCE_RERENDER_TOLERANCE = 0.05
+
+
+def refresh_influence_payloads(tolerance: float = INFLUENCE_RERENDER_TOLERANCE) -> int:
+    """
+    Re-render the summary/network payloads of analyses whose cited papers'
+    global influence moved beyond a tolerance after a PageRank update
+
+    The stale analyses are found by one join of citation_analysis_papers
+    (which holds each paper's rendered influence) against paper_influence;
+    only those are reloaded and rewritten. Comparing against the rendered
+    value, not the previous update, keeps small drifts from adding up.
+
+    Returns:
+        Number of analyses whose payloads were rewritten
+    """
+    stale = [
+        row["arxiv_id"]
+        for row in db.q(
+            """SELECT DISTINCT c.arxiv_id FROM citation_analysis_papers c
+            JOIN paper_influence p ON p.arxiv_id = c.cited_paper_id
+            WHERE ABS(p.influence_score - COALESCE(c.influence_score, 0))
+                > ? * MAX(p.influence_score, COALESCE(c.influence_score, 0))""",
+            [tolerance],
+        )
+    ]
+
+    for start in range(0, len(stale), 500):
+        chunk = stale[start : start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        records = db.q(
+            f"""SELECT arxiv_id, computed_at, total_citations_found, resolved_citations,
+            relevance_metrics FROM papers_citation_analysis
+            WHERE arxiv_id IN ({placeholders}) AND summary_etag IS NOT NULL""",
+            chunk,
+        )
+        papers: Dict[str, List[Dict]] = {}
+        for row in db.q(
+            f"""SELECT arxiv_id AS analysis_id, cited_paper_id AS arxiv_id, title, authors,
+            local_citations, influence_score, relevance_score, published_date, categories,
+            abstract, influence_rank, relevance_rank
+            FROM citation_analysis_papers WHERE arxiv_id IN ({placeholders})""",
+            chunk,
+        ):
+            papers.setdefault(row["analysis_id"], []).append(row)
+        influence = _load_influence(
+            list({row["arxiv_id"] for rows in papers.values() for row in rows})
+        )
+
+        payload_updates, score_updates = [], []
+        for record in records:
+            rows = papers.get(record["arxiv_id"], [])
+
+            def as_paper(row):
+                paper = {field: row[field] for field in PAPER_PAYLOAD_FIELDS}
+                paper["authors"] = json.loads(paper["authors"] or "[]")
+                paper["categories"] = json.loads(paper["categories"] or "[]")
+                return paper
+
+            metrics = {
+                "most_influential_papers": [
+                    as_paper(r) for r in sorted(rows, key=lambda r: r["influence_rank"])
+                ],
+                "most_relevant_papers": [
+                    as_paper(r) for r in sorted(rows, key=lambda r: r["relevance_rank"])
+                ],
+                "analysis_summary": json.loads(record["relevance_metrics"] or "{}"),
+            }
+            # the citing paper's score is the mean influence of what it cites
+            record["influence_score"] = sum(
+                influence.get(r["arxiv_id"], 0.0) for r in rows
+            ) / max(len(rows), 1)
+            views = _render_payloads(record["arxiv_id"], record, metrics, influence)
+            payload_updates.append(
+                (
+                    views["summary_json"],
+                    views["summary_etag"],
+                    views["network_json"],
+                    views["network_etag"],
+                    record["influence_score"],
+                    record["arxiv_id"],
+                )
+            )
+            score_updates += [
+                (influence.get(r["arxiv_id"], 0.0), record["arxiv_id"], r["arxiv_id"])
+                for r in rows
+            ]
+
+        with db.conn:
+            db.conn.executemany(
+                """UPDATE papers_citation_analysis
+                SET summary_json = ?, summary_etag = ?, network_json = ?, network_etag = ?,
+                influence_score = ?
+                WHERE arxiv_id = ?""",
+                payload_updates,
+            )
+            db.conn.executemany(
+                """UPDATE citation_analysis_papers SET influence_score = ?
+                WHERE arxiv_id = ? AND cited_paper_id = ?""",
+                score_updates,
+            )
+        for update in payload_updates:
+            _invalidate_citation_payloads(update[-1])
+
+    if stale:
+        print(f"[PASS] re-ranked citation payloads of {len(stale)} analyses")
+    return len(stale)
+
+
+_influence_lock = threading.Lock()
+_influence_state = {"dirty": False, "running": False, "runs": 0}
+
+
+def schedule_influence_update():
+    """
+    Mark global influence scores stale and make sure one background update
+    will pick that up; stores that arrive while an update runs are batched
+    into a single follow-up recompute
+    """
+    from services.job_service import get_job_manager
+
+    with _influence_lock:
+        _influence_state["dirty"] = True
+        if _influence_state["running"]:
+            return
+        _influence_state["running"] = True
+        _influence_state["runs"] += 1
+        run = _influence_state["runs"]
+    get_job_manager().submit(f"influence-scores:{run}", _run_influence_updates)
+
+
+def _run_influence_updates() -> Dict:
+    """Job: recompute PageRank until no new analyses are pending, then re-rank payloads"""
+    recomputed = 0
+    failures = 0
+    try:
+        while True:
+            with _influence_lock:
+                if not _influence_state["dirty"]:
+                    break
+                _influence_state["dirty"] = False
+            try:
+                recomputed += update_influence_scores()
+            except Exception as e:
+                print(f"[WARNING] failed to update global influence scores: {e}")
+                failures += 1
+                if failures < 3:
+                    # usually the shared connection was busy with a store
+                    with _influence_lock:
+                        _influence_state["dirty"] = True
+                    time.sleep(1.0)
+        rewritten = refresh_influence_payloads() if recomputed else 0
+    finally:
+        with _influence_lock:
+            _influence_state["running"] = False
+            # a store that raced with the exit above still gets its update
+            rerun = _influence_state["dirty"]
+    if rerun:
+        schedule_influence_update()
+    return {"recomputed": recomputed, "payloads_rewritten": rewritten}
+
+
+def _build_summary_payload(arxiv_id: str, record: Dict, metrics: Dict) -> Dict:
+    """Response body for /api/citations/{paper_id}/summary"""
+    return {
+        "success": True,
+        "paper_id": arxiv_id,
+        "has_analysis": True,
+        "computed_at": record["computed_at"],
+        "total_citations_found": record["total_citations_found"],
+        "resolved_citations": record["resolved_citations"],
+        "influence_score": record["influence_score"],
+        "analysis_summary": metrics["analysis_summary"],
+        "top_influential": metrics["most_influential_papers"][:3],
+        "top_relevant": metrics["most_relevant_papers"][:3],
+    }
+
+
+def _build_network_payload(arxiv_id: str, record: Dict, metrics: Dict) -> Dict:
+    """Response body for /api/citations/{paper_id}/network"""
+    # Add the main paper as central node
+    nodes = [
+        {
+            "id": arxiv_id,
+            "label": f"Paper {arxiv_id}",
+            "type": "main_paper",
+            "influence_score": record["influence_score"],
+            "citations_count": record["total_citations_found"],
+        }
+    ]
+    edges = []
+
+    # Add cited papers as nodes, with an edge from the main paper
+    for paper in metrics["most_influential_papers"]:
+        nodes.append(
+            {
+                "id": paper["arxiv_id"],
+                "label": (
+                    paper["title"][:50] + "..."
+                    if len(paper["title"]) > 50
+                    else paper["title"]
+                ),
+                "type": "cited_paper",
+                "influence_score": paper["influence_score"],
+                "local_citations": paper["local_citations"],
+                "published_date": paper["published_date"],
+            }
+        )
+        edges.append(
+            {
+                "source": arxiv_id,
+                "target": paper["arxiv_id"],
+                "weight": paper["local_citations"],
+                "type": "citation",
+            }
+        )
+
+    return {
+        "success": True,
+        "paper_id": arxiv_id,
+        "nodes": nodes,
+        "edges": edges,
+        "stats": {
+            "total_nodes": len(nodes),
+            "total_edges": len(edges),
+            "max_citations": max(edge["weight"] for edge in edges) if edges else 0,
+        },
+    }
+
+
+# Pre-rendered payloads by (arxiv_id, kind) -> (etag, body)
+_payload_cache = LRUCache(maxsize=256)
+PAYLOAD_KINDS = ("summary", "network")
+
+
+def _invalidate_citation_payloads(arxiv_id: str):
+    for kind in PAYLOAD_KINDS:
+        _payload_cache.invalidate((arxiv_id, kind))
+
 
 # Singleton instance
 citation_service = CitationAnalysisService()
 
 
+def get_citation_payload(arxiv_id: str, kind: str) -> Optional[Tuple[str, str]]:
+    """
+    Get a pre-rendered citation payload without touching analysis_data
+
+    Args:
+        arxiv_id: arXiv paper ID
+        kind: "summary" or "network"
+
+    Returns:
+        (JSON body, ETag), or None if the paper has no analysis
+    """
+    if kind not in PAYLOAD_KINDS:
+        raise ValueError(f"unknown payload kind: {kind}")
+
+    # Only the small ETag column is read per request; the body comes from the
+    # LRU while it is still current (other workers may have re-analyzed)
+    rows = db.q(
+        f"SELECT {kind}_etag AS etag FROM papers_citation_analysis WHERE arxiv_id = ?",
+        [arxiv_id],
+    )
+    if not rows:
+        return None
+
+    etag = rows[0]["etag"]
+    cached = _payload_cache.get((arxiv_id, kind))
+    if etag and cached and cached[0] == etag:
+        return cached[1], etag
+
+    if not etag:
+        citation_service._backfill_materialized_views(arxiv_id)
+
+    rows = db.q(
+        f"SELECT {kind}_json AS body, {kind}_etag AS etag "
+        "FROM papers_citation_analysis WHERE arxiv_id = ?",
+        [arxiv_id],
+    )
+    if not rows or not rows[0]["body"]:
+        return None
+
+    _payload_cache.set((arxiv_id, kind), (rows[0]["etag"], rows[0]["body"]))
+    return rows[0]["body"], rows[0]["etag"]
+
+
 async def get_paper_citation_analysis(arxiv_id: str, source_dir: str) -> Dict[str, Any]:
     """
     Main entry point for getting citation analysis for a paper
@@ -585,7 +1002,8 @@ async def get_paper_citation_analysis(arxiv_id: str, source_dir: str) -> Dict[st
 
 async def get_most_influential_papers(arxiv_id: str, limit: int = 10) -> List[Dict]:
     """
-    Get most influential papers cited by a given paper
+    Get most influential papers cited by a given paper, ranked by global
+    PageRank over the citation graph (the stored order breaks ties)
 
     Args:
         arxiv_id: arXiv paper ID
@@ -594,29 +1012,9 @@ async def get_most_influential_papers(arxiv_id: str, limit: int = 10) -> List[Di
     Returns:
         List of most influential cited papers
     """
-    try:
-        # Get cached analysis
-        cached = papers_citation_analysis(where=f"arxiv_id = '{arxiv_id}'")
-        if not cached:
-            return []
-
-        cached_entry = cached[0]
-        # Convert to dict if it's not already
-        if hasattr(cached_entry, "__dict__"):
-            cached_dict = cached_entry.__dict__
-        elif hasattr(cached_entry, "_asdict"):
-            cached_dict = cached_entry._asdict()
-        else:
-            cached_dict = dict(cached_entry)
-
-        analysis_data = json.loads(cached_dict["analysis_data"])
-        most_influential = analysis_data["metrics"]["most_influential_papers"]
-
-        return most_influential[:limit]
-
-    except Exception as e:
-        print(f"[ERROR] failed to get influential papers: {e}")
-        return []
+    return _get_ranked_cited_papers(
+        arxiv_id, "COALESCE(p.pagerank, 0) DESC, c.influence_rank", limit
+    )
 
 
 async def get_most_relevant_papers(arxiv_id: str, limit: int = 10) -> List[Dict]:
@@ -630,26 +1028,28 @@ async def get_most_relevant_papers(arxiv_id: str, limit: int = 10) -> List[Dict]
     Returns:
         List of most relevant cited papers
     """
+    return _get_ranked_cited_papers(arxiv_id, "c.relevance_rank", limit)
+
+
+def _get_ranked_cited_papers(arxiv_id: str, order_by: str, limit: int) -> List[Dict]:
+    """Read ranked cited papers from the normalized citation_analysis_papers table"""
+    query = f"""SELECT c.cited_paper_id AS arxiv_id, c.title, c.authors,
+        c.local_citations, COALESCE(p.influence_score, 0) AS influence_score,
+        c.relevance_score, c.published_date, c.categories, c.abstract
+        FROM citation_analysis_papers c
+        LEFT JOIN paper_influence p ON p.arxiv_id = c.cited_paper_id
+        WHERE c.arxiv_id = ?
+        ORDER BY {order_by} LIMIT ?"""
     try:
-        # Get cached analysis
-        cached = papers_citation_analysis(where=f"arxiv_id = '{arxiv_id}'")
-        if not cached:
-            return []
-
-        cached_entry = cached[0]
-        # Convert to dict if it's not already
-        if hasattr(cached_entry, "__dict__"):
-            cached_dict = cached_entry.__dict__
-        elif hasattr(cached_entry, "_asdict"):
-            cached_dict = cached_entry._asdict()
-        else:
-            cached_dict = dict(cached_entry)
-
-        analysis_data = json.loads(cached_dict["analysis_data"])
-        most_relevant = analysis_data["metrics"]["most_relevant_papers"]
+        rows = db.q(query, [arxiv_id, limit])
+        if not rows and citation_service._backfill_materialized_views(arxiv_id):
+            rows = db.q(query, [arxiv_id, limit])
 
-        return most_relevant[:limit]
+        for row in rows:
+            row["authors"] = json.loads(row["authors"] or "[]")
+            row["categories"] = json.loads(row["categories"] or "[]")
+        return rows
 
     except Exception as e:
-        print(f"[ERROR] failed to get relevant papers: {e}")
+        print(f"[ERROR] failed to get ranked cited papers: {e}")
         return []
@@ -0,0 +1,188 @@
+"""
+Background job runner for long-running work (e.g. citation analysis)
+Jobs are deduplicated by key and run on a small thread pool so request
+handlers only enqueue and poll. Status is written through to the
+background_jobs table, so any worker process can answer a poll
+"""
+
+import asyncio
+import inspect
+import json
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from models import db
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class BackgroundJobManager:
+    """Thread-pool job queue with per-key deduplication and status tracking"""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        retention_minutes: int = 60,
+        thread_name_prefix: str = "background-job",
+    ):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix
+        )
+        self.retention = timedelta(minutes=retention_minutes)
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_key: str, func: Callable, *args, **kwargs) -> Tuple[Dict, bool]:
+        """
+        Enqueue func(*args, **kwargs) unless a job with the same key is active
+
+        Coroutine functions are run to completion on the worker thread.
+
+        Args:
+            job_key: Deduplication key (e.g. "citation-analysis:2309.15028")
+            func: Callable or coroutine function to run
+
+        Returns:
+            (job status snapshot, True if an existing active job was reused)
+        """
+        with self._lock:
+            self._prune()
+            existing = self.jobs.get(job_key)
+            if existing and existing["status"] in ACTIVE_STATUSES:
+                return dict(existing), True
+
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "key": job_key,
+                "status": "queued",
+                "submitted_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self.jobs[job_key] = job
+            self._save(job)
+
+        self.executor.submit(self._run, job, func, args, kwargs)
+        print(f"[INFO] queued background job {job_key}")
+        return dict(job), False
+
+    def get(self, job_key: str) -> Optional[Dict]:
+        """
+        Snapshot of the latest job for a key, or None
+
+        Jobs submitted by another worker process are read from the
+        background_jobs table.
+        """
+        with self._lock:
+            job = self.jobs.get(job_key)
+            job = dict(job) if job else None
+        stored = self._load(job_key)
+        if job is None or (stored and stored["submitted_at"] > job["submitted_at"]):
+            return stored
+        return job
+
+    def _save(self, job: Dict):
+        """Write a job's current status through to the background_jobs table"""
+        try:
+            result = json.dumps(job["result"], default=str)
+        except (TypeError, ValueError):
+            result = None
+        try:
+            db.conn.execute(
+                """INSERT OR REPLACE INTO background_jobs (
+                    key, job_id, status, submitted_at, started_at, finished_at, result, error
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    job["key"],
+                    job["job_id"],
+                    job["status"],
+                    job["submitted_at"],
+                    job["started_at"],
+                    job["finished_at"],
+                    result,
+                    job["error"],
+                ),
+            )
+        except Exception as e:
+            print(f"[WARNING] failed to persist background job {job['key']}: {e}")
+
+    def _load(self, job_key: str) -> Optional[Dict]:
+        try:
+            rows = db.q("SELECT * FROM background_jobs WHERE key = ?", [job_key])
+        except Exception as e:
+            print(f"[WARNING] failed to read background job {job_key}: {e}")
+            return None
+        if not rows:
+            return None
+        job = rows[0]
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _run(self, job: Dict, func: Callable, args, kwargs):
+        job["status"] = "running"
+        job["started_at"] = datetime.now().isoformat()
+        self._save(job)
+        try:
+            if inspect.iscoroutinefunction(func):
+                result = asyncio.run(func(*args, **kwargs))
+            else:
+                result = func(*args, **kwargs)
+
+            if isinstance(result, dict) and result.get("error"):
+                job["error"] = result["error"]
+                job["status"] = "failed"
+            else:
+                job["status"] = "succeeded"
+            job["result"] = result
+            print(f"[PASS] background job {job['key']} {job['status']}")
+
+        except Exception as e:
+            traceback.print_exc()
+            job["error"] = str(e)
+            job["status"] = "failed"
+            print(f"[ERROR] background job {job['key']} failed: {e}")
+
+        finally:
+            job["finished_at"] = datetime.now().isoformat()
+            self._save(job)
+
+    def _prune(self):
+        """Drop finished jobs older than the retention window (caller holds the lock)"""
+        cutoff = (datetime.now() - self.retention).isoformat()
+        for key in [
+            key
+            for key, job in self.jobs.items()
+            if job["status"] not in ACTIVE_STATUSES
+            and (job["finished_at"] or "") < cutoff
+        ]:
+            del self.jobs[key]
+        try:
+            db.conn.execute(
+                "DELETE FROM background_jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (cutoff,),
+            )
+        except Exception as e:
+            print(f"[WARNING] failed to prune background jobs: {e}")
+
+
+# Singleton accessors
+_job_manager = BackgroundJobManager()
+# Library-change profile updates are frequent and short; their own worker
+# keeps them from queuing behind minutes-long citation analyses
+_profile_job_manager = BackgroundJobManager(
+    max_workers=1, thread_name_prefix="profile-job"
+)
+
+
+def get_job_manager() -> BackgroundJobManager:
+    return _job_manager
+
+
+def get_profile_job_manager() -> BackgroundJobManager:
+    return _profile_job_manager
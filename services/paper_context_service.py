@@ -0,0 +1,135 @@
+"""
+Paper context for AI replies with provider-side prompt caching
+The paper's document block is built once per (paper, version) and marked as
+a cache breakpoint, so repeated replies on the same paper re-use the cached
+prefix (tools + system prompt + paper) and only the note and scratchpad
+context after it are processed afresh
+"""
+
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+from cache import LRUCache
+
+ARXIV_VERSION_PATTERN = re.compile(r"^(.+?)(v\d+)$")
+
+
+class PaperContextManager:
+    """Builds and tracks the cached paper blocks used by AI replies"""
+
+    def __init__(self, maxsize: int = 256):
+        """
+        Args:
+            maxsize: Number of (paper, version) blocks kept in memory
+        """
+        self.blocks = LRUCache(maxsize)
+        self.builds = 0
+        self.usage: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+
+    def resolve_version(self, paper_id: str) -> Tuple[str, str]:
+        """
+        The paper's base id and version
+
+        An explicit "vN" suffix wins. Otherwise the cached metadata's
+        updated date stands in for the version (it changes when a new version
+        is posted); without metadata the version is "latest".
+        """
+        match = ARXIV_VERSION_PATTERN.match(paper_id)
+        if match:
+            return match.group(1), match.group(2)
+
+        from services.citation_service import citation_service
+
+        metadata = citation_service._get_cached_metadata_batch([paper_id]).get(paper_id)
+        if metadata and metadata.get("updated_date"):
+            return paper_id, metadata["updated_date"]
+        return paper_id, "latest"
+
+    def context_block(self, paper_id: str) -> Tuple[Tuple[str, str], Dict]:
+        """
+        The paper's document block, marked for prompt caching
+
+        The same dict is returned for every reply on a (paper, version), so
+        the serialized prefix is byte-identical and hits the provider cache.
+
+        Returns:
+            ((paper id, version), content block)
+        """
+        key = self.resolve_version(paper_id)
+        block = self.blocks.get(key)
+        if block is None:
+            base_id, version = key
+            # pin the PDF to the version when it is known
+            pdf_id = base_id + version if version.startswith("v") else base_id
+            block = {
+                "type": "document",
+                "source": {"type": "url", "url": f"https://arxiv.org/pdf/{pdf_id}"},
+                "title": f"arXiv:{pdf_id}",
+                "cache_control": {"type": "ephemeral"},
+            }
+            self.blocks.set(key, block)
+            with self._lock:
+                self.builds += 1
+        return key, block
+
+    def record_usage(self, key: Tuple[str, str], usage: Dict) -> bool:
+        """
+        Add one reply's token usage to the paper's totals
+
+        Returns:
+            True if the reply read the paper from the prompt cache
+        """
+        cache_hit = (usage.get("cache_read_input_tokens") or 0) > 0
+        with self._lock:
+            totals = self.usage.setdefault(
+                key,
+                {
+                    "replies": 0,
+                    "cache_hits": 0,
+                    "input_tokens": 0,
+                    "cache_creation_input_tokens": 0,
+                    "cache_read_input_tokens": 0,
+                    "output_tokens": 0,
+                },
+            )
+            totals["replies"] += 1
+            totals["cache_hits"] += cache_hit
+            for field in (
+                "input_tokens",
+                "cache_creation_input_tokens",
+                "cache_read_input_tokens",
+                "output_tokens",
+            ):
+                totals[field] += usage.get(field) or 0
+        return cache_hit
+
+    def stats(self) -> Dict:
+        with self._lock:
+            papers = [
+                {"paper_id": paper_id, "version": version, **totals}
+                for (paper_id, version), totals in self.usage.items()
+            ]
+            builds = self.builds
+        read = sum(p["cache_read_input_tokens"] for p in papers)
+        uncached = sum(p["input_tokens"] + p["cache_creation_input_tokens"] for p in papers)
+        return {
+            "blocks": len(self.blocks),
+            "builds": builds,
+            "replies": sum(p["replies"] for p in papers),
+            "cache_hits": sum(p["cache_hits"] for p in papers),
+            "cache_read_ratio": round(read / (read + uncached), 3) if read + uncached else None,
+            "papers": papers,
+        }
+
+
+# Singleton accessor
+_paper_context_manager: Optional[PaperContextManager] = None
+
+
+def get_paper_context_manager() -> PaperContextManager:
+    global _paper_context_manager
+    if _paper_context_manager is None:
+        _paper_context_manager = PaperContextManager()
+    return _paper_context_manager
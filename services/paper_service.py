@@ -9,6 +9,8 @@ from source_manager import (
     get_source_manager,
 )
 from models import library
+from services.prefetch_service import get_prefetch_service
+from services.user_profile_service import schedule_profile_update
 
 
 def load_paper_content(arxiv_url: str, session=None):
@@ -41,6 +43,7 @@ def load_paper_content(arxiv_url: str, session=None):
                     notes="",
                 )
                 print(f"Automatically added paper {paper_id} to {user_id}'s library")
+                schedule_profile_update(user_id, paper_id)
                 library_status = Span(
                     "✓ Added to your library",
                     style="color: #28a745; font-weight: 500; margin: 8px;",
@@ -57,6 +60,14 @@ def load_paper_content(arxiv_url: str, session=None):
                 style="color: #28a745; font-weight: 500; margin: 8px;",
             )
 
+    # Warm the most-cited references in the background so following one is fast
+    prefetch_service = get_prefetch_service()
+    if prefetch_service and download_result["parsed_latex"]:
+        try:
+            prefetch_service.schedule(paper_id, download_result["parsed_latex"], user_id)
+        except Exception as e:
+            print(f"Error scheduling prefetch: {e}")
+
     # Add source processing status for debugging
     source_info = ""
     if download_result["strategy"] == "source" and download_result["source_structure"]:
@@ -135,6 +146,7 @@ def load_paper_content(arxiv_url: str, session=None):
                 Script(src="/static/figure-detection.js", type="module"),
                 Script(src="/static/reference-extraction.js", type="module"),
                 Script(src="/static/figure-display.js", type="module"),
+                Script(src="/static/reference-previews.js", type="module"),
                 Script(src="/static/reference-resolver.js", type="module"),
                 Script(src="/static/paper-preview.js", type="module"),
                 Script(src="/static/test-utilities.js", type="module"),
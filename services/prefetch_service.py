@@ -0,0 +1,223 @@
+"""
+Next-hop prefetch of cited papers
+When a paper is opened, warm the metadata cache (and optionally the source/PDF
+downloads) for its most-cited resolved arXiv references in the background
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from source_manager import download_paper_content, get_source_manager
+from services.citation_resolver import resolve_reference
+
+BUDGET_WINDOW_SECONDS = 3600
+
+
+class PrefetchService:
+    """Low-priority, budgeted, cancellable prefetch queue for cited papers"""
+
+    def __init__(
+        self,
+        max_papers: int = 5,
+        download_content: bool = False,
+        user_budget: int = 25,
+        node_budget: int = 200,
+    ):
+        """
+        Args:
+            max_papers: Cited papers to prefetch per opened paper
+            download_content: Also download sources/PDFs (not just metadata)
+            user_budget: Papers one user may trigger per hour
+            node_budget: Papers this server prefetches per hour in total
+        """
+        self.max_papers = max_papers
+        self.download_content = download_content
+        self.user_budget = user_budget
+        self.node_budget = node_budget
+        # One worker so prefetch never competes with itself for bandwidth
+        self.executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="prefetch",
+            initializer=_lower_thread_priority,
+        )
+        self._node_window: deque = deque()
+        self._user_windows: Dict[str, deque] = {}
+        # Bumped on cancel or on the next paper load; queued work from an
+        # older generation is dropped
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def schedule(
+        self, paper_id: str, parsed_latex: Optional[Dict], user_id: Optional[str] = None
+    ):
+        """
+        Queue prefetch for the top cited arXiv papers of paper_id
+
+        Only the parsed LaTeX is handed to the worker; resolving references
+        and picking targets happen there, off the page-load request. Any
+        prefetch still queued for the same user is cancelled first.
+
+        Args:
+            paper_id: Paper that was just opened
+            parsed_latex: Parser output for that paper (citations/references)
+            user_id: Session user, or None for anonymous visitors
+        """
+        owner = user_id or "anonymous"
+        with self._lock:
+            generation = self._generations.get(owner, 0) + 1
+            self._generations[owner] = generation
+        self.executor.submit(self._run, owner, generation, paper_id, parsed_latex)
+
+    def cancel(self, user_id: Optional[str] = None) -> bool:
+        """Drop any queued or in-progress prefetch for a user"""
+        owner = user_id or "anonymous"
+        with self._lock:
+            if owner not in self._generations:
+                return False
+            self._generations[owner] += 1
+        print(f"[INFO] cancelled prefetch for {owner}")
+        return True
+
+    def _is_current(self, owner: str, generation: int) -> bool:
+        with self._lock:
+            return self._generations.get(owner) == generation
+
+    def _run(self, owner: str, generation: int, paper_id: str, parsed_latex: Optional[Dict]):
+        """Worker: pick targets within the budget, warm their metadata in one
+        batch, then optionally download content"""
+        if not self._is_current(owner, generation):
+            return
+
+        targets = select_prefetch_targets(parsed_latex, self.max_papers, exclude=paper_id)
+        with self._lock:
+            if self._generations.get(owner) != generation:
+                return
+            allowed = min(len(targets), self._remaining_budget(owner))
+            arxiv_ids, skipped = targets[:allowed], targets[allowed:]
+            self._consume_budget(owner, len(arxiv_ids))
+        if skipped:
+            print(f"[WARNING] prefetch budget exhausted for {owner}, skipped {len(skipped)}")
+        if not arxiv_ids:
+            return
+        print(f"[INFO] prefetching {len(arxiv_ids)} cited papers for {paper_id}")
+
+        from services.citation_service import citation_service
+
+        try:
+            asyncio.run(
+                citation_service._fetch_papers_metadata_batch(
+                    [{"resolved_arxiv_id": arxiv_id} for arxiv_id in arxiv_ids]
+                )
+            )
+        except Exception as e:
+            print(f"[ERROR] prefetching metadata for {paper_id} failed: {e}")
+
+        if not self.download_content:
+            return
+
+        source_manager = get_source_manager()
+        for arxiv_id in arxiv_ids:
+            if not self._is_current(owner, generation):
+                print(f"[INFO] prefetch for {paper_id} cancelled")
+                return
+            if _has_local_content(source_manager, arxiv_id):
+                continue
+            try:
+                download_paper_content(arxiv_id, source_manager)
+                print(f"[PASS] prefetched content for {arxiv_id}")
+            except Exception as e:
+                print(f"[ERROR] prefetching content for {arxiv_id} failed: {e}")
+
+    def _remaining_budget(self, owner: str) -> int:
+        """Papers still allowed in the current window (caller holds the lock)"""
+        cutoff = time.time() - BUDGET_WINDOW_SECONDS
+        user_window = self._user_windows.setdefault(owner, deque())
+        for window in (self._node_window, user_window):
+            while window and window[0] < cutoff:
+                window.popleft()
+        return max(
+            0,
+            min(
+                self.node_budget - len(self._node_window),
+                self.user_budget - len(user_window),
+            ),
+        )
+
+    def _consume_budget(self, owner: str, count: int):
+        now = time.time()
+        for _ in range(count):
+            self._node_window.append(now)
+            self._user_windows[owner].append(now)
+
+
+def select_prefetch_targets(
+    parsed_latex: Optional[Dict], limit: int, exclude: Optional[str] = None
+) -> List[str]:
+    """
+    Most-cited references that resolve to arXiv IDs, in citation-count order
+
+    Resolution uses the local resolver only (no network calls).
+    """
+    if not parsed_latex or limit <= 0:
+        return []
+
+    references = parsed_latex.get("references", {})
+    counts = Counter(c.get("key") for c in parsed_latex.get("citations", []))
+
+    targets = []
+    for key, _ in counts.most_common():
+        reference = references.get(key)
+        if not reference:
+            continue
+        arxiv_id, _, _ = resolve_reference(reference)
+        if arxiv_id and arxiv_id != exclude and arxiv_id not in targets:
+            targets.append(arxiv_id)
+            if len(targets) >= limit:
+                break
+    return targets
+
+
+def _has_local_content(source_manager, arxiv_id: str) -> bool:
+    return os.path.exists(
+        os.path.join(source_manager.sources_dir, arxiv_id)
+    ) or os.path.exists(f"static/{arxiv_id}.pdf")
+
+
+def _lower_thread_priority():
+    """Run the prefetch worker at a lower scheduling priority where supported"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+# Singleton accessor
+_prefetch_service: Optional[PrefetchService] = None
+
+
+def get_prefetch_service() -> Optional[PrefetchService]:
+    """Get the prefetch service, or None when PREFETCH_ENABLED is off"""
+    global _prefetch_service
+    if _prefetch_service is None:
+        from config import (
+            prefetch_enabled,
+            prefetch_max_papers,
+            prefetch_download_content,
+            prefetch_user_budget,
+            prefetch_node_budget,
+        )
+
+        if not prefetch_enabled:
+            return None
+        _prefetch_service = PrefetchService(
+            max_papers=prefetch_max_papers,
+            download_content=prefetch_download_content,
+            user_budget=prefetch_user_budget,
+            node_budget=prefetch_node_budget,
+        )
+    return _prefetch_service
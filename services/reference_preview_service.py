@@ -0,0 +1,172 @@
+"""
+Reference preview bundles for the paper viewer
+One precomputed payload per paper with title, authors, abstract and links for
+every reference that resolves to an arXiv ID, so the browser never has to
+query arXiv per click
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from cache import LRUCache, make_etag
+from source_manager import get_source_manager
+from services.citation_resolver import resolve_reference
+from services.citation_service import citation_service
+
+BUNDLE_FILENAME = "reference_previews.json"
+# incomplete bundles (some metadata lookups failed) are rebuilt after this long
+INCOMPLETE_BUNDLE_TTL_SECONDS = 300
+
+_bundle_cache = LRUCache(128)
+_build_locks: Dict[str, threading.Lock] = {}
+_build_locks_guard = threading.Lock()
+
+
+def get_reference_previews(paper_id: str) -> Optional[Tuple[str, str]]:
+    """
+    Get the reference preview bundle for a paper, building it on first request
+
+    Memory first, then the copy saved next to parsed_latex.json, then a fresh
+    build (batched metadata lookups through the papers_metadata cache).
+
+    Args:
+        paper_id: arXiv paper ID
+
+    Returns:
+        (JSON body, ETag) or None when the paper has no parsed LaTeX source
+    """
+    source_manager = get_source_manager()
+    paper_id = source_manager._clean_paper_id(paper_id)
+
+    cached = _cached_bundle(paper_id)
+    if cached:
+        return cached
+
+    # One build per paper at a time; concurrent requests wait and reuse it
+    with _build_locks_guard:
+        lock = _build_locks.setdefault(paper_id, threading.Lock())
+    with lock:
+        cached = _cached_bundle(paper_id)
+        if cached:
+            return cached
+
+        bundle_path = os.path.join(source_manager.sources_dir, paper_id, BUNDLE_FILENAME)
+        if os.path.exists(bundle_path):
+            try:
+                with open(bundle_path, "r", encoding="utf-8") as f:
+                    body = f.read()
+                payload = (body, make_etag(body))
+                _bundle_cache.set(paper_id, (payload, None))
+                return payload
+            except (IOError, OSError) as e:
+                print(f"[WARNING] could not read {bundle_path}: {e}")
+
+        parsed_latex = source_manager.parse_latex_content(paper_id)
+        if not parsed_latex:
+            return None
+
+        bundle = build_reference_previews(paper_id, parsed_latex)
+        body = json.dumps(bundle, separators=(",", ":"))
+        payload = (body, make_etag(body))
+
+        # Only persist complete bundles so failed lookups are retried later;
+        # incomplete ones are served from memory for a short while only
+        expires_at = None if bundle["complete"] else time.monotonic() + INCOMPLETE_BUNDLE_TTL_SECONDS
+        _bundle_cache.set(paper_id, (payload, expires_at))
+        if bundle["complete"]:
+            try:
+                with open(bundle_path, "w", encoding="utf-8") as f:
+                    f.write(body)
+            except (IOError, OSError) as e:
+                print(f"[WARNING] could not save reference previews: {e}")
+
+        return payload
+
+
+def _cached_bundle(paper_id: str) -> Optional[Tuple[str, str]]:
+    entry = _bundle_cache.get(paper_id)
+    if entry is None:
+        return None
+    payload, expires_at = entry
+    if expires_at is not None and time.monotonic() >= expires_at:
+        _bundle_cache.invalidate(paper_id)
+        return None
+    return payload
+
+
+def build_reference_previews(paper_id: str, parsed_latex: Dict) -> Dict:
+    """
+    Resolve every reference of a parsed paper and attach cached arXiv metadata
+
+    Args:
+        paper_id: arXiv paper ID
+        parsed_latex: Parser output (citations/references)
+
+    Returns:
+        Bundle with `references` (citation key -> arXiv ID) and `papers`
+        (arXiv ID -> preview)
+    """
+    references = parsed_latex.get("references", {})
+    citation_counts = Counter(c.get("key") for c in parsed_latex.get("citations", []))
+
+    key_to_arxiv = {}
+    index_loading = False
+    for key, reference in references.items():
+        arxiv_id, method, _ = resolve_reference(reference)
+        if arxiv_id:
+            key_to_arxiv[key] = arxiv_id
+        index_loading |= method == "index_loading"
+
+    arxiv_ids = sorted(set(key_to_arxiv.values()))
+    metadata = citation_service._get_cached_metadata_batch(arxiv_ids)
+    missing = [arxiv_id for arxiv_id in arxiv_ids if arxiv_id not in metadata]
+    if missing:
+        fresh = citation_service.fetch_metadata_id_list(missing)
+        citation_service._cache_metadata_batch(list(fresh.values()))
+        metadata.update(fresh)
+
+    papers = {}
+    for key, arxiv_id in key_to_arxiv.items():
+        preview = papers.get(arxiv_id)
+        if preview is None:
+            record = metadata.get(arxiv_id)
+            preview = papers[arxiv_id] = _preview_from_metadata(arxiv_id, record)
+        preview["reference_keys"].append(key)
+        preview["local_citations"] += citation_counts.get(key, 0)
+
+    print(
+        f"[PASS] built reference previews for {paper_id}: "
+        f"{len(papers)} arxiv papers from {len(references)} references"
+    )
+    return {
+        "paper_id": paper_id,
+        "references": key_to_arxiv,
+        "papers": papers,
+        # rebuilt once the title index is ready if fuzzy matching was skipped
+        "complete": not index_loading and all(arxiv_id in metadata for arxiv_id in arxiv_ids),
+        "generated_at": datetime.now().isoformat(),
+    }
+
+
+def _preview_from_metadata(arxiv_id: str, record: Optional[Dict]) -> Dict:
+    record = record or {}
+    return {
+        "arxiv_id": arxiv_id,
+        "title": record.get("title", ""),
+        "authors": json.loads(record.get("authors") or "[]"),
+        "abstract": record.get("abstract", ""),
+        "categories": json.loads(record.get("categories") or "[]"),
+        "published_date": record.get("published_date", ""),
+        "links": {
+            "abs": f"https://arxiv.org/abs/{arxiv_id}",
+            "pdf": f"https://arxiv.org/pdf/{arxiv_id}",
+        },
+        "has_metadata": bool(record),
+        "reference_keys": [],
+        "local_citations": 0,
+    }
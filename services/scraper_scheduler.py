@@ -0,0 +1,121 @@
+"""
+Background refresh of the scraper post indexes
+Each registered scraper's index is re-scraped on an interval with conditional
+requests and persisted; new posts are then embedded into the candidate index,
+so recommendation requests only ever read what is already on disk
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+from meta.scrapers import SCRAPER_REGISTRY
+from meta.scrapers.base import INDEX_DIR
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: every worker refreshes
+    fcntl = None
+
+
+class ScraperRefreshScheduler:
+    """Daemon thread that refreshes every scraper index on an interval"""
+
+    def __init__(self, interval_seconds: int = 3600):
+        """
+        Args:
+            interval_seconds: Time between refreshes of each scraper index
+        """
+        self.interval_seconds = interval_seconds
+        self.status: Dict[str, Dict] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the refresh loop (the first refresh runs immediately)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="scraper-refresh", daemon=True
+        )
+        self._thread.start()
+        print(f"[INFO] scraper refresh every {self.interval_seconds}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_all()
+            except Exception as e:
+                print(f"[ERROR] scraper refresh failed: {e}")
+            self._stop.wait(self.interval_seconds)
+
+    def refresh_all(self) -> Dict[str, int]:
+        """
+        Refresh every scraper index, then embed new posts into the candidate index
+
+        With several worker processes only one scrapes per round; the others
+        skip scraping and pick the persisted indexes up from disk.
+
+        Returns:
+            New post count per scraper (empty when another process holds the lock)
+        """
+        from recommender import get_candidate_index
+
+        new_posts: Dict[str, int] = {}
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        with open(os.path.join(INDEX_DIR, ".refresh.lock"), "a") as lock_file:
+            acquired = True
+            if fcntl:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    print("[INFO] scraper refresh running in another worker, skipping")
+                    acquired = False
+
+            if acquired:
+                for name, scraper in SCRAPER_REGISTRY.items():
+                    try:
+                        new_posts[name] = scraper.refresh_index()
+                        error = None
+                    except Exception as e:
+                        print(f"[ERROR] >>> refreshing {name} index failed: {e}")
+                        error = str(e)
+                    self.status[name] = {
+                        "posts": len(scraper.scraped_metas),
+                        "new_posts": new_posts.get(name, 0),
+                        "refreshed_at": scraper.refreshed_at,
+                        "error": error,
+                    }
+
+        # embeds only posts the persisted candidate index has not seen
+        get_candidate_index(force=True)
+        return new_posts
+
+
+# Singleton accessor
+_scraper_scheduler: Optional[ScraperRefreshScheduler] = None
+
+
+def get_scraper_scheduler() -> Optional[ScraperRefreshScheduler]:
+    """Get the scraper refresh scheduler, or None when SCRAPER_REFRESH_ENABLED is off"""
+    global _scraper_scheduler
+    if _scraper_scheduler is None:
+        from config import scraper_refresh_enabled, scraper_refresh_seconds
+
+        if not scraper_refresh_enabled:
+            return None
+        _scraper_scheduler = ScraperRefreshScheduler(interval_seconds=scraper_refresh_seconds)
+    return _scraper_scheduler
+
+
+def start_scraper_scheduler():
+    """Startup hook: load persisted indexes and start background refreshes"""
+    for scraper in SCRAPER_REGISTRY.values():
+        scraper.load_index()
+    scheduler = get_scraper_scheduler()
+    if scheduler:
+        scheduler.start()
@@ -0,0 +1,301 @@
+"""
+Per-user recommendation profiles
+A profile is the centroid of the user's library paper embeddings, kept as a
+running sum that library adds and removes update incrementally, so
+personalized recommendations cost one index search rather than one per paper
+"""
+
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings import get_embeddings, get_embedding_provider
+from models import db, library
+
+ARXIV_URL_PATTERN = re.compile(
+    r"arxiv\.org/(?:abs|pdf)/(\d{4}\.\d{4,5}|[a-z-]+(?:\.[A-Z]{2})?/\d{7})"
+)
+# papers whose metadata could not be fetched are not retried for this long
+UNRESOLVED_RETRY_SECONDS = 3600
+
+
+class UserProfileService:
+    """Maintains user_profiles / user_profile_papers"""
+
+    def __init__(self):
+        # serializes read-modify-write of profile sums within this process
+        self._lock = threading.Lock()
+        self._unresolved: Dict[str, float] = {}  # arxiv_id -> time.monotonic() of failure
+
+    def _paper_vectors(self, arxiv_ids: List[str], provider) -> Dict[str, np.ndarray]:
+        """Normalized embeddings of title + abstract for many papers (one batched call)"""
+        from services.citation_service import citation_service
+
+        metadata = citation_service._get_cached_metadata_batch(arxiv_ids)
+        now = time.monotonic()
+        missing = [
+            arxiv_id
+            for arxiv_id in arxiv_ids
+            if arxiv_id not in metadata
+            and now - self._unresolved.get(arxiv_id, -UNRESOLVED_RETRY_SECONDS)
+            >= UNRESOLVED_RETRY_SECONDS
+        ]
+        if missing:
+            fresh = citation_service.fetch_metadata_id_list(missing)
+            citation_service._cache_metadata_batch(list(fresh.values()))
+            metadata.update(fresh)
+            for arxiv_id in missing:
+                if arxiv_id not in fresh:
+                    self._unresolved[arxiv_id] = now
+
+        ids = [arxiv_id for arxiv_id in arxiv_ids if arxiv_id in metadata]
+        embeddings, _ = get_embeddings(
+            [metadata[i]["title"] + "\n" + (metadata[i]["abstract"] or "") for i in ids],
+            provider=provider,
+        )
+        vectors = {}
+        for arxiv_id, embedding in zip(ids, embeddings):
+            vector = np.asarray(embedding, dtype=np.float64)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vectors[arxiv_id] = vector / norm
+        return vectors
+
+    def _stored_vectors(
+        self, user_id: str, model: str, arxiv_ids: List[str]
+    ) -> Dict[str, np.ndarray]:
+        """The exact vectors these papers contributed to the profile sum"""
+        vectors = {}
+        for start in range(0, len(arxiv_ids), 500):
+            chunk = arxiv_ids[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = db.q(
+                f"SELECT arxiv_id, vector FROM user_profile_papers WHERE user_id = ? "
+                f"AND model = ? AND arxiv_id IN ({placeholders}) AND vector IS NOT NULL",
+                [user_id, model, *chunk],
+            )
+            vectors.update(
+                {row["arxiv_id"]: np.frombuffer(row["vector"], dtype=np.float64) for row in rows}
+            )
+        return vectors
+
+    def _members(self, user_id: str, model: str) -> set:
+        rows = db.q(
+            "SELECT arxiv_id FROM user_profile_papers WHERE user_id = ? AND model = ?",
+            [user_id, model],
+        )
+        return {row["arxiv_id"] for row in rows}
+
+    def _apply(self, user_id: str, model: str, vectors: Dict[str, np.ndarray], sign: int):
+        """Add (sign=1) or subtract (sign=-1) paper vectors in one transaction"""
+        with self._lock, db.conn:
+            members = self._members(user_id, model)
+            if sign > 0:
+                vectors = {k: v for k, v in vectors.items() if k not in members}
+            else:
+                vectors = {k: v for k, v in vectors.items() if k in members}
+            if not vectors:
+                return 0
+
+            row = db.q(
+                "SELECT vector, paper_count FROM user_profiles WHERE user_id = ? AND model = ?",
+                [user_id, model],
+            )
+            dim = len(next(iter(vectors.values())))
+            total = np.zeros(dim) if not row else np.frombuffer(row[0]["vector"], dtype=np.float64)
+            if total.shape[0] != dim:
+                raise ValueError(f"profile for {model} has {total.shape[0]} dims, got {dim}")
+            total = total + sign * np.sum(list(vectors.values()), axis=0)
+            count = (row[0]["paper_count"] if row else 0) + sign * len(vectors)
+
+            now = datetime.now().isoformat()
+            if count > 0:
+                db.execute(
+                    "INSERT OR REPLACE INTO user_profiles "
+                    "(user_id, model, vector, paper_count, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [user_id, model, total.tobytes(), count, now],
+                )
+            else:
+                db.execute(
+                    "DELETE FROM user_profiles WHERE user_id = ? AND model = ?",
+                    [user_id, model],
+                )
+
+            if sign > 0:
+                db.conn.executemany(
+                    "INSERT INTO user_profile_papers (user_id, model, arxiv_id, vector, added_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (user_id, model, arxiv_id, vector.tobytes(), now)
+                        for arxiv_id, vector in vectors.items()
+                    ],
+                )
+            else:
+                db.conn.executemany(
+                    "DELETE FROM user_profile_papers WHERE user_id = ? AND model = ? AND arxiv_id = ?",
+                    [(user_id, model, arxiv_id) for arxiv_id in vectors],
+                )
+            return len(vectors)
+
+    def add_papers(self, user_id: str, arxiv_ids: List[str], provider=None) -> int:
+        """Add library papers to the user's profile; returns how many were new"""
+        provider = provider or get_embedding_provider()
+        new_ids = [i for i in arxiv_ids if i not in self._members(user_id, provider.model_id)]
+        if not new_ids:
+            return 0
+        added = self._apply(user_id, provider.model_id, self._paper_vectors(new_ids, provider), 1)
+        if added:
+            print(f"[PASS] >>> added {added} papers to profile of {user_id}")
+        return added
+
+    def remove_papers(self, user_id: str, arxiv_ids: List[str], provider=None) -> int:
+        """
+        Subtract papers from the user's profile
+
+        Each paper's stored contribution is subtracted, so the sum does not
+        drift when its metadata (and so its embedding) changed since it was
+        added. Rows stored before contributions were kept are re-embedded.
+        """
+        provider = provider or get_embedding_provider()
+        members = self._members(user_id, provider.model_id)
+        counted = [i for i in arxiv_ids if i in members]
+        if not counted:
+            return 0
+        vectors = self._stored_vectors(user_id, provider.model_id, counted)
+        legacy = [i for i in counted if i not in vectors]
+        if legacy:
+            vectors.update(self._paper_vectors(legacy, provider))
+        removed = self._apply(user_id, provider.model_id, vectors, -1)
+        if removed:
+            print(f"[PASS] >>> removed {removed} papers from profile of {user_id}")
+        return removed
+
+    def sync(self, user_id: str, provider=None):
+        """Bring the profile in line with the library (first use, new model, or a missed update)"""
+        provider = provider or get_embedding_provider()
+        library_ids = {row.arxiv_id for row in library(where="user_id = ?", where_args=[user_id])}
+        members = self._members(user_id, provider.model_id)
+        if library_ids - members:
+            self.add_papers(user_id, sorted(library_ids - members), provider)
+        if members - library_ids:
+            self.remove_papers(user_id, sorted(members - library_ids), provider)
+
+    def get_profile(self, user_id: str, provider=None) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        The user's stored profile centroid for the current embedding model
+
+        Only reads user_profiles; building or catching up a profile is
+        schedule_profile_sync's job.
+
+        Returns:
+            (centroid vector, number of papers), or None if no profile is stored
+        """
+        provider = provider or get_embedding_provider()
+        row = db.q(
+            "SELECT vector, paper_count FROM user_profiles WHERE user_id = ? AND model = ?",
+            [user_id, provider.model_id],
+        )
+        if not row:
+            return None
+        total = np.frombuffer(row[0]["vector"], dtype=np.float64)
+        return (total / row[0]["paper_count"]).astype(np.float32), row[0]["paper_count"]
+
+
+def _refers_to(result: Dict, arxiv_ids: set) -> bool:
+    """True if a candidate is one of the given arXiv papers (by id or URL)"""
+    if result["id"] in arxiv_ids:
+        return True
+    match = ARXIV_URL_PATTERN.search(result.get("url") or "")
+    return bool(match and match.group(1) in arxiv_ids)
+
+
+def iter_user_recommendations(user_id: str, top_n: int = 10) -> Iterator[Dict]:
+    """
+    Recommendations scored against the user's library profile, yielded as
+    each source finishes (see recommender.iter_ranked); papers already in
+    the library are excluded
+
+    A profile out of step with the library is synced in the background.
+    Until the first one exists the response is empty with status "building"
+    ("empty" for an empty library, "ready" once ranked).
+    """
+    from recommender import iter_ranked, request_deadline
+
+    provider = get_embedding_provider()
+    service = get_user_profile_service()
+    library_ids = {row.arxiv_id for row in library(where="user_id = ?", where_args=[user_id])}
+    if library_ids != service._members(user_id, provider.model_id):
+        # first use, a new embedding model or a missed update
+        schedule_profile_sync(user_id, provider)
+
+    profile = service.get_profile(user_id, provider)
+    if profile is None:
+        yield {
+            "results": [],
+            "sources": {},
+            "partial": False,
+            "paper_count": 0,
+            "status": "building" if library_ids else "empty",
+            "done": True,
+        }
+        return
+
+    # the budget covers ranking only; the profile read above is local
+    deadline = request_deadline()
+    centroid, paper_count = profile
+    library_ids |= {re.sub(r"v\d+$", "", arxiv_id) for arxiv_id in library_ids}
+    for snapshot in iter_ranked(
+        centroid.tolist(),
+        top_n,
+        f"user {user_id} ({paper_count} papers)",
+        exclude=lambda result: _refers_to(result, library_ids),
+        headroom=len(library_ids),
+        deadline=deadline,
+    ):
+        if snapshot["done"]:
+            snapshot = {**snapshot, "paper_count": paper_count, "status": "ready"}
+        yield snapshot
+
+
+def get_user_recommendations(user_id: str, top_n: int = 10) -> Dict:
+    for snapshot in iter_user_recommendations(user_id, top_n):
+        pass
+    return snapshot
+
+
+def schedule_profile_update(user_id: str, arxiv_id: str, removed: bool = False):
+    """Update a profile after a library change, in the background"""
+    from services.job_service import get_profile_job_manager
+
+    service = get_user_profile_service()
+    if removed:
+        job_key = f"user-profile:{user_id}:remove:{arxiv_id}"
+        get_profile_job_manager().submit(job_key, service.remove_papers, user_id, [arxiv_id])
+    else:
+        job_key = f"user-profile:{user_id}:add:{arxiv_id}"
+        get_profile_job_manager().submit(job_key, service.add_papers, user_id, [arxiv_id])
+
+
+def schedule_profile_sync(user_id: str, provider=None):
+    """Bring a profile in line with the library, in the background"""
+    from services.job_service import get_profile_job_manager
+
+    provider = provider or get_embedding_provider()
+    get_profile_job_manager().submit(
+        f"user-profile:{user_id}:sync:{provider.model_id}",
+        get_user_profile_service().sync,
+        user_id,
+        provider,
+    )
+
+
+# Singleton accessor
+_user_profile_service = UserProfileService()
+
+
+def get_user_profile_service() -> UserProfileService:
+    return _user_profile_service
@@ -313,34 +313,19 @@ class CitationAnalysisModal {
     }
     
     /**
-     * Fetch arXiv metadata using the existing arXiv API
+     * Look up arXiv metadata in the server-side reference preview bundle
      */
     async fetchArxivMetadata(arxivId) {
         try {
-            const response = await fetch(`https://export.arxiv.org/api/query?id_list=${arxivId}`);
-            if (!response.ok) return null;
-            
-            const xmlText = await response.text();
-            const parser = new DOMParser();
-            const xmlDoc = parser.parseFromString(xmlText, 'text/xml');
-            
-            const entry = xmlDoc.querySelector('entry');
-            if (!entry) return null;
-            
-            const title = entry.querySelector('title')?.textContent?.trim() || '';
-            const summary = entry.querySelector('summary')?.textContent?.trim() || '';
-            const published = entry.querySelector('published')?.textContent?.trim() || '';
-            
-            const authors = Array.from(entry.querySelectorAll('author name')).map(name => 
-                name.textContent.trim()
-            );
+            const preview = await window.getReferencePreview(arxivId, this.currentPaperId);
+            if (!preview) return null;
             
             return {
                 arxiv_id: arxivId,
-                title,
-                authors,
-                abstract: summary,
-                published_date: published,
+                title: preview.title || '',
+                authors: preview.authors || [],
+                abstract: preview.abstract || '',
+                published_date: preview.published_date || '',
                 // arXiv doesn't provide citation count, so we don't include it
                 source: 'arxiv'
             };
@@ -30,7 +30,11 @@
       try {
         const res = await fetch(`/api/recommendations/${window.PAPER_ID}`);
         const data = await res.json();
-        renderRecommendations(data);
+        if (data.partial) {
+          const missing = Object.keys(data.sources).filter((s) => data.sources[s].status !== 'ok');
+          console.warn('[WARNING] >>> recommendations missing sources:', missing.join(', '));
+        }
+        renderRecommendations(data.results || []);
       } catch (e) {
         console.error('[ERROR] >>> failed to fetch recommendations', e);
       }
@@ -90,7 +94,11 @@
           body: JSON.stringify({ items: selected }),
         });
         const data = await res.json();
-        alert(`added ${data.added} items to context`);
+        const failed = (data.items || []).filter((s) => !['added', 'exists'].includes(s.status));
+        alert(
+          `added ${data.added} items to context` +
+            (failed.length ? `\nfailed: ${failed.map((s) => `${s.title} (${s.status})`).join(', ')}` : '')
+        );
       } catch (e) {
         alert('failed adding context');
       }
@@ -345,31 +345,20 @@ async function fetchAdditionalPaperInfo(paperInfo) {
     }
 }
 
-// Function to fetch information from ArXiv API
+// Function to fetch ArXiv information from the server-side reference preview bundle
 async function fetchArXivInfo(arxivId) {
     try {
-        const response = await fetch(`https://export.arxiv.org/api/query?id_list=${arxivId}`);
-        const xmlText = await response.text();
+        const preview = await window.getReferencePreview(arxivId);
+        if (!preview) return null;
         
-        // Parse XML response
-        const parser = new DOMParser();
-        const xmlDoc = parser.parseFromString(xmlText, 'text/xml');
-        
-        const entry = xmlDoc.querySelector('entry');
-        if (!entry) return null;
-        
-        const title = entry.querySelector('title')?.textContent?.trim();
-        const summary = entry.querySelector('summary')?.textContent?.trim();
-        const authors = Array.from(entry.querySelectorAll('author name')).map(name => name.textContent?.trim());
-        const published = entry.querySelector('published')?.textContent?.trim();
-        const categories = Array.from(entry.querySelectorAll('category')).map(cat => cat.getAttribute('term'));
+        const published = preview.published_date;
         
         return {
-            title,
-            abstract: summary,
-            authors,
+            title: preview.title,
+            abstract: preview.abstract,
+            authors: preview.authors,
             published: published ? new Date(published).getFullYear().toString() : null,
-            categories,
+            categories: preview.categories,
             source: 'ArXiv'
         };
         
@@ -0,0 +1,54 @@
+// Reference preview bundle: one server-side payload per paper with title,
+// authors, abstract and links for every reference that resolves to an arXiv ID
+
+const referencePreviewRequests = new Map();
+
+function normalizeArxivId(arxivId) {
+    return (arxivId || '').replace(/^arxiv:/i, '').replace(/v\d+$/, '');
+}
+
+// Fetch (once per paper) the preview bundle; the browser revalidates it by ETag
+window.loadReferencePreviews = function(paperId = window.currentPaperId) {
+    if (!paperId) {
+        return Promise.resolve(null);
+    }
+
+    if (!referencePreviewRequests.has(paperId)) {
+        const request = fetch(`/api/paper/${paperId}/reference-previews`)
+            .then(response => response.ok ? response.json() : null)
+            .catch(error => {
+                console.error('Error loading reference previews:', error);
+                return null;
+            });
+
+        referencePreviewRequests.set(paperId, request);
+
+        // Forget failed loads so the next lookup retries
+        request.then(bundle => {
+            if (!bundle) {
+                referencePreviewRequests.delete(paperId);
+            }
+        });
+    }
+
+    return referencePreviewRequests.get(paperId);
+};
+
+// Preview for one arXiv ID from the current paper's bundle, or null
+window.getReferencePreview = async function(arxivId, paperId = window.currentPaperId) {
+    const bundle = await window.loadReferencePreviews(paperId);
+    if (!bundle || !bundle.papers) {
+        return null;
+    }
+
+    const target = normalizeArxivId(arxivId);
+    const preview = bundle.papers[target] ||
+        Object.values(bundle.papers).find(paper => normalizeArxivId(paper.arxiv_id) === target);
+
+    return preview && preview.has_metadata ? preview : null;
+};
+
+// Warm the bundle as soon as the viewer loads so the first click is instant
+if (window.currentPaperId) {
+    window.loadReferencePreviews(window.currentPaperId);
+}
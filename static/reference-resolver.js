@@ -422,30 +422,15 @@ function extractArxivId(ref) {
     return null;
 }
 
-// Fetch abstract from ArXiv API
+// Fetch abstract from the server-side reference preview bundle
 async function fetchArxivAbstract(arxivId) {
     try {
-        const response = await fetch(`https://export.arxiv.org/api/query?id_list=${arxivId}`);
-        
-        if (!response.ok) {
-            return null;
-        }
-        
-        const xmlText = await response.text();
-        const parser = new DOMParser();
-        const xmlDoc = parser.parseFromString(xmlText, 'text/xml');
-        
-        const entry = xmlDoc.querySelector('entry');
-        if (!entry) {
-            return null;
-        }
-        
-        const summary = entry.querySelector('summary');
-        if (!summary) {
+        const preview = await window.getReferencePreview(arxivId);
+        if (!preview || !preview.abstract) {
             return null;
         }
         
-        return summary.textContent.trim();
+        return preview.abstract.trim();
         
     } catch (error) {
         return null;
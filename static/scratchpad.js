@@ -1092,6 +1092,52 @@ class ScratchpadManager {
         }
     }
     
+    showPendingAiReply(noteId) {
+        // placeholder reply that is filled in as tokens stream in
+        const noteEl = document.querySelector(`.scratchpad-note[data-note-id="${noteId}"]`);
+        if (!noteEl) return null;
+        let container = noteEl.querySelector('.scratchpad-replies');
+        if (!container) {
+            container = document.createElement('div');
+            container.className = 'scratchpad-replies';
+            container.style.cssText = `
+                margin-top: 16px !important;
+                padding-top: 12px !important;
+            `;
+            noteEl.appendChild(container);
+        }
+        const pending = this.createNoteElement(
+            { id: `pending-${noteId}`, content: '…', reply_type: 'ai', ai_metadata: {} },
+            true
+        );
+        container.appendChild(pending);
+        return pending.querySelector('.scratchpad-note-content');
+    }
+    
+    async readEvents(response, onEvent) {
+        // minimal server-sent events parser over a fetch body (EventSource is GET-only)
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                onEvent(event, data ? JSON.parse(data) : {});
+            }
+        }
+    }
+    
     async createAiReply(noteId) {
         const aiBtn = document.querySelector(`[data-note-id="${noteId}"] .scratchpad-ai-btn`);
         if (aiBtn) {
@@ -1100,7 +1146,7 @@ class ScratchpadManager {
         }
         
         try {
-            const response = await fetch(`/api/scratchpad/${noteId}/ai-reply`, {
+            const response = await fetch(`/api/scratchpad/${noteId}/ai-reply?stream=1`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -1108,15 +1154,31 @@ class ScratchpadManager {
                 body: JSON.stringify({})
             });
             
-            const result = await response.json();
-            if (result.success) {
-                await this.loadNotes();
-            } else {
+            if (!(response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+                // auth and lookup failures come back as plain JSON
+                const result = await response.json();
                 alert('failed to generate ai reply: ' + result.error);
+                return;
             }
+            
+            const contentEl = this.showPendingAiReply(noteId);
+            let text = '';
+            await this.readEvents(response, (event, data) => {
+                if (event === 'token') {
+                    text += data.text;
+                    if (contentEl) contentEl.textContent = text;
+                } else if (event === 'tool') {
+                    text += text ? '\n\n' : '';
+                    if (contentEl) contentEl.textContent = text + `🔎 ${data.name}…`;
+                } else if (event === 'error') {
+                    throw new Error(data.error);
+                }
+            });
+            await this.loadNotes();
         } catch (error) {
             console.error('failed to generate ai reply:', error);
             alert('failed to generate ai reply');
+            await this.loadNotes();
         } finally {
             if (aiBtn) {
                 aiBtn.textContent = '🤖 Ask AI';
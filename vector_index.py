@@ -0,0 +1,477 @@
+"""
+Persisted approximate-nearest-neighbour index (IVF-flat over NumPy)
+Vectors live in a memory-mapped float32 file, so every worker process maps one
+shared copy through the page cache; inserts append in place and other
+processes pick them up on their next query
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: single-process locking only
+    fcntl = None
+
+INDEX_ROOT = "data/indexes"
+# rows appended since the inverted lists were last sorted are scanned as an
+# unsorted tail; past this many the lists are re-sorted
+MAX_UNSORTED_TAIL = 8192
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first (argpartition + small sort)."""
+    k = min(k, scores.size)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def index_path(name: str, model_id: str) -> str:
+    """Directory for a named index of vectors from one embedding model."""
+    slug = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_id)
+    return os.path.join(INDEX_ROOT, f"{name}-{slug}")
+
+
+class VectorIndex:
+    """IVF-flat index over row-normalized float32 vectors, keyed by string ids.
+
+    Below `train_threshold` vectors it is an exact flat scan. Past it, vectors
+    are clustered with spherical k-means into `nlist` inverted lists and a
+    query scans only the `nprobe` closest lists. New vectors are assigned to
+    their nearest centroid on insert; the quantizer is retrained when the
+    index has grown 4x since the last training.
+
+    Every row also has an int8 code with a per-row scale (row ~= code *
+    scale). Once trained, searches score candidates on the int8 codes first
+    and re-rank only the best `rerank * k` of them against the float32 rows,
+    so the hot working set is a quarter of the float32 matrix. Flat scans
+    stay on float32.
+
+    On disk (one directory per index):
+        meta.json      dim, count, codes_count, keys_bytes, version, nlist, trained_count
+        vectors.f32    count x dim float32 rows (memory-mapped for reads)
+        codes.i8       codes_count x dim int8 codes
+        scales.f32     codes_count float32 per-row scales
+        lists-T.i32    inverted-list id per row (once trained; T = trained_count)
+        centroids-T.f32  nlist x dim float32
+        keys.txt       one key per row
+    """
+
+    def __init__(
+        self,
+        path: str,
+        nprobe: int = 8,
+        train_threshold: int = 2048,
+        rerank: int = 4,
+    ):
+        self.path = path
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.rerank = rerank
+        os.makedirs(path, exist_ok=True)
+
+        self.dim: Optional[int] = None
+        self.count = 0
+        self.codes_count = 0
+        self.version = 0
+        self.nlist = 0
+        self.trained_count = 0
+        self.keys_bytes = 0
+        self.keys: List[str] = []
+        self.key_rows: Dict[str, int] = {}
+        self.vectors: Optional[np.ndarray] = None
+        self.codes: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.centroids_generation = None
+        self.list_order: Optional[np.ndarray] = None
+        self.list_offsets: Optional[np.ndarray] = None
+        self.sorted_count = 0
+        self.tail_lists: Optional[np.ndarray] = None
+        self._meta_mtime = None
+        self._lock = threading.RLock()
+        self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, key: str) -> bool:
+        self.refresh()
+        return key in self.key_rows
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers across threads and worker processes."""
+        with self._lock:
+            with open(self._file(".lock"), "a") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def refresh(self) -> bool:
+        """Reload if another process changed the index since we last looked."""
+        try:
+            mtime = os.stat(self._file("meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._meta_mtime:
+            return False
+        with self._lock:
+            try:
+                self._load()
+            except FileNotFoundError:
+                # a retrain replaced the list files between reading meta and
+                # mapping them; the new meta.json is already in place
+                self._load()
+        return True
+
+    def _load(self):
+        meta_path = self._file("meta.json")
+        if not os.path.exists(meta_path):
+            return
+        self._meta_mtime = os.stat(meta_path).st_mtime_ns
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self.dim = meta["dim"]
+        self.count = meta["count"]
+        self.codes_count = meta.get("codes_count", 0)
+        self.version = meta["version"]
+        self.nlist = meta.get("nlist", 0)
+        self.trained_count = meta.get("trained_count", 0)
+        self.keys_bytes = meta["keys_bytes"]
+
+        # meta.json is written last, so rows past `count` (an append in
+        # progress elsewhere) are never read
+        with open(self._file("keys.txt"), "rb") as f:
+            self.keys = f.read(self.keys_bytes).decode("utf-8").split("\n")[: self.count]
+        self.key_rows = {key: row for row, key in enumerate(self.keys)}
+        self._map_arrays()
+
+    def _map_arrays(self):
+        """(Re)map the vector file and rebuild inverted lists for the current count."""
+        self.vectors = (
+            np.memmap(
+                self._file("vectors.f32"), dtype=np.float32, mode="r",
+                shape=(self.count, self.dim),
+            )
+            if self.count
+            else np.zeros((0, self.dim), dtype=np.float32)
+        )
+        if self.count and self.codes_count >= self.count:
+            self.codes = np.memmap(
+                self._file("codes.i8"), dtype=np.int8, mode="r", shape=(self.count, self.dim)
+            )
+            self.scales = np.memmap(
+                self._file("scales.f32"), dtype=np.float32, mode="r", shape=(self.count,)
+            )
+        else:
+            # indexes written before quantization until ensure_codes() runs
+            self.codes = self.scales = None
+
+        if not self.nlist:
+            self.centroids = self.list_order = self.list_offsets = self.tail_lists = None
+            self.centroids_generation = None
+            return
+
+        if self.centroids_generation != self.trained_count:
+            centroids = np.fromfile(self._quantizer_file("centroids", "f32"), dtype=np.float32)
+            self.centroids = centroids.reshape(self.nlist, self.dim)
+            self.centroids_generation = self.trained_count
+            self.list_order = None
+
+        lists = np.fromfile(self._quantizer_file("lists", "i32"), dtype=np.int32, count=self.count)
+        if (
+            self.list_order is None
+            or not self.sorted_count <= self.count <= self.sorted_count + MAX_UNSORTED_TAIL
+        ):
+            # sorting is the slow part; small appends only extend the tail
+            self.sorted_count = self.count
+            self.list_order = np.argsort(lists, kind="stable")
+            self.list_offsets = np.searchsorted(
+                lists[self.list_order], np.arange(self.nlist + 1)
+            )
+        self.tail_lists = lists[self.sorted_count :]
+
+    def _quantizer_file(self, name: str, ext: str, trained_count: Optional[int] = None) -> str:
+        # one file per training generation, so readers never see a new
+        # quantizer paired with old metadata
+        generation = self.trained_count if trained_count is None else trained_count
+        return self._file(f"{name}-{generation}.{ext}")
+
+    @staticmethod
+    def _append(path: str, committed_size: int, data: bytes):
+        with open(path, "ab") as f:
+            f.truncate(committed_size)
+            f.write(data)
+
+    def _write_meta(self):
+        meta = {
+            "dim": self.dim,
+            "count": self.count,
+            "codes_count": self.codes_count,
+            "keys_bytes": self.keys_bytes,
+            "version": self.version,
+            "nlist": self.nlist,
+            "trained_count": self.trained_count,
+        }
+        tmp_path = self._file("meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._file("meta.json"))
+
+    def add(self, keys: Sequence[str], vectors) -> int:
+        """
+        Append vectors under new keys (keys already present are skipped)
+
+        Args:
+            keys: String ids, one per vector
+            vectors: Array-like of shape (len(keys), dim)
+
+        Returns:
+            Number of vectors added
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return 0
+        vectors = vectors.reshape(len(keys), -1)
+
+        with self._write_lock():
+            self.refresh()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"expected {self.dim}-dim vectors, got {vectors.shape[1]}")
+
+            batch_keys = set()
+            fresh = []
+            for i, key in enumerate(keys):
+                if key not in self.key_rows and key not in batch_keys and "\n" not in key:
+                    batch_keys.add(key)
+                    fresh.append(i)
+            if not fresh:
+                return 0
+
+            self._append_codes(self.count)
+            rows = _normalize(vectors[fresh].copy())
+            key_bytes = (("\n" if self.count else "") + "\n".join(keys[i] for i in fresh)).encode("utf-8")
+            # drop any tail left by an append that died before writing meta.json
+            self._append(self._file("vectors.f32"), self.count * self.dim * 4, rows.tobytes())
+            self._append(self._file("keys.txt"), self.keys_bytes, key_bytes)
+            if self.nlist:
+                self._append(
+                    self._quantizer_file("lists", "i32"), self.count * 4, self._assign(rows).tobytes()
+                )
+            self.keys_bytes += len(key_bytes)
+            codes, scales = quantize(rows)
+            self._append(self._file("codes.i8"), self.count * self.dim, codes.tobytes())
+            self._append(self._file("scales.f32"), self.count * 4, scales.tobytes())
+            self.codes_count = self.count + len(fresh)
+
+            for i in fresh:
+                self.key_rows[keys[i]] = len(self.keys)
+                self.keys.append(keys[i])
+            self.count += len(fresh)
+            self.version += 1
+            self._write_meta()
+            self._meta_mtime = os.stat(self._file("meta.json")).st_mtime_ns
+            self._map_arrays()
+
+            if (not self.nlist and self.count >= self.train_threshold) or (
+                self.nlist and self.count >= 4 * self.trained_count
+            ):
+                self._train()
+            return len(fresh)
+
+    def _append_codes(self, upto: int):
+        """Quantize rows [codes_count, upto) that have no int8 code yet (writer lock held)."""
+        for start in range(self.codes_count, upto, 65536):
+            rows = np.asarray(self.vectors[start : min(start + 65536, upto)])
+            codes, scales = quantize(rows)
+            self._append(self._file("codes.i8"), start * self.dim, codes.tobytes())
+            self._append(self._file("scales.f32"), start * 4, scales.tobytes())
+            self.codes_count = start + len(rows)
+
+    def ensure_codes(self):
+        """Quantize any rows written before the index stored int8 codes."""
+        self.refresh()
+        if self.codes_count >= self.count:
+            return
+        with self._write_lock():
+            self.refresh()
+            if self.codes_count >= self.count:
+                return
+            self._append_codes(self.count)
+            self.version += 1
+            self._write_meta()
+            self._meta_mtime = os.stat(self._file("meta.json")).st_mtime_ns
+            self._map_arrays()
+            print(f"[PASS] >>> quantized {self.count} vectors in {self.path}")
+
+    def _assign(self, rows: np.ndarray) -> np.ndarray:
+        """Nearest centroid per row, in chunks to bound memory."""
+        assignments = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), 65536):
+            chunk = np.asarray(rows[start : start + 65536])
+            assignments[start : start + len(chunk)] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return assignments
+
+    def _train(self, iterations: int = 10, seed: int = 0):
+        """Spherical k-means on a sample, then reassign every row (writer lock held)."""
+        rng = np.random.default_rng(seed)
+        nlist = int(np.clip(4 * np.sqrt(self.count), 16, 4096))
+        sample_size = min(self.count, max(32 * nlist, 20000), 100000)
+        sample = np.asarray(self.vectors[np.sort(rng.choice(self.count, sample_size, replace=False))])
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = np.bincount(assignment, minlength=nlist) == 0
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        previous = self.trained_count if self.nlist else None
+        self.centroids = centroids.astype(np.float32)
+        self.centroids.tofile(self._quantizer_file("centroids", "f32", self.count))
+        self._assign(self.vectors).tofile(self._quantizer_file("lists", "i32", self.count))
+        self.nlist = nlist
+        self.trained_count = self.count
+        self.version += 1
+        self._write_meta()
+        if previous is not None and previous != self.trained_count:
+            for name, ext in (("centroids", "f32"), ("lists", "i32")):
+                try:
+                    os.remove(self._quantizer_file(name, ext, previous))
+                except FileNotFoundError:
+                    pass
+        self._meta_mtime = os.stat(self._file("meta.json")).st_mtime_ns
+        self._map_arrays()
+        print(f"[PASS] >>> trained vector index {self.path}: {self.count} vectors, {nlist} lists")
+
+    def search(
+        self,
+        query,
+        k: int = 10,
+        nprobe: Optional[int] = None,
+        rerank: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Approximate top-k by cosine similarity
+
+        Args:
+            query: Query vector (any norm)
+            k: Number of results
+            nprobe: Inverted lists to scan (defaults to self.nprobe); ignored
+                while the index is still a flat scan
+            rerank: Score on int8 codes, then re-rank the best rerank * k
+                against float32 (defaults to self.rerank; 0 scans float32);
+                ignored while the index is still a flat scan
+
+        Returns:
+            (key, score) pairs, best first; scores are exact float32 cosines
+        """
+        self.refresh()
+        with self._lock:
+            vectors, codes, scales, keys = self.vectors, self.codes, self.scales, self.keys
+            centroids, order, offsets = self.centroids, self.list_order, self.list_offsets
+            sorted_count, tail_lists = self.sorted_count, self.tail_lists
+        if vectors is None or not len(keys):
+            return []
+
+        query = np.asarray(query, dtype=np.float32).ravel()
+        if query.size != vectors.shape[1]:
+            raise ValueError(f"query has {query.size} dims, index has {vectors.shape[1]}")
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        if centroids is None:
+            rows = np.arange(len(keys))
+        else:
+            probe = top_k(centroids @ query, nprobe or self.nprobe)
+            tail_rows = sorted_count + np.flatnonzero(np.isin(tail_lists, probe))
+            rows = np.sort(
+                np.concatenate([order[offsets[c] : offsets[c + 1]] for c in probe] + [tail_rows])
+            )
+
+        rerank = self.rerank if rerank is None else rerank
+        # a flat index is below train_threshold, where one contiguous float32
+        # matmul beats the blocked int8 pass plus the re-rank gather
+        if centroids is not None and codes is not None and rerank and len(rows) > rerank * k:
+            approx = _quantized_scores(codes, scales, rows, query)
+            rows = np.sort(rows[top_k(approx, rerank * k)])
+
+        if centroids is None and len(rows) == len(keys):
+            scores = vectors @ query  # contiguous scan, no gather
+        else:
+            scores = vectors[rows] @ query
+        best = top_k(scores, k)
+        return [(keys[rows[i]], float(scores[i])) for i in best]
+
+    def exact_search(self, query, k: int = 10) -> List[Tuple[str, float]]:
+        """Exact top-k by a full scan (ground truth for recall measurements)."""
+        self.refresh()
+        query = np.asarray(query, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if not self.count or norm == 0:
+            return []
+        scores = self.vectors @ (query / norm)
+        return [(self.keys[row], float(scores[row])) for row in top_k(scores, k)]
+
+
+def quantize(rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric int8 codes with one float32 scale per row (row ~= code * scale)."""
+    scales = np.abs(rows).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(rows / scales[:, None]).clip(-127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _quantized_scores(codes: np.ndarray, scales: np.ndarray, rows: np.ndarray, query: np.ndarray):
+    """Approximate query scores for the given rows from their int8 codes."""
+    scores = np.empty(len(rows), dtype=np.float32)
+    contiguous = len(rows) == len(codes)
+    # small blocks widened into one reused float32 buffer stay in cache
+    block = np.empty((256, codes.shape[1]), dtype=np.float32)
+    for start in range(0, len(rows), 256):
+        chunk = codes[start : start + 256] if contiguous else codes[rows[start : start + 256]]
+        block[: len(chunk)] = chunk
+        scores[start : start + len(chunk)] = block[: len(chunk)] @ query
+    return scores * (scales if contiguous else scales[rows])
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+_indexes: Dict[str, VectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vector_index(name: str, model_id: str) -> VectorIndex:
+    """Process-wide handle on the persisted index for (name, embedding model)."""
+    path = index_path(name, model_id)
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = VectorIndex(path)
+            _indexes[path].ensure_codes()
+        return _indexes[path]